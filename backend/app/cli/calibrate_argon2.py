@@ -0,0 +1,125 @@
+"""
+Argon2 cost calibration for this host.
+
+Measures Argon2id hash latency over a grid of memory and time costs and
+recommends the strongest setting whose median latency stays within a target,
+as .env lines for PASSWORD_HASH_*. Run it on the hardware that serves logins,
+ideally while idle. Existing hashes move to the new costs as users log in.
+
+Usage (from the backend/ directory, with .env configured):
+    python -m app.cli.calibrate_argon2
+    python -m app.cli.calibrate_argon2 --target-ms 150 --parallelism 2
+"""
+
+import argparse
+import os
+import statistics
+import time
+from typing import Optional
+
+from passlib.hash import argon2
+
+from app.config import settings
+
+# OWASP's floor for Argon2id is 19 MiB; doubling from there
+MEMORY_COSTS_KIB = [19456, 32768, 65536, 131072, 262144]
+MAX_TIME_COST = 10
+
+
+def measure(time_cost: int, memory_cost_kib: int, parallelism: int, samples: int) -> float:
+    """
+    Median milliseconds to hash a password with the given costs.
+    
+    Args:
+        time_cost: Argon2 passes over memory
+        memory_cost_kib: Argon2 memory in KiB
+        parallelism: Argon2 lanes
+        samples: Hashes to time after one warm-up
+    
+    Returns:
+        float: Median latency in milliseconds
+    """
+    hasher = argon2.using(rounds=time_cost, memory_cost=memory_cost_kib, parallelism=parallelism)
+    hasher.hash("calibration-password")
+    timings = []
+    for _ in range(samples):
+        began = time.perf_counter()
+        hasher.hash("calibration-password")
+        timings.append((time.perf_counter() - began) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(target_ms: float, parallelism: int, max_memory_kib: int, samples: int) -> tuple[list[dict], Optional[dict]]:
+    """
+    Time the cost grid and pick the strongest setting within the target.
+    
+    For each memory cost the time cost is raised until a hash takes longer
+    than target_ms. Strength is memory x time (the work an attacker must
+    repeat per guess); ties go to more memory.
+    
+    Args:
+        target_ms: Highest acceptable median hash latency
+        parallelism: Argon2 lanes
+        max_memory_kib: Largest memory cost to try
+        samples: Hashes timed per setting
+    
+    Returns:
+        tuple: (every measured setting, recommended setting or None)
+    """
+    rows = []
+    for memory_cost_kib in [memory for memory in MEMORY_COSTS_KIB if memory <= max_memory_kib]:
+        for time_cost in range(1, MAX_TIME_COST + 1):
+            latency = measure(time_cost, memory_cost_kib, parallelism, samples)
+            rows.append({
+                "memory_cost_kib": memory_cost_kib,
+                "time_cost": time_cost,
+                "parallelism": parallelism,
+                "median_ms": round(latency, 1),
+                "within_target": latency <= target_ms
+            })
+            if latency > target_ms:
+                break
+    
+    candidates = [row for row in rows if row["within_target"]]
+    recommended = max(
+        candidates,
+        key=lambda row: (row["memory_cost_kib"] * row["time_cost"], row["memory_cost_kib"]),
+        default=None
+    )
+    return rows, recommended
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--target-ms", type=float, default=250.0, help="highest acceptable median hash latency")
+    parser.add_argument("--parallelism", type=int, default=settings.password_hash_parallelism, help="Argon2 lanes")
+    parser.add_argument("--max-memory-kib", type=int, default=131072, help="largest memory cost to try")
+    parser.add_argument("--samples", type=int, default=5, help="hashes timed per setting")
+    args = parser.parse_args()
+    
+    rows, recommended = calibrate(args.target_ms, args.parallelism, args.max_memory_kib, args.samples)
+    columns = ["memory_cost_kib", "time_cost", "parallelism", "median_ms"]
+    print(" ".join(f"{column:>16}" for column in columns))
+    for row in rows:
+        print(" ".join(f"{row[column]:>16}" for column in columns))
+    print()
+    
+    if recommended is None:
+        print(f"No setting hashes within {args.target_ms:g} ms on this host; raise --target-ms.")
+        return
+    
+    workers = settings.password_hash_workers
+    logins_per_second = min(workers, os.cpu_count() or 1) * 1000 / recommended["median_ms"]
+    peak_mib = workers * recommended["memory_cost_kib"] / 1024
+    print(f"Recommended for a {args.target_ms:g} ms target ({recommended['median_ms']} ms measured):")
+    print(f"    PASSWORD_HASH_TIME_COST={recommended['time_cost']}")
+    print(f"    PASSWORD_HASH_MEMORY_COST_KIB={recommended['memory_cost_kib']}")
+    print(f"    PASSWORD_HASH_PARALLELISM={recommended['parallelism']}")
+    print(
+        f"With PASSWORD_HASH_WORKERS={workers}: about {logins_per_second:.0f} logins/s, "
+        f"up to {peak_mib:.0f} MiB held by concurrent hashes."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,7 @@ Configuration module for Sweet Shop Management System.
 import os
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
-from typing import List
+from typing import List, Optional
 
 class Settings(BaseSettings):
     """
@@ -27,6 +27,112 @@ class Settings(BaseSettings):
     app_version: str = "1.0.0"
     allowed_origins: List[str]
     
+    # --- VERIFIED TOKEN CACHE ---
+    token_cache_enabled: bool = True
+    token_cache_max_entries: int = 50000
+    token_cache_max_ttl_seconds: float = 3600.0
+    
+    # --- USER STATUS CACHE (active/admin checks on every request) ---
+    user_status_cache_max_entries: int = 50000
+    # How long other processes may act on a stale role or deactivation
+    user_status_ttl_seconds: float = 5.0
+    
+    # --- PASSWORD HASHING (Argon2 on a dedicated process pool) ---
+    # Argon2id costs; pick them with `python -m app.cli.calibrate_argon2`.
+    # Stored hashes made with other costs are rehashed at the next login.
+    password_hash_time_cost: int = 3
+    password_hash_memory_cost_kib: int = 65536
+    password_hash_parallelism: int = 4
+    password_hash_workers: int = 2
+    # Hashes queued or running before sign-ins are rejected with 503
+    password_hash_max_pending: int = 64
+    # Background rehashing of outdated hashes, written in batches
+    password_rehash_enabled: bool = True
+    password_rehash_batch_size: int = 100
+    password_rehash_max_wait_seconds: float = 1.0
+    
+    # --- BULK USER IMPORT ---
+    # Hash processes per import; None uses every core
+    user_import_hash_workers: Optional[int] = None
+    user_import_batch_size: int = 500
+    user_import_max_reported_errors: int = 1000
+    
+    # --- PURCHASE BATCHING (group commit for flash-sale traffic) ---
+    purchase_batching_enabled: bool = False
+    purchase_batch_max_size: int = 64
+    purchase_batch_max_wait_ms: float = 5.0
+    purchase_batch_queue_size: int = 10000
+    
+    # --- SHARDED INVENTORY ---
+    stock_shard_registry_ttl_seconds: float = 30.0
+    
+    # --- STOCK RESERVATIONS (hold-then-confirm) ---
+    reservation_ttl_seconds: int = 300
+    reservation_max_ttl_seconds: int = 1800
+    reservation_sweeper_enabled: bool = True
+    reservation_sweeper_reload_seconds: float = 60.0
+    
+    # --- IDEMPOTENCY KEYS ---
+    idempotency_ttl_seconds: int = 86400
+    idempotency_cache_max_entries: int = 10000
+    idempotency_wait_timeout_seconds: float = 10.0
+    idempotency_lock_timeout_seconds: float = 60.0
+    
+    # --- LIST TOTALS ---
+    sweet_count_ttl_seconds: float = 30.0
+    sweet_count_cache_max_entries: int = 1024
+    
+    # --- NAME SEARCH ("index", "pg_trgm" or "like") ---
+    name_search_backend: str = "index"
+    name_index_refresh_seconds: float = 60.0
+    name_index_max_candidates: int = 10000
+    name_fuzzy_max_results: int = 100
+    name_fuzzy_scan_budget: int = 50000
+    
+    # --- CATALOG SNAPSHOT (vectorized search filters) ---
+    catalog_snapshot_enabled: bool = True
+    catalog_snapshot_refresh_seconds: float = 60.0
+    
+    # --- SEARCH FACETS ---
+    search_facet_price_edges: list[float] = [5.0, 10.0, 20.0, 50.0]
+    search_facet_ttl_seconds: float = 30.0
+    search_facet_cache_max_entries: int = 1024
+    
+    # --- SEARCH RESULT CACHE ---
+    search_cache_enabled: bool = True
+    search_cache_max_entries: int = 4096
+    search_cache_max_bytes: int = 32 * 1024 * 1024
+    search_cache_ttl_seconds: float = 30.0
+    search_stream_chunk_size: int = 500
+    
+    # --- LIST RESPONSE CACHE (GET /api/sweets) ---
+    list_cache_enabled: bool = True
+    list_cache_max_entries: int = 2048
+    list_cache_max_bytes: int = 32 * 1024 * 1024
+    list_cache_ttl_seconds: float = 30.0
+    
+    # --- SWEET RECORD CACHE (GET /api/sweets/{id}) ---
+    sweet_cache_enabled: bool = True
+    sweet_cache_max_entries: int = 10000
+    sweet_cache_max_bytes: int = 16 * 1024 * 1024
+    sweet_cache_ttl_seconds: float = 30.0
+    # Broadcast invalidations to other workers via LISTEN/NOTIFY (PostgreSQL only)
+    sweet_cache_broadcast: bool = False
+    sweet_cache_channel: str = "sweet_cache_invalidate"
+    sweet_cache_publish_attempts: int = 3
+    sweet_cache_publish_retry_seconds: float = 0.5
+    
+    # --- CONDITIONAL GET ---
+    # Catalog ETags roll over each window; a longer one while other workers'
+    # writes are relayed, which still bounds the damage of a lost message
+    catalog_etag_window_seconds: float = 30.0
+    catalog_etag_shared_window_seconds: float = 300.0
+    
+    # --- AUTOCOMPLETE ---
+    suggest_refresh_seconds: float = 60.0
+    suggest_scan_limit: int = 2000
+    suggest_cache_ttl_seconds: float = 10.0
+    
     # Configure path to find .env in 'backend/' folder
     model_config = SettingsConfigDict(
         env_file=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env"),
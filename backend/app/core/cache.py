@@ -0,0 +1,245 @@
+"""
+In-process caching primitives.
+Provides a thread-safe LRU cache with per-entry TTL and a registry so every
+cache's hit/miss statistics can be inspected and all caches reset together,
+plus the reload bookkeeping shared by the process-local catalog indexes.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries also expire after a time-to-live.
+    
+    Size is bounded by entry count and, optionally, by a byte budget
+    computed with a caller-supplied sizeof function. Least recently used
+    entries are evicted first when either bound is exceeded.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        max_entries: int,
+        ttl_seconds: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        register_cache(self)
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Look up a key, refreshing its LRU position.
+        
+        Args:
+            key: Cache key
+            default: Value returned on a miss
+        
+        Returns:
+            Any: Cached value, or default if absent or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            
+            value, expires_at, size = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return default
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """
+        Store a value, evicting least recently used entries if over budget.
+        
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl_seconds: Lifetime overriding the cache default
+        """
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        size = self.sizeof(value) if self.sizeof is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+    
+    def pop(self, key: Hashable) -> None:
+        """Remove a key if present."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+    
+    def clear(self) -> None:
+        """Remove every entry and reset statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = self.expirations = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def stats(self) -> dict:
+        """
+        Snapshot of this cache's counters.
+        
+        Returns:
+            dict: Entry count, byte usage and hit/miss/eviction counters
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+
+class IndexReloader:
+    """
+    Reload bookkeeping for a process-local index rebuilt from the database.
+    
+    A load reads the database without the index's lock and swaps the new
+    contents in under it. Changes the index applies in the meantime are
+    journaled, and the swap replays them onto the new contents, so nothing
+    written between the read and the swap is lost. Loads run one at a
+    time, and the stale check that starts a background reload is made
+    under the lock, so two reloads never overlap.
+    """
+    
+    def __init__(self, name: str, lock: threading.Lock, refresh_seconds: float):
+        self.name = name
+        self.lock = lock
+        self.refresh_seconds = refresh_seconds
+        self.loaded_at: Optional[float] = None
+        self._loading = threading.Lock()
+        self._journal: Optional[list] = None
+        self._reloading = False
+    
+    def load(self, build: Callable[[], Any], install: Callable[[Any, list], None]) -> None:
+        """
+        Rebuild the index.
+        
+        Args:
+            build: Reads the database and returns the new contents; runs
+                without the lock
+            install: Swaps the contents in and replays the journaled
+                changes, given as (contents, journal); runs under the lock
+        """
+        with self._loading:
+            started = time.monotonic()
+            with self.lock:
+                self._journal = []
+            try:
+                built = build()
+            except BaseException:
+                with self.lock:
+                    self._journal = None
+                raise
+            
+            with self.lock:
+                journal, self._journal = self._journal, None
+                self.loaded_at = started
+                install(built, journal)
+    
+    def journal(self, changes: Iterable) -> None:
+        """Keep changes for the running load to replay; caller holds the lock."""
+        if self._journal is not None:
+            self._journal.extend(changes)
+    
+    def ensure_fresh(self, db: Session, load: Callable[[Session], None]) -> None:
+        """
+        Load on first use, or start one background reload once stale.
+        
+        Args:
+            db: Session for the first load; a background reload opens its
+                own session on the same bind
+            load: The index's load method
+        """
+        if self.loaded_at is None:
+            load(db)
+            return
+        with self.lock:
+            if self._reloading or time.monotonic() - self.loaded_at < self.refresh_seconds:
+                return
+            self._reloading = True
+        bind = db.get_bind()
+        
+        def reload():
+            try:
+                with Session(bind) as session:
+                    load(session)
+            finally:
+                with self.lock:
+                    self._reloading = False
+        
+        threading.Thread(target=reload, name=f"{self.name}-reload", daemon=True).start()
+
+
+# Every cache created in this process, by name
+_registry: dict[str, TTLCache] = {}
+
+
+def register_cache(cache: TTLCache) -> None:
+    """Add a cache to the process-wide registry."""
+    _registry[cache.name] = cache
+
+
+def cache_stats() -> dict[str, dict]:
+    """Return statistics for every registered cache."""
+    return {name: cache.stats() for name, cache in _registry.items()}
+
+
+def clear_caches() -> None:
+    """Empty every registered cache (tests and admin resets)."""
+    for cache in _registry.values():
+        cache.clear()
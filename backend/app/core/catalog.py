@@ -0,0 +1,86 @@
+"""
+Catalog change tracking.
+Process-local version counters that services bump after committing writes to
+the sweets table, so derived caches can key on them and never need explicit
+invalidation lists.
+"""
+
+import secrets
+import threading
+from typing import Callable, Iterable
+
+
+class CatalogVersion:
+    """
+    Version counters for the sweets catalog.
+    
+    `catalog` moves on any change to sweet rows (create, update, delete);
+    `stock` also moves on stock-only changes such as purchases and restocks.
+    Caches whose results depend on stock levels should key on both.
+    
+    Per-row structures can also subscribe to be told which sweet IDs
+    changed, so they can patch themselves instead of rebuilding.
+    
+    Counters are per process; `epoch` identifies this process's sequence so
+    values from different workers are never mistaken for each other.
+    `shared` is set while changes made by other workers are being relayed
+    in through remote_changed; relaying is best effort, so consumers still
+    bound how long they trust a version.
+    """
+    
+    def __init__(self):
+        self.catalog = 0
+        self.stock = 0
+        self.epoch = secrets.token_hex(4)
+        self.shared = False
+        self._lock = threading.Lock()
+        self._listeners: list[tuple[Callable[[list[int]], None], bool]] = []
+    
+    def subscribe(self, listener: Callable[[list[int]], None], remote: bool = True) -> None:
+        """
+        Call listener with the changed sweet IDs after every change.
+        
+        Args:
+            listener: Callable taking the list of changed sweet IDs
+            remote: Also call it for changes relayed from other workers
+        """
+        self._listeners.append((listener, remote))
+    
+    def unsubscribe(self, listener: Callable[[list[int]], None]) -> None:
+        """Stop calling a listener."""
+        self._listeners = [entry for entry in self._listeners if entry[0] != listener]
+    
+    def catalog_changed(self, sweet_ids: Iterable[int] = ()) -> None:
+        """Record a change to sweet details (and possibly stock)."""
+        with self._lock:
+            self.catalog += 1
+            self.stock += 1
+        self._notify(sweet_ids)
+    
+    def stock_changed(self, sweet_ids: Iterable[int] = ()) -> None:
+        """Record a change to stock levels only."""
+        with self._lock:
+            self.stock += 1
+        self._notify(sweet_ids)
+    
+    def remote_changed(self, sweet_ids: Iterable[int]) -> None:
+        """Record a change committed by another worker process."""
+        with self._lock:
+            self.catalog += 1
+            self.stock += 1
+        self._notify(sweet_ids, remote=True)
+    
+    def _notify(self, sweet_ids: Iterable[int], remote: bool = False) -> None:
+        sweet_ids = list(sweet_ids)
+        for listener, accepts_remote in self._listeners:
+            if accepts_remote or not remote:
+                listener(sweet_ids)
+    
+    def reset(self) -> None:
+        """Start counting from zero again (tests)."""
+        with self._lock:
+            self.catalog = 0
+            self.stock = 0
+
+
+catalog_version = CatalogVersion()
@@ -0,0 +1,119 @@
+"""
+Conditional GET helpers.
+Builds strong entity tags from serialized bodies or the catalog version,
+evaluates If-None-Match, and formats Last-Modified dates.
+"""
+
+import hashlib
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Iterable, Optional
+
+from fastapi import Response, status
+from app.core.catalog import catalog_version
+from app.config import settings
+
+
+def body_etag(body: bytes) -> str:
+    """
+    Strong entity tag for a serialized representation.
+    
+    Args:
+        body: Response body
+    
+    Returns:
+        str: Quoted entity tag
+    """
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def catalog_etag(*parts) -> str:
+    """
+    Strong entity tag for a catalog read at the current catalog version.
+    
+    Take the tag before reading: a write landing during the read moves the
+    version, so the tag can only be older than the body, never newer.
+    Versions are per process, so the tag also carries a time window: a tag
+    issued before another worker's write expires with the window. While
+    other workers' changes are relayed in (catalog_version.shared) the
+    window is longer, but still bounded in case a relayed message is lost.
+    
+    Args:
+        *parts: Request parameters that select the representation
+    
+    Returns:
+        str: Quoted entity tag
+    """
+    window = (
+        settings.catalog_etag_shared_window_seconds if catalog_version.shared
+        else settings.catalog_etag_window_seconds
+    )
+    version = f"{catalog_version.epoch}-{catalog_version.stock}-{int(time.time() // window)}"
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+    return f'"{version}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches an entity tag.
+    
+    Uses the weak comparison RFC 9110 requires for If-None-Match, so a
+    W/ prefix added by an intermediary still matches.
+    
+    Args:
+        if_none_match: Header value, possibly a comma-separated list or "*"
+        etag: Current quoted entity tag
+    
+    Returns:
+        bool: True if the client's copy is current
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def http_date(moment: datetime) -> str:
+    """Format a datetime (naive values are UTC) as an HTTP-date."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return format_datetime(moment.astimezone(timezone.utc), usegmt=True)
+
+
+def last_modified(moments: Iterable[Optional[datetime]]) -> Optional[str]:
+    """Latest of some modification times as an HTTP-date, or None."""
+    latest = max((moment for moment in moments if moment is not None), default=None)
+    return http_date(latest) if latest is not None else None
+
+
+def validator_headers(etag: str, modified: Optional[str] = None) -> dict[str, str]:
+    """
+    Headers advertising a representation's validators.
+    
+    Cache-Control: no-cache lets clients keep the body but makes them
+    revalidate it on every use.
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if modified is not None:
+        headers["Last-Modified"] = modified
+    return headers
+
+
+def not_modified(etag: str, modified: Optional[str] = None) -> Response:
+    """
+    Empty 304 response for a client whose copy is current.
+    
+    Args:
+        etag: Current quoted entity tag
+        modified: Last-Modified HTTP-date, if known
+    
+    Returns:
+        Response: 304 Not Modified
+    """
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validator_headers(etag, modified))
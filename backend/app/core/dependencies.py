@@ -0,0 +1,55 @@
+"""
+Shared FastAPI dependencies.
+Resolves the authenticated user from the bearer token and enforces admin access.
+"""
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.core.security import TokenData, decode_token
+from app.services.user_service import UserService
+
+security = HTTPBearer()
+
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+):
+    """
+    Get current authenticated user from JWT token.
+    
+    The token's claims are checked against the user's current status, so a
+    deactivated user or a revoked token is rejected and is_admin reflects
+    the latest role rather than the one at login.
+    """
+    token = credentials.credentials
+    token_data = decode_token(token)
+    if not token_data:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    
+    status = UserService.get_user_status(db, token_data.user_id)
+    if not status.is_active:
+        raise HTTPException(status_code=401, detail="User account is disabled")
+    if status.tokens_revoked_at is not None and (
+        token_data.issued_at is None or token_data.issued_at < status.tokens_revoked_at
+    ):
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    if status.is_admin != token_data.is_admin:
+        # Cached TokenData is shared between requests, so never mutate it
+        token_data = TokenData(
+            user_id=token_data.user_id,
+            email=token_data.email,
+            is_admin=status.is_admin,
+            issued_at=token_data.issued_at,
+            expires_at=token_data.expires_at
+        )
+    return token_data
+
+
+def require_admin(current_user = Depends(get_current_user)):
+    """Verify current user is admin."""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
@@ -36,3 +36,8 @@ class DuplicateResourceException(SweetShopException):
 class InsufficientInventoryException(SweetShopException):
     """Raised when attempting to purchase more items than available."""
     pass
+
+
+class ServiceUnavailableException(SweetShopException):
+    """Raised when a bounded work queue is full and the request is shed."""
+    pass
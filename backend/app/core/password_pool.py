@@ -0,0 +1,134 @@
+"""
+Process pool for password hashing.
+Runs Argon2 hashing and verification in dedicated worker processes so a burst
+of logins neither blocks the event loop nor occupies the threadpool that
+serves catalog reads, and sheds load once too many hashes are waiting.
+"""
+
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Optional
+
+from app.core.exceptions import ServiceUnavailableException
+from app.core.security import hash_password, verify_password
+from app.config import settings
+
+
+class PasswordPool:
+    """
+    Bounded front door to a pool of Argon2 worker processes.
+    
+    At most max_pending hashes may be queued or running at once; further
+    requests are rejected immediately with ServiceUnavailableException (503)
+    instead of queuing behind work that would outlast their client's
+    timeout. Workers are spawned rather than forked, so they never inherit
+    the server's threads or open connections.
+    """
+    
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def pending(self) -> int:
+        """Hashes queued or running."""
+        return self._pending
+    
+    def start(self) -> None:
+        """Start the worker processes (also done lazily on first use)."""
+        with self._lock:
+            executor = self._ensure_executor()
+        # Spawn every worker now rather than on the first logins
+        for future in [executor.submit(int) for _ in range(self.workers)]:
+            future.result()
+    
+    def shutdown(self) -> None:
+        """Stop the worker processes after finishing queued hashes."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+    
+    async def hash(self, password: str) -> str:
+        """
+        Hash a password on the pool.
+        
+        Args:
+            password: Plain text password
+        
+        Returns:
+            str: Argon2 hash
+        
+        Raises:
+            ServiceUnavailableException: If max_pending hashes are already waiting
+        """
+        return await asyncio.wrap_future(self._submit(hash_password, password))
+    
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """
+        Verify a password against its hash on the pool.
+        
+        Args:
+            password: Plain text password
+            hashed_password: Stored Argon2 hash
+        
+        Returns:
+            bool: True if the password matches
+        
+        Raises:
+            ServiceUnavailableException: If max_pending hashes are already waiting
+        """
+        return await asyncio.wrap_future(self._submit(verify_password, password, hashed_password))
+    
+    def submit_background_hash(self, password: str) -> Future:
+        """
+        Hash a password on the pool for work nobody is waiting on.
+        
+        Background hashes may only use half of max_pending, so they never
+        crowd out sign-ins.
+        
+        Args:
+            password: Plain text password
+        
+        Returns:
+            Future: Resolves to the Argon2 hash
+        
+        Raises:
+            ServiceUnavailableException: If the pool is too busy
+        """
+        return self._submit(hash_password, password, limit=self.max_pending // 2)
+    
+    def _submit(self, function: Callable, *args, limit: Optional[int] = None) -> Future:
+        with self._lock:
+            if self._pending >= (self.max_pending if limit is None else limit):
+                raise ServiceUnavailableException("Too many sign-ins in progress, please retry")
+            executor = self._ensure_executor()
+            self._pending += 1
+        try:
+            future = executor.submit(function, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+    
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        """Create the executor if needed; caller holds the lock."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+    
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+
+
+password_pool = PasswordPool(settings.password_hash_workers, settings.password_hash_max_pending)
@@ -3,24 +3,41 @@ Security and authentication module.
 Handles JWT token generation, validation, and password hashing.
 """
 
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from app.core.token_cache import token_cache
 from app.config import settings
 
 
 # Password hashing configuration
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__rounds=settings.password_hash_time_cost,
+    argon2__memory_cost=settings.password_hash_memory_cost_kib,
+    argon2__parallelism=settings.password_hash_parallelism
+)
 
 
 class TokenData:
     """Data class for JWT token payload."""
     
-    def __init__(self, user_id: int, email: str, is_admin: bool = False):
+    def __init__(
+        self,
+        user_id: int,
+        email: str,
+        is_admin: bool = False,
+        issued_at: Optional[float] = None,
+        expires_at: Optional[float] = None
+    ):
         self.user_id = user_id
         self.email = email
         self.is_admin = is_admin
+        self.issued_at = issued_at
+        self.expires_at = expires_at
 
 
 def hash_password(password: str) -> str:
@@ -50,6 +67,19 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    Whether a stored hash was made with other than the configured Argon2 costs.
+    
+    Args:
+        hashed_password: Previously hashed password
+        
+    Returns:
+        bool: True if the hash should be replaced at the next successful login
+    """
+    return pwd_context.needs_update(hashed_password)
+
+
 def create_access_token(
     user_id: int,
     email: str,
@@ -77,7 +107,8 @@ def create_access_token(
         "email": email,
         "is_admin": is_admin,
         "exp": expire,
-        "iat": datetime.utcnow()
+        # Fractional, so revocations can tell apart tokens from the same second
+        "iat": time.time()
     }
     
     encoded_jwt = jwt.encode(
@@ -93,15 +124,47 @@ def decode_token(token: str) -> Optional[TokenData]:
     """
     Decode and validate a JWT token.
     
+    Verified tokens are cached until they expire, so repeat requests with
+    the same token skip signature and claim checks. Tokens revoked with
+    revoke_user_tokens are rejected whether cached or not.
+    
     Args:
         token: JWT token string
         
     Returns:
-        TokenData: Decoded token data, or None if invalid
-        
-    Raises:
-        JWTError: If token is invalid or expired
+        TokenData: Decoded token data, or None if invalid or revoked
     """
+    if not settings.token_cache_enabled:
+        token_data = _verify_token(token)
+    else:
+        key = token_cache.key(token)
+        token_data = token_cache.get(key)
+        if token_data is None:
+            token_data = _verify_token(token)
+            if token_data is not None:
+                token_cache.set(key, token_data)
+    
+    if token_data is None or token_cache.is_revoked(token_data):
+        return None
+    return token_data
+
+
+def revoke_user_tokens(user_id: int, revoked_at: Optional[float] = None) -> None:
+    """
+    Reject every token issued to a user so far (in this process).
+    
+    Other workers learn of a revocation from the watermark UserService
+    stores in the database.
+    
+    Args:
+        user_id: User whose tokens are revoked
+        revoked_at: Watermark in epoch seconds (default: now)
+    """
+    token_cache.revoke_user(user_id, revoked_at)
+
+
+def _verify_token(token: str) -> Optional[TokenData]:
+    """Check a token's signature and claims with python-jose."""
     try:
         payload = jwt.decode(
             token,
@@ -116,7 +179,13 @@ def decode_token(token: str) -> Optional[TokenData]:
         if user_id is None or email is None:
             return None
             
-        return TokenData(user_id=user_id, email=email, is_admin=is_admin)
+        return TokenData(
+            user_id=user_id,
+            email=email,
+            is_admin=is_admin,
+            issued_at=payload.get("iat"),
+            expires_at=payload.get("exp")
+        )
     
     except JWTError:
         return None
@@ -0,0 +1,100 @@
+"""
+Cache of verified JWTs.
+Clients send the same bearer token on every request, so the result of
+verifying it is kept until the token expires, together with per-user
+revocation watermarks that reject tokens issued before a revocation.
+"""
+
+import hashlib
+import threading
+import time
+from typing import Any, Optional
+
+from app.core.cache import TTLCache
+from app.config import settings
+
+
+class TokenCache:
+    """
+    Bounded LRU of decoded tokens, keyed by a digest of the raw token.
+    
+    An entry lives no longer than its token's exp (and max_ttl_seconds),
+    and hits re-check exp against the wall clock, so an expired token is
+    never served. Revocation is a per-user watermark: a token issued
+    before the watermark is rejected whether it was cached or freshly
+    decoded. Watermarks kept here cover this process only; the durable
+    one in token_revocations reaches other workers through the user
+    status cache.
+    """
+    
+    def __init__(self, max_entries: int, max_ttl_seconds: float):
+        self.max_ttl_seconds = max_ttl_seconds
+        self._cache = TTLCache("verified_tokens", max_entries=max_entries)
+        self._revoked: dict[int, float] = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def key(token: str) -> bytes:
+        """Digest a token so raw credentials are not kept in memory."""
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+    
+    def get(self, key: bytes) -> Optional[Any]:
+        """
+        Cached token data, or None if absent or expired.
+        
+        Args:
+            key: Digest from key()
+        
+        Returns:
+            TokenData: Decoded token, not yet checked for revocation
+        """
+        token_data = self._cache.get(key)
+        if token_data is not None and token_data.expires_at is not None and token_data.expires_at <= time.time():
+            self._cache.pop(key)
+            return None
+        return token_data
+    
+    def set(self, key: bytes, token_data: Any) -> None:
+        """
+        Cache a verified token until it expires.
+        
+        Args:
+            key: Digest from key()
+            token_data: Decoded token with expires_at (epoch seconds)
+        """
+        ttl = self.max_ttl_seconds
+        if token_data.expires_at is not None:
+            ttl = min(ttl, token_data.expires_at - time.time())
+        if ttl > 0:
+            self._cache.set(key, token_data, ttl_seconds=ttl)
+    
+    def revoke_user(self, user_id: int, revoked_at: Optional[float] = None) -> None:
+        """
+        Reject every token issued to a user up to now.
+        
+        Args:
+            user_id: User whose tokens are revoked
+            revoked_at: Watermark in epoch seconds (default: now)
+        """
+        now = time.time() if revoked_at is None else revoked_at
+        horizon = now - settings.access_token_expire_minutes * 60
+        with self._lock:
+            # Watermarks older than any live token no longer matter
+            self._revoked = {uid: mark for uid, mark in self._revoked.items() if mark > horizon}
+            self._revoked[user_id] = now
+    
+    def is_revoked(self, token_data: Any) -> bool:
+        """Whether a token was issued before its user's revocation watermark."""
+        mark = self._revoked.get(token_data.user_id)
+        if mark is None:
+            return False
+        return token_data.issued_at is None or token_data.issued_at < mark
+    
+    def clear(self) -> None:
+        """Forget cached tokens and revocations (tests)."""
+        self._cache.clear()
+        with self._lock:
+            self._revoked = {}
+
+
+token_cache = TokenCache(settings.token_cache_max_entries, settings.token_cache_max_ttl_seconds)
@@ -0,0 +1,141 @@
+"""
+Background worker primitives.
+Provides a queue drained in batches by one worker thread, and a slot for the
+process-wide instance of a worker started with the application.
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+
+class BatchWorker:
+    """
+    Queue drained in batches by a single worker thread.
+    
+    The worker blocks for the first item, then gathers more until
+    max_batch_size items are in hand or max_wait seconds have passed, and
+    hands the batch to process(). stop() processes everything already
+    queued before the thread exits. Subclasses implement process() and
+    must not let it raise.
+    """
+    
+    _STOP = object()
+    
+    def __init__(
+        self,
+        name: str,
+        max_batch_size: int,
+        max_wait_seconds: float,
+        max_queue_size: int = 0
+    ):
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_seconds
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._worker: Optional[threading.Thread] = None
+    
+    def start(self) -> None:
+        """Start the worker thread."""
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._worker.start()
+    
+    def stop(self) -> None:
+        """Process everything already queued, then stop the worker thread."""
+        if self._worker is not None:
+            self._queue.put(self._STOP)
+            self._worker.join()
+            self._worker = None
+    
+    def put(self, item: Any) -> None:
+        """
+        Queue an item for the next batch without blocking.
+        
+        Raises:
+            queue.Full: If the queue is at max_queue_size
+        """
+        self._queue.put_nowait(item)
+    
+    def process(self, batch: list) -> None:
+        """Handle one batch of queued items."""
+        raise NotImplementedError
+    
+    def _collect(self) -> tuple[list, bool]:
+        """Block for the first item, then gather more until size or time runs out."""
+        first = self._queue.get()
+        if first is self._STOP:
+            return [], True
+        
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is self._STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+    
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = self._collect()
+            if batch:
+                self.process(batch)
+        
+        # Drain anything that raced with stop()
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not self._STOP:
+                leftovers.append(item)
+        if leftovers:
+            self.process(leftovers)
+
+
+# A worker class with start() and stop()
+W = TypeVar("W")
+
+
+class WorkerSlot(Generic[W]):
+    """
+    The process-wide instance of a background worker.
+    
+    Started at application startup when its setting enables it, and
+    stopped at shutdown; current is None whenever the worker is not running.
+    """
+    
+    def __init__(self):
+        self.current: Optional[W] = None
+    
+    def start(self, enabled: bool, create: Callable[[], W]) -> Optional[W]:
+        """
+        Create and start the worker if enabled and not already running.
+        
+        Args:
+            enabled: Whether settings enable this worker
+            create: Builds the worker from settings
+        
+        Returns:
+            W: The running worker, or None when disabled
+        """
+        if enabled and self.current is None:
+            self.current = create()
+            self.current.start()
+        return self.current
+    
+    def stop(self) -> None:
+        """Stop the running worker, if any."""
+        if self.current is not None:
+            self.current.stop()
+            self.current = None
@@ -60,8 +60,14 @@ def init_db():
     """
     Initialize database by creating all tables.
     Must be called after all models are defined.
+    
+    Indexes added to existing tables since they were created are created
+    too, since create_all only builds indexes along with new tables.
     """
     Base.metadata.create_all(bind=engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
 
 
 def drop_db():
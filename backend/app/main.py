@@ -7,9 +7,18 @@ from fastapi import FastAPI, Request, status
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
-from app.database import init_db
+from app.database import init_db, SessionLocal, engine
 from app.core.exceptions import SweetShopException, DuplicateResourceException
+from app.core.cache import cache_stats
 from app.routers import auth, sweets
+from app.core.password_pool import password_pool
+from app.services.password_rehasher import start_password_rehasher, stop_password_rehasher
+from app.services.purchase_batcher import start_purchase_batcher, stop_purchase_batcher
+from app.services.reservation_service import start_reservation_sweeper, stop_reservation_sweeper
+from app.services.idempotency_service import IdempotencyService
+from app.services.name_index import setup_name_search
+from app.services.suggest_index import suggest_index
+from app.services.sweet_cache import sweet_cache, start_sweet_cache_broadcast, stop_sweet_cache_broadcast
 from contextlib import asynccontextmanager
 
 
@@ -17,7 +26,22 @@ from contextlib import asynccontextmanager
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
+    with SessionLocal() as db:
+        IdempotencyService.purge_expired(db)
+    setup_name_search(engine)
+    with SessionLocal() as db:
+        suggest_index.load(db)
+    password_pool.start()
+    start_password_rehasher(SessionLocal)
+    start_purchase_batcher(SessionLocal)
+    start_reservation_sweeper(SessionLocal)
+    start_sweet_cache_broadcast(engine)
     yield
+    stop_sweet_cache_broadcast()
+    stop_reservation_sweeper()
+    stop_purchase_batcher()
+    stop_password_rehasher()
+    password_pool.shutdown()
 
 
 # Create FastAPI app
@@ -50,6 +74,8 @@ async def sweet_shop_exception_handler(request: Request, exc: SweetShopException
         status_code = status.HTTP_403_FORBIDDEN
     elif exc.__class__.__name__ == "ResourceNotFoundException":
         status_code = status.HTTP_404_NOT_FOUND
+    elif exc.__class__.__name__ == "ServiceUnavailableException":
+        status_code = status.HTTP_503_SERVICE_UNAVAILABLE
     
     return JSONResponse(
         status_code=status_code,
@@ -66,6 +92,15 @@ async def health_check():
     """Health check endpoint for monitoring."""
     return {"status": "healthy", "version": settings.app_version}
 
+
+@app.get("/health/cache", tags=["Health"])
+async def cache_health():
+    """Hit, miss and eviction counters of the in-process caches, and broadcast health."""
+    stats = cache_stats()
+    if sweet_cache.bus is not None:
+        stats["sweet_cache_broadcast"] = sweet_cache.bus.stats()
+    return stats
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,7 @@
+"""
+SQLAlchemy ORM models.
+Importing any one model module loads them all, so foreign keys and
+relationships between tables resolve whichever model a script imports.
+"""
+
+from app.models import idempotency, sweet, user  # noqa: F401
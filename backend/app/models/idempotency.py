@@ -0,0 +1,29 @@
+"""
+SQLAlchemy ORM models for idempotent request handling.
+"""
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, UniqueConstraint
+from datetime import datetime
+from app.database import Base
+
+
+class IdempotencyRecord(Base):
+    """Stored outcome of a request made with an Idempotency-Key header."""
+    
+    __tablename__ = "idempotency_records"
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_idempotency_records_user_key"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)
+    key = Column(String(255), nullable=False)
+    fingerprint = Column(String(64), nullable=False)
+    state = Column(String(16), default="pending", nullable=False)
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<IdempotencyRecord(user_id={self.user_id}, key='{self.key}', state='{self.state}')>"
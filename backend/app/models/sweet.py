@@ -2,7 +2,7 @@
 SQLAlchemy ORM models for the Sweet Shop Management System.
 """
 
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, func
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -12,6 +12,13 @@ class Sweet(Base):
     """Sweet product model for inventory management."""
     
     __tablename__ = "sweets"
+    __table_args__ = (
+        # Keyset orderings: each sort key ends with id so a page is one index range
+        Index("ix_sweets_price_id", "price", "id"),
+        Index("ix_sweets_category_price_id", "category", "price", "id"),
+        Index("ix_sweets_created_at_id", "created_at", "id"),
+        Index("ix_sweets_quantity_id", "quantity", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True, nullable=False)
@@ -25,6 +32,8 @@ class Sweet(Base):
     
     # Relationships
     purchases = relationship("Purchase", back_populates="sweet", cascade="all, delete-orphan")
+    stock_shards = relationship("SweetStockShard", back_populates="sweet", cascade="all, delete-orphan")
+    reservations = relationship("StockReservation", back_populates="sweet", cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<Sweet(id={self.id}, name='{self.name}', price={self.price}, quantity={self.quantity})>"
@@ -45,7 +54,8 @@ class Purchase(Base):
     # Foreign keys with relationship
     from sqlalchemy import ForeignKey
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    sweet_id = Column(Integer, ForeignKey("sweets.id"), nullable=False)
+    # Indexed for per-sweet sales totals and history
+    sweet_id = Column(Integer, ForeignKey("sweets.id"), nullable=False, index=True)
     
     # Relationships
     user = relationship("User", back_populates="purchases")
@@ -53,3 +63,42 @@ class Purchase(Base):
     
     def __repr__(self):
         return f"<Purchase(id={self.id}, user_id={self.user_id}, sweet_id={self.sweet_id}, quantity={self.quantity})>"
+
+
+class SweetStockShard(Base):
+    """Stock counter shard for sweets in sharded inventory mode."""
+    
+    __tablename__ = "sweet_stock_shards"
+    
+    sweet_id = Column(Integer, ForeignKey("sweets.id", ondelete="CASCADE"), primary_key=True)
+    shard_no = Column(Integer, primary_key=True)
+    quantity = Column(Integer, default=0, nullable=False)
+    
+    # Relationships
+    sweet = relationship("Sweet", back_populates="stock_shards")
+    
+    def __repr__(self):
+        return f"<SweetStockShard(sweet_id={self.sweet_id}, shard_no={self.shard_no}, quantity={self.quantity})>"
+
+
+class StockReservation(Base):
+    """Temporary stock hold placed while a customer completes payment."""
+    
+    __tablename__ = "stock_reservations"
+    __table_args__ = (
+        Index("ix_stock_reservations_status_expires_at", "status", "expires_at"),
+    )
+    
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    sweet_id = Column(Integer, ForeignKey("sweets.id", ondelete="CASCADE"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    status = Column(String(16), default="held", nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Relationships
+    sweet = relationship("Sweet", back_populates="reservations")
+    
+    def __repr__(self):
+        return f"<StockReservation(id='{self.id}', sweet_id={self.sweet_id}, quantity={self.quantity}, status='{self.status}')>"
@@ -2,7 +2,7 @@
 SQLAlchemy ORM models for the Sweet Shop Management System.
 """
 
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, func
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, func
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -26,4 +26,17 @@ class User(Base):
     purchases = relationship("Purchase", back_populates="user", cascade="all, delete-orphan")
     
     def __repr__(self):
-        return f"<User(id={self.id}, email='{self.email}', is_admin={self.is_admin})>"
\ No newline at end of file
+        return f"<User(id={self.id}, email='{self.email}', is_admin={self.is_admin})>"
+
+
+class TokenRevocation(Base):
+    """Per-user watermark: access tokens issued before it are rejected."""
+    
+    __tablename__ = "token_revocations"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    # Epoch seconds, compared with the token's iat claim
+    revoked_at = Column(Float, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<TokenRevocation(user_id={self.user_id}, revoked_at={self.revoked_at})>"
\ No newline at end of file
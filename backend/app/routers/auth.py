@@ -3,12 +3,23 @@ Authentication router for user registration and login endpoints.
 Handles JWT token generation and user authentication.
 """
 
-from fastapi import APIRouter, Depends, status
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.schemas.user import UserRegisterRequest, UserLoginRequest, UserResponse, TokenResponse, AuthResponse
+from app.schemas.user import (
+    UserRegisterRequest,
+    UserLoginRequest,
+    UserResponse,
+    TokenResponse,
+    AuthResponse,
+    UserImportReport
+)
 from app.services.user_service import UserService
-from app.core.exceptions import DuplicateResourceException, AuthenticationException
+from app.services.user_import import CONTENT_TYPES, FORMATS, read_stream_lines, user_import
+from app.core.exceptions import DuplicateResourceException, AuthenticationException, ValidationException
+from app.core.dependencies import require_admin
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
@@ -21,10 +32,11 @@ router = APIRouter(prefix="/api/auth", tags=["Authentication"])
     responses={
         201: {"description": "User registered successfully"},
         400: {"description": "User already exists"},
-        422: {"description": "Validation error"}
+        422: {"description": "Validation error"},
+        503: {"description": "Too many sign-ins in progress"}
     }
 )
-def register(request: UserRegisterRequest, db: Session = Depends(get_db)):
+async def register(request: UserRegisterRequest, db: Session = Depends(get_db)):
     """
     Register a new user with email and password.
     
@@ -37,9 +49,10 @@ def register(request: UserRegisterRequest, db: Session = Depends(get_db)):
         
     Raises:
         DuplicateResourceException: If email already registered
+        ServiceUnavailableException: If too many passwords are being hashed (503)
     """
     try:
-        user = UserService.register(db, request)
+        user = await UserService.register(db, request)
         return AuthResponse(
             message="User registered successfully",
             user=UserResponse.model_validate(user)
@@ -56,10 +69,11 @@ def register(request: UserRegisterRequest, db: Session = Depends(get_db)):
     responses={
         200: {"description": "Login successful"},
         401: {"description": "Invalid credentials"},
-        422: {"description": "Validation error"}
+        422: {"description": "Validation error"},
+        503: {"description": "Too many sign-ins in progress"}
     }
 )
-def login(request: UserLoginRequest, db: Session = Depends(get_db)):
+async def login(request: UserLoginRequest, db: Session = Depends(get_db)):
     """
     Authenticate user and return JWT access token.
     
@@ -72,9 +86,10 @@ def login(request: UserLoginRequest, db: Session = Depends(get_db)):
         
     Raises:
         AuthenticationException: If credentials are invalid
+        ServiceUnavailableException: If too many passwords are being hashed (503)
     """
     try:
-        user, token = UserService.login(db, request)
+        user, token = await UserService.login(db, request)
         return TokenResponse(
             access_token=token,
             token_type="bearer",
@@ -82,3 +97,93 @@ def login(request: UserLoginRequest, db: Session = Depends(get_db)):
         )
     except AuthenticationException as e:
         raise e
+
+
+@router.post(
+    "/users/{user_id}/revoke-tokens",
+    response_model=AuthResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Revoke a user's access tokens (admin only)",
+    responses={
+        200: {"description": "Tokens revoked"},
+        403: {"description": "Admin access required"},
+        404: {"description": "User not found"}
+    },
+    dependencies=[Depends(require_admin)]
+)
+def revoke_tokens(user_id: int, db: Session = Depends(get_db)):
+    """
+    Reject every token issued to a user until now; they must log in again.
+    
+    Takes effect at once in the worker handling this request and, through
+    the stored watermark, in every other worker within
+    user_status_ttl_seconds. It also survives restarts.
+    
+    Args:
+        user_id: User whose tokens are revoked
+        db: Database session
+        
+    Returns:
+        AuthResponse: Confirmation with the user's details
+        
+    Raises:
+        ResourceNotFoundException: If user not found
+    """
+    user = UserService.revoke_tokens(db, user_id)
+    return AuthResponse(
+        message="Tokens revoked",
+        user=UserResponse.model_validate(user)
+    )
+
+
+@router.post(
+    "/users/import",
+    response_model=UserImportReport,
+    status_code=status.HTTP_200_OK,
+    summary="Bulk import users from NDJSON or CSV (admin only)",
+    responses={
+        200: {"description": "Import finished; rejected rows are listed in errors"},
+        400: {"description": "Unsupported format or unusable CSV header"},
+        403: {"description": "Admin access required"},
+        503: {"description": "Another import is running"}
+    },
+    dependencies=[Depends(require_admin)]
+)
+async def import_users(
+    request: Request,
+    file_format: Optional[str] = Query(None, alias="format", description="ndjson or csv (default: from Content-Type)"),
+    db: Session = Depends(get_db)
+):
+    """
+    Create users from a streamed NDJSON or CSV body.
+    
+    Each row has email, full_name and password (a CSV needs a header line).
+    Rows are inserted in batches with passwords hashed on every core; bad or
+    duplicate rows are reported with their line number and skipped.
+    
+    Args:
+        request: Request whose body is streamed
+        file_format: Overrides the format implied by Content-Type
+        db: Database session
+        
+    Returns:
+        UserImportReport: Created and failed counts with per-row errors
+        
+    Raises:
+        ValidationException: If the format is unknown or the CSV header is unusable
+        ServiceUnavailableException: If another import is running
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    file_format = file_format or CONTENT_TYPES.get(content_type)
+    if file_format not in FORMATS:
+        raise ValidationException(
+            "Send the users as application/x-ndjson or text/csv, or pass format=ndjson|csv"
+        )
+    
+    def run_import():
+        # One feed() over the whole body, so quoted CSV fields may span lines
+        with user_import(db, file_format) as importer:
+            importer.feed(read_stream_lines(request.stream()))
+            return importer.finish()
+    
+    return await run_in_threadpool(run_import)
@@ -3,10 +3,15 @@ Sweet products and inventory management router.
 Handles CRUD operations, search, and inventory transactions.
 """
 
-from fastapi import APIRouter, Depends, status, HTTPException
+from typing import Awaitable, Callable, Literal, Optional
+from fastapi import APIRouter, Depends, Header, Query, status, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.core.security import decode_token
+from app.core.dependencies import get_current_user, require_admin
+from app.core.conditional import catalog_etag, etag_matches, not_modified, validator_headers
 from app.core.exceptions import (
     ResourceNotFoundException,
     AuthorizationException,
@@ -18,31 +23,69 @@ from app.schemas.sweet import (
     SweetResponse,
     SweetListResponse,
     SweetSearchRequest,
+    SweetSort,
+    SuggestResponse,
     PurchaseRequest,
     RestockRequest,
+    ShardConfigRequest,
+    CheckoutRequest,
+    CheckoutResponse,
+    PurchaseResponse,
+    ReservationRequest,
+    ReservationResponse,
     OperationResponse
 )
 from app.services.sweet_service import SweetService, InventoryService
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from app.services.sweet_rows import encode_list_response, encode_sweet, encode_sweets
+from app.services.purchase_batcher import get_purchase_batcher
+from app.services.stock_shards import StockShardService
+from app.services.reservation_service import ReservationService
+from app.services.idempotency_service import IdempotencyService
 
 router = APIRouter(prefix="/api/sweets", tags=["Sweets"])
-security = HTTPBearer()
 
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Get current authenticated user from JWT token."""
-    token = credentials.credentials
-    token_data = decode_token(token)
-    if not token_data:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
-    return token_data
-
-
-def require_admin(current_user = Depends(get_current_user)):
-    """Verify current user is admin."""
-    if not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Admin access required")
-    return current_user
+async def _run_idempotent(
+    db: Session,
+    user_id: int,
+    idempotency_key: Optional[str],
+    fingerprint: str,
+    operation: Callable[[Optional[int]], Awaitable[BaseModel]]
+):
+    """
+    Run an operation at most once per (user, Idempotency-Key).
+    
+    Without a key the operation simply runs. With a key, a stored response
+    is replayed as-is; otherwise the operation runs and its successful
+    response is stored. Failures are not stored, so they can be retried.
+    The operation receives the claimed record ID (None without a key) and
+    must mark it applied in the transaction that commits its changes.
+    Idempotency bookkeeping runs in the threadpool; the operation is
+    awaited, so it may wait on a batch without holding a thread.
+    """
+    if idempotency_key is None:
+        return await operation(None)
+    
+    stored = await run_in_threadpool(IdempotencyService.begin, db, user_id, idempotency_key, fingerprint)
+    if stored is not None:
+        return Response(
+            content=stored.body,
+            status_code=stored.status_code,
+            media_type="application/json",
+            headers={"Idempotent-Replayed": "true"}
+        )
+    
+    try:
+        result = await operation(IdempotencyService.claimed_record(user_id, idempotency_key))
+    except BaseException:
+        await run_in_threadpool(IdempotencyService.abandon, db, user_id, idempotency_key)
+        raise
+    
+    await run_in_threadpool(
+        IdempotencyService.complete,
+        db, user_id, idempotency_key, status.HTTP_200_OK, result.model_dump_json()
+    )
+    return result
 
 
 @router.post(
@@ -79,30 +122,80 @@ def create_sweet(
     dependencies=[Depends(get_current_user)]
 )
 def list_sweets(
-    skip: int = 0,
-    limit: int = 100,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = None,
+    count_mode: Literal["exact", "estimated"] = "exact",
+    sort: SweetSort = "id",
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match")
 ):
     """
     Retrieve paginated list of all sweets.
     
+    The ETag is derived from the catalog version and the query, so a
+    client revalidating with If-None-Match gets a 304 without any database
+    read while nothing has changed. Bodies are served pre-serialized from
+    the list response cache.
+    
     Args:
-        skip: Number of records to skip
+        skip: Number of records to skip (prefer cursor for deep pages)
         limit: Maximum records to return
+        cursor: next_cursor from the previous page
+        include_total: Count all sweets (defaults to the first page only)
+        count_mode: "estimated" allows a planner estimate for the total
+        sort: Result order (price_asc, price_desc, name, newest, quantity or id)
         current_user: Authenticated user
         db: Database session
+        if_none_match: ETag of the client's cached copy
         
     Returns:
-        SweetListResponse: List of sweets with total count
+        SweetListResponse: List of sweets with total count and next cursor
+            (empty 304 if the client's copy is current)
     """
-    total, sweets = SweetService.list_all_sweets(db, skip, limit)
-    return SweetListResponse(
-        total=total,
-        sweets=[SweetResponse.model_validate(s) for s in sweets]
+    etag = catalog_etag("list", skip, limit, cursor, include_total, count_mode, sort)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    
+    page = SweetService.list_sweets_json(db, skip, limit, cursor, include_total, count_mode, sort)
+    return Response(
+        content=page.body,
+        media_type="application/json",
+        headers=validator_headers(etag, page.last_modified)
     )
 
 
+@router.get(
+    "/suggest",
+    response_model=SuggestResponse,
+    summary="Autocomplete sweet names and categories",
+    dependencies=[Depends(get_current_user)]
+)
+def suggest_sweets(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    rank: Literal["popularity", "stock"] = "popularity",
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Suggest completions for a partially typed search.
+    
+    Args:
+        q: Text typed so far (matches the start of a name or of any word in it)
+        limit: Maximum sweets and categories to return
+        rank: Order sweets by units sold or by units in stock
+        current_user: Authenticated user
+        db: Database session
+        
+    Returns:
+        SuggestResponse: Ranked sweet and category completions
+    """
+    return SweetService.suggest_sweets(db, q, limit, rank)
+
+
 @router.get(
     "/{sweet_id}",
     response_model=SweetResponse,
@@ -112,7 +205,8 @@ def list_sweets(
 def get_sweet(
     sweet_id: int,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match")
 ):
     """
     Retrieve a specific sweet by ID.
@@ -121,12 +215,20 @@ def get_sweet(
         sweet_id: Sweet ID
         current_user: Authenticated user
         db: Database session
+        if_none_match: ETag of the client's cached copy
         
     Returns:
-        SweetResponse: Sweet details
+        SweetResponse: Sweet details (served from the per-process record
+            cache), or an empty 304 if the client's copy is current
     """
-    sweet = SweetService.get_sweet_by_id(db, sweet_id)
-    return SweetResponse.model_validate(sweet)
+    record = SweetService.get_sweet_record(db, sweet_id)
+    if etag_matches(if_none_match, record.etag):
+        return not_modified(record.etag, record.last_modified)
+    return Response(
+        content=record.body,
+        media_type="application/json",
+        headers=validator_headers(record.etag, record.last_modified)
+    )
 
 
 @router.post(
@@ -149,15 +251,51 @@ def search_sweets(
         db: Database session
         
     Returns:
-        SweetListResponse: Matching sweets
+        SweetListResponse: Matching sweets with next cursor (and facets if requested)
     """
-    total, sweets = SweetService.search_sweets(db, request)
-    return SweetListResponse(
-        total=total,
-        sweets=[SweetResponse.model_validate(s) for s in sweets]
+    page = SweetService.search_sweets(db, request)
+    return Response(
+        content=encode_list_response(page, encode_sweets(page.items)),
+        media_type="application/json"
     )
 
 
+@router.post(
+    "/search/stream",
+    summary="Stream all matching sweets as NDJSON",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+    dependencies=[Depends(get_current_user)]
+)
+def stream_search_sweets(
+    request: SweetSearchRequest,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream every sweet matching a search, one JSON object per line.
+    
+    The response is written chunk by chunk as rows are read, so memory stays
+    flat however many sweets match. limit, include_total and facets are
+    ignored; cursor resumes after the sweet it names.
+    
+    Args:
+        request: Search parameters
+        current_user: Authenticated user
+        db: Database session
+        
+    Returns:
+        StreamingResponse: NDJSON body of SweetResponse objects in sort order
+    """
+    chunks = SweetService.stream_search(db, request)
+    
+    def lines():
+        for rows in chunks:
+            yield b"".join(encode_sweet(row) + b"\n" for row in rows)
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.put(
     "/{sweet_id}",
     response_model=SweetResponse,
@@ -221,28 +359,40 @@ def delete_sweet(
     summary="Purchase sweet",
     dependencies=[Depends(get_current_user)]
 )
-def purchase_sweet(
+async def purchase_sweet(
     sweet_id: int,
     request: PurchaseRequest,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
 ):
     """
     Purchase sweets and create purchase record.
     
+    Retries sent with the same Idempotency-Key header replay the first
+    response instead of purchasing again. With purchase batching enabled
+    the request awaits its batch without occupying a worker thread.
+    
     Args:
         sweet_id: Sweet ID to purchase
         request: Purchase quantity
         current_user: Authenticated user
         db: Database session
+        idempotency_key: Optional client-chosen retry key
         
     Returns:
         OperationResponse: Purchase confirmation
     """
-    try:
-        purchase = InventoryService.purchase_sweet(
-            db, current_user.user_id, sweet_id, request
-        )
+    async def run_purchase(idempotency_record):
+        batcher = get_purchase_batcher()
+        if batcher is not None:
+            purchase = await batcher.purchase(
+                current_user.user_id, sweet_id, request.quantity, idempotency_record
+            )
+        else:
+            purchase = await run_in_threadpool(
+                InventoryService.purchase_sweet, db, current_user.user_id, sweet_id, request, idempotency_record
+            )
         return OperationResponse(
             success=True,
             message="Purchase successful",
@@ -252,33 +402,212 @@ def purchase_sweet(
                 "total_price": purchase.total_price
             }
         )
+    
+    try:
+        return await _run_idempotent(
+            db,
+            current_user.user_id,
+            idempotency_key,
+            IdempotencyService.fingerprint("purchase", sweet_id, request.model_dump_json()),
+            run_purchase
+        )
+    except InsufficientInventoryException as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post(
+    "/checkout",
+    response_model=CheckoutResponse,
+    summary="Purchase several sweets in one order",
+    dependencies=[Depends(get_current_user)]
+)
+def checkout(
+    request: CheckoutRequest,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Purchase every line of a cart in one transaction.
+    
+    Args:
+        request: Order lines (sweet_id, quantity)
+        current_user: Authenticated user
+        db: Database session
+        
+    Returns:
+        CheckoutResponse: Receipt with one purchase record per sweet
+    """
+    try:
+        purchases = InventoryService.checkout(db, current_user.user_id, request)
+        return CheckoutResponse(
+            success=True,
+            message="Checkout successful",
+            total_quantity=sum(p.quantity for p in purchases),
+            total_price=sum(p.total_price for p in purchases),
+            purchases=[PurchaseResponse.model_validate(p) for p in purchases]
+        )
     except InsufficientInventoryException as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post(
+    "/{sweet_id}/reserve",
+    response_model=ReservationResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Hold stock while payment runs",
+    dependencies=[Depends(get_current_user)]
+)
+def reserve_sweet(
+    sweet_id: int,
+    request: ReservationRequest,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Hold stock for the current user until confirmed, cancelled or expired.
+    
+    Args:
+        sweet_id: Sweet ID to hold
+        request: Quantity and optional hold lifetime
+        current_user: Authenticated user
+        db: Database session
+        
+    Returns:
+        ReservationResponse: Hold ID and expiry time
+    """
+    try:
+        hold = ReservationService.reserve(db, current_user.user_id, sweet_id, request)
+        return ReservationResponse.model_validate(hold)
+    except InsufficientInventoryException as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post(
+    "/reservations/{hold_id}/confirm",
+    response_model=OperationResponse,
+    summary="Turn a hold into a purchase",
+    dependencies=[Depends(get_current_user)]
+)
+def confirm_reservation(
+    hold_id: str,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Confirm a live hold, creating its purchase record.
+    
+    Args:
+        hold_id: Reservation ID
+        current_user: Authenticated user
+        db: Database session
+        
+    Returns:
+        OperationResponse: Purchase confirmation
+    """
+    purchase = ReservationService.confirm(db, current_user.user_id, hold_id)
+    return OperationResponse(
+        success=True,
+        message="Purchase successful",
+        data={
+            "purchase_id": purchase.id,
+            "quantity": purchase.quantity,
+            "total_price": purchase.total_price
+        }
+    )
+
+
+@router.post(
+    "/reservations/{hold_id}/cancel",
+    response_model=ReservationResponse,
+    summary="Release a hold",
+    dependencies=[Depends(get_current_user)]
+)
+def cancel_reservation(
+    hold_id: str,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Cancel a live hold and return its stock.
+    
+    Args:
+        hold_id: Reservation ID
+        current_user: Authenticated user
+        db: Database session
+        
+    Returns:
+        ReservationResponse: Cancelled reservation
+    """
+    hold = ReservationService.cancel(db, current_user.user_id, hold_id)
+    return ReservationResponse.model_validate(hold)
+
+
 @router.post(
     "/{sweet_id}/restock",
     response_model=SweetResponse,
     summary="Restock sweet (admin only)",
     dependencies=[Depends(require_admin)]
 )
-def restock_sweet(
+async def restock_sweet(
     sweet_id: int,
     request: RestockRequest,
     current_user = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
 ):
     """
     Restock a sweet product (admin-only endpoint).
     
+    Retries sent with the same Idempotency-Key header replay the first
+    response instead of adding the stock again.
+    
     Args:
         sweet_id: Sweet ID to restock
         request: Quantity to add
         current_user: Authenticated admin user
         db: Database session
+        idempotency_key: Optional client-chosen retry key
         
     Returns:
         SweetResponse: Updated sweet with new quantity
     """
-    sweet = InventoryService.restock_sweet(db, sweet_id, request)
+    def run_restock(idempotency_record):
+        return SweetResponse.model_validate(
+            InventoryService.restock_sweet(db, sweet_id, request, idempotency_record)
+        )
+    
+    return await _run_idempotent(
+        db,
+        current_user.user_id,
+        idempotency_key,
+        IdempotencyService.fingerprint("restock", sweet_id, request.model_dump_json()),
+        lambda idempotency_record: run_in_threadpool(run_restock, idempotency_record)
+    )
+
+
+@router.put(
+    "/{sweet_id}/shards",
+    response_model=SweetResponse,
+    summary="Configure sharded inventory (admin only)",
+    dependencies=[Depends(require_admin)]
+)
+def configure_shards(
+    sweet_id: int,
+    request: ShardConfigRequest,
+    current_user = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Split a hot sweet's stock over several counter rows (admin-only endpoint).
+    
+    Args:
+        sweet_id: Sweet ID to configure
+        request: Number of shards (0 returns the sweet to single-row stock)
+        current_user: Authenticated admin user
+        db: Database session
+        
+    Returns:
+        SweetResponse: Sweet with its total stock
+    """
+    sweet = StockShardService.configure(db, sweet_id, request.shard_count)
     return SweetResponse.model_validate(sweet)
@@ -5,7 +5,14 @@ Handles validation and serialization of sweet data.
 
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Literal, Optional, List
+
+
+# Result orderings shared by list and search
+SweetSort = Literal["id", "price_asc", "price_desc", "name", "newest", "quantity"]
+
+# Most units of one sweet a single purchase, hold or checkout line may take
+MAX_PURCHASE_QUANTITY = 1000
 
 
 # ==================== Request Schemas ====================
@@ -55,7 +62,7 @@ class SweetUpdateRequest(BaseModel):
 class PurchaseRequest(BaseModel):
     """Schema for purchasing sweets."""
     
-    quantity: int = Field(..., gt=0, le=1000, description="Quantity to purchase")
+    quantity: int = Field(..., gt=0, le=MAX_PURCHASE_QUANTITY, description="Quantity to purchase")
     
     model_config = ConfigDict(
         json_schema_extra = {
@@ -66,6 +73,60 @@ class PurchaseRequest(BaseModel):
     )
 
 
+class ReservationRequest(BaseModel):
+    """Schema for holding stock while payment runs."""
+    
+    quantity: int = Field(..., gt=0, le=MAX_PURCHASE_QUANTITY, description="Quantity to hold")
+    ttl_seconds: Optional[int] = Field(None, gt=0, description="Hold lifetime in seconds")
+    
+    model_config = ConfigDict(
+        json_schema_extra = {
+            "example": {
+                "quantity": 2,
+                "ttl_seconds": 300
+            }
+        }
+    )
+
+
+class ShardConfigRequest(BaseModel):
+    """Schema for configuring sharded inventory on a sweet."""
+    
+    shard_count: int = Field(..., ge=0, le=64, description="Number of stock counter rows (0 disables)")
+    
+    model_config = ConfigDict(
+        json_schema_extra = {
+            "example": {
+                "shard_count": 8
+            }
+        }
+    )
+
+
+class CheckoutItem(BaseModel):
+    """Schema for a single checkout line."""
+    
+    sweet_id: int = Field(..., gt=0, description="Sweet ID to purchase")
+    quantity: int = Field(..., gt=0, le=MAX_PURCHASE_QUANTITY, description="Quantity to purchase")
+
+
+class CheckoutRequest(BaseModel):
+    """Schema for purchasing several sweets in one order."""
+    
+    items: List[CheckoutItem] = Field(..., min_length=1, max_length=100, description="Order lines")
+    
+    model_config = ConfigDict(
+        json_schema_extra = {
+            "example": {
+                "items": [
+                    {"sweet_id": 1, "quantity": 2},
+                    {"sweet_id": 3, "quantity": 1}
+                ]
+            }
+        }
+    )
+
+
 class RestockRequest(BaseModel):
     """Schema for restocking sweets."""
     
@@ -84,10 +145,25 @@ class SweetSearchRequest(BaseModel):
     """Schema for searching sweets."""
     
     name: Optional[str] = Field(None, description="Search by sweet name")
+    fuzzy: bool = Field(False, description="Tolerate typos in name and rank matches by similarity")
     category: Optional[str] = Field(None, description="Filter by category")
     min_price: Optional[float] = Field(None, ge=0, description="Minimum price")
     max_price: Optional[float] = Field(None, ge=0, description="Maximum price")
     in_stock: Optional[bool] = Field(None, description="Only in-stock items")
+    sort: SweetSort = Field(
+        "id", description="Result order (fuzzy name searches are always ranked by similarity)"
+    )
+    limit: int = Field(100, ge=1, le=1000, description="Maximum results per page")
+    cursor: Optional[str] = Field(None, description="next_cursor from the previous page")
+    include_total: Optional[bool] = Field(
+        None, description="Count all matches (defaults to the first page only)"
+    )
+    count_mode: Literal["exact", "estimated"] = Field(
+        "exact", description="Allow a planner estimate for the total"
+    )
+    facets: bool = Field(
+        False, description="Also return category, price and availability counts for all matches"
+    )
     
     model_config = ConfigDict(
         json_schema_extra = {
@@ -133,17 +209,70 @@ class SweetResponse(BaseModel):
     )
 
 
+class PriceBucketFacet(BaseModel):
+    """Schema for one price histogram bucket."""
+    
+    min_price: float
+    max_price: Optional[float] = Field(None, description="Exclusive upper bound; None for the last bucket")
+    count: int
+
+
+class SearchFacets(BaseModel):
+    """Schema for search facet counts over all matching sweets."""
+    
+    categories: Dict[str, int]
+    price_buckets: List[PriceBucketFacet]
+    in_stock: int
+    out_of_stock: int
+
+
 class SweetListResponse(BaseModel):
     """Schema for sweet list response."""
     
-    total: int
+    total: Optional[int] = None
+    total_estimated: bool = False
     sweets: List[SweetResponse]
+    next_cursor: Optional[str] = None
+    facets: Optional[SearchFacets] = None
     
     model_config = ConfigDict(
         json_schema_extra = {
             "example": {
                 "total": 10,
-                "sweets": []
+                "total_estimated": False,
+                "sweets": [],
+                "next_cursor": "WyJpZCIsMTAwXQ"
+            }
+        }
+    )
+
+
+class SweetSuggestion(BaseModel):
+    """Schema for one sweet name completion."""
+    
+    id: int
+    name: str
+    category: str
+
+
+class CategorySuggestion(BaseModel):
+    """Schema for one category completion."""
+    
+    name: str
+    sweet_count: int
+
+
+class SuggestResponse(BaseModel):
+    """Schema for autocomplete suggestions."""
+    
+    sweets: List[SweetSuggestion]
+    categories: List[CategorySuggestion]
+    
+    model_config = ConfigDict(
+        json_schema_extra = {
+            "example": {
+                "sweets": [{"id": 1, "name": "Chocolate Truffle", "category": "Chocolate"}],
+                "categories": [{"name": "Chocolate", "sweet_count": 12}]
             }
         }
     )
@@ -174,6 +303,53 @@ class PurchaseResponse(BaseModel):
     )
 
 
+class ReservationResponse(BaseModel):
+    """Schema for a stock reservation."""
+    
+    id: str
+    sweet_id: int
+    quantity: int
+    status: str
+    expires_at: datetime
+    created_at: datetime
+    
+    model_config = ConfigDict(
+        from_attributes = True,
+        json_schema_extra = {
+            "example": {
+                "id": "5f0c6a3e2b8d4c1f9a7e6d5c4b3a2910",
+                "sweet_id": 1,
+                "quantity": 2,
+                "status": "held",
+                "expires_at": "2024-01-01T00:05:00",
+                "created_at": "2024-01-01T00:00:00"
+            }
+        }
+    )
+
+
+class CheckoutResponse(BaseModel):
+    """Schema for a checkout receipt."""
+    
+    success: bool
+    message: str
+    total_quantity: int
+    total_price: float
+    purchases: List[PurchaseResponse]
+    
+    model_config = ConfigDict(
+        json_schema_extra = {
+            "example": {
+                "success": True,
+                "message": "Checkout successful",
+                "total_quantity": 3,
+                "total_price": 17.97,
+                "purchases": []
+            }
+        }
+    )
+
+
 class OperationResponse(BaseModel):
     """Schema for successful operation response."""
     
@@ -91,4 +91,21 @@ class AuthResponse(BaseModel):
     
     message: str
     token: Optional[TokenResponse] = None
-    user: Optional[UserResponse] = None
\ No newline at end of file
+    user: Optional[UserResponse] = None
+
+
+class UserImportError(BaseModel):
+    """Schema for one rejected row of a bulk user import."""
+    
+    line: int = Field(..., description="Line number in the uploaded file (1-based, header included)")
+    email: Optional[str] = None
+    detail: str
+
+
+class UserImportReport(BaseModel):
+    """Schema for the outcome of a bulk user import."""
+    
+    created: int = Field(..., description="Users created")
+    failed: int = Field(..., description="Rows rejected")
+    errors: list[UserImportError] = Field(default_factory=list, description="Rejected rows, up to the reporting limit")
+    errors_truncated: bool = Field(False, description="Whether more rows failed than are listed")
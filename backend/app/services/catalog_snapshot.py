@@ -0,0 +1,271 @@
+"""
+Columnar in-memory snapshot of the sweets catalog.
+Holds the filterable columns as NumPy arrays so category, price and stock
+filters run as vectorized masks, and only the matching rows are loaded
+through the ORM.
+"""
+
+import threading
+from typing import Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models.sweet import Sweet
+from app.core.cache import IndexReloader
+from app.core.catalog import catalog_version
+from app.config import settings
+
+
+class CatalogColumns:
+    """
+    Parallel arrays for the sweets table, sorted by ID, with their category table.
+    
+    Immutable once built: the arrays are read-only and a patch builds a new
+    object, so a reader holding one reference always sees a consistent
+    catalog without taking the snapshot's lock.
+    """
+    
+    def __init__(
+        self,
+        ids,
+        prices,
+        quantities,
+        category_codes,
+        alive=None,
+        categories: Sequence[str] = (),
+        category_index: Optional[dict[str, int]] = None
+    ):
+        self.ids = ids
+        self.prices = prices
+        self.quantities = quantities
+        self.category_codes = category_codes
+        self.alive = np.ones(len(ids), dtype=bool) if alive is None else alive
+        self.categories = tuple(categories)
+        self.category_index = (
+            {category: code for code, category in enumerate(self.categories)}
+            if category_index is None else category_index
+        )
+        for array in (self.ids, self.prices, self.quantities, self.category_codes, self.alive):
+            array.flags.writeable = False
+    
+    def positions(self, sweet_ids) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Locate sweet IDs in the arrays.
+        
+        Returns:
+            tuple: (Positions of the IDs that are present, mask of which input IDs were found)
+        """
+        sweet_ids = np.asarray(sweet_ids, dtype=np.int64)
+        positions = np.searchsorted(self.ids, sweet_ids)
+        found = positions < len(self.ids)
+        found[found] = self.ids[positions[found]] == sweet_ids[found]
+        return positions[found], found
+
+
+class CatalogSnapshot:
+    """
+    Process-local columnar copy of the sweets table.
+    
+    Rows are kept sorted by ID in parallel arrays (id, price, quantity,
+    category code) with categories interned into a string table. Writes
+    made through the services mark their sweet IDs dirty via the catalog
+    version listeners; the next search re-reads just those rows and
+    swaps in patched copies of the arrays. A background reload after a TTL
+    picks up writes made by other worker processes.
+    """
+    
+    def __init__(self, refresh_seconds: float):
+        self.columns = CatalogColumns(
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.float64),
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.int32)
+        )
+        self._lock = threading.Lock()
+        self._dirty: set[int] = set()
+        # Journals the IDs patched while a load runs, to be re-read after it
+        self._reload = IndexReloader("catalog-snapshot", self._lock, refresh_seconds)
+    
+    def load(self, db: Session) -> None:
+        """
+        Build the snapshot from the sweets table.
+        
+        Args:
+            db: Database session
+        """
+        def build():
+            rows = db.execute(
+                select(Sweet.id, Sweet.price, Sweet.quantity, Sweet.category).order_by(Sweet.id)
+            ).all()
+            categories: list[str] = []
+            category_index: dict[str, int] = {}
+            codes = np.empty(len(rows), dtype=np.int32)
+            for position, row in enumerate(rows):
+                code = category_index.get(row.category)
+                if code is None:
+                    code = category_index[row.category] = len(categories)
+                    categories.append(row.category)
+                codes[position] = code
+            
+            return CatalogColumns(
+                np.fromiter((row.id for row in rows), dtype=np.int64, count=len(rows)),
+                np.fromiter((row.price for row in rows), dtype=np.float64, count=len(rows)),
+                np.fromiter((row.quantity for row in rows), dtype=np.int64, count=len(rows)),
+                codes,
+                categories=categories,
+                category_index=category_index
+            )
+        
+        def install(columns, journal):
+            self.columns = columns
+            self._dirty.update(journal)
+        
+        self._reload.load(build, install)
+    
+    def invalidate(self, sweet_ids: Sequence[int]) -> None:
+        """Mark rows to be re-read before the next search."""
+        if sweet_ids:
+            with self._lock:
+                self._dirty.update(sweet_ids)
+    
+    def clear(self) -> None:
+        """Forget everything and rebuild on next use."""
+        with self._lock:
+            self._dirty = set()
+            self._reload.loaded_at = None
+    
+    def match(
+        self,
+        db: Session,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        in_stock: Optional[bool] = None,
+        candidate_ids: Optional[Sequence[int]] = None
+    ) -> tuple[CatalogColumns, np.ndarray, list[str]]:
+        """
+        Select the sweets matching the search filters.
+        
+        Args:
+            db: Database session (used to load or patch the snapshot)
+            category: Exact category
+            min_price: Minimum price, inclusive
+            max_price: Maximum price, inclusive
+            in_stock: Only sweets with quantity above zero
+            candidate_ids: Restrict to these IDs (e.g. name matches)
+        
+        Returns:
+            tuple: (Current columns, mask of matching rows, category string
+                table); columns.ids[mask] are the matching IDs in ascending order
+        """
+        self.sync(db)
+        # One reference: later patches swap in new columns and never touch these
+        columns = self.columns
+        mask = self.mask(columns, category, min_price, max_price, in_stock, candidate_ids)
+        return columns, mask, columns.categories
+    
+    def mask(
+        self,
+        columns: CatalogColumns,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        in_stock: Optional[bool] = None,
+        candidate_ids: Optional[Sequence[int]] = None
+    ) -> np.ndarray:
+        """Boolean mask of the rows of columns matching the search filters."""
+        mask = columns.alive.copy()
+        if candidate_ids is not None:
+            wanted = np.zeros(len(columns.ids), dtype=bool)
+            wanted[columns.positions(candidate_ids)[0]] = True
+            mask &= wanted
+        if category:
+            code = columns.category_index.get(category)
+            if code is None:
+                mask[:] = False
+                return mask
+            mask &= columns.category_codes == code
+        if min_price is not None:
+            mask &= columns.prices >= min_price
+        if max_price is not None:
+            mask &= columns.prices <= max_price
+        if in_stock:
+            mask &= columns.quantities > 0
+        return mask
+    
+    def sync(self, db: Session) -> None:
+        """Load on first use, patch dirty rows, and start a reload once stale."""
+        self._reload.ensure_fresh(db, self.load)
+        
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            self._reload.journal(dirty)
+        if not dirty:
+            return
+        
+        rows = db.execute(
+            select(Sweet.id, Sweet.price, Sweet.quantity, Sweet.category)
+            .where(Sweet.id.in_(dirty))
+        ).all()
+        with self._lock:
+            self._patch(dirty, rows)
+    
+    def _patch(self, dirty: set[int], rows) -> None:
+        """Swap in columns with the re-read rows applied; caller holds the lock."""
+        columns = self.columns
+        categories = list(columns.categories)
+        category_index = dict(columns.category_index)
+        
+        def intern(category: str) -> int:
+            code = category_index.get(category)
+            if code is None:
+                code = category_index[category] = len(categories)
+                categories.append(category)
+            return code
+        
+        dirty_ids = np.fromiter(dirty, dtype=np.int64, count=len(dirty))
+        positions, found = columns.positions(dirty_ids)
+        present = dict(zip(dirty_ids[found].tolist(), positions.tolist()))
+        
+        prices = columns.prices.copy()
+        quantities = columns.quantities.copy()
+        category_codes = columns.category_codes.copy()
+        alive = columns.alive.copy()
+        appended = []
+        for row in rows:
+            position = present.pop(row.id, None)
+            if position is None:
+                appended.append(row)
+                continue
+            prices[position] = row.price
+            quantities[position] = row.quantity
+            category_codes[position] = intern(row.category)
+            alive[position] = True
+        
+        # Rows no longer in the table were deleted
+        for position in present.values():
+            alive[position] = False
+        
+        ids = columns.ids
+        if appended:
+            ids = np.concatenate([ids, np.array([row.id for row in appended], dtype=np.int64)])
+            order = np.argsort(ids, kind="stable")
+            ids = ids[order]
+            prices = np.concatenate([prices, [row.price for row in appended]])[order]
+            quantities = np.concatenate([quantities, [row.quantity for row in appended]])[order]
+            category_codes = np.concatenate([
+                category_codes,
+                np.array([intern(row.category) for row in appended], dtype=np.int32)
+            ])[order]
+            alive = np.concatenate([alive, np.ones(len(appended), dtype=bool)])[order]
+        
+        self.columns = CatalogColumns(
+            ids, prices, quantities, category_codes, alive,
+            categories=categories,
+            category_index=category_index
+        )
+
+
+catalog_snapshot = CatalogSnapshot(settings.catalog_snapshot_refresh_seconds)
+catalog_version.subscribe(catalog_snapshot.invalidate)
@@ -0,0 +1,322 @@
+"""
+Idempotency-Key handling for retried POST requests.
+Stores the first successful response per (user, key) so client retries are
+answered from the store instead of running the operation again. The
+operation marks its key as applied in its own transaction, so a key is
+only ever taken over when the operation is known not to have committed.
+"""
+
+import hashlib
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, NamedTuple, Optional
+
+from sqlalchemy.orm import Session
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from app.models.idempotency import IdempotencyRecord
+from app.core.cache import TTLCache
+from app.core.exceptions import DuplicateResourceException, ServiceUnavailableException, ValidationException
+from app.config import settings
+
+
+class StoredResponse(NamedTuple):
+    """Response recorded for an idempotency key."""
+    
+    fingerprint: str
+    status_code: int
+    body: str
+
+
+# Front tier: recently completed keys, bounded in size and age
+_responses = TTLCache(
+    "idempotency",
+    max_entries=settings.idempotency_cache_max_entries,
+    ttl_seconds=settings.idempotency_ttl_seconds
+)
+
+# Keys currently being executed by this process
+_in_flight: dict[tuple[int, str], threading.Event] = {}
+_in_flight_lock = threading.Lock()
+
+# Record IDs of the keys claimed by this process, until completed or abandoned
+_claims: dict[tuple[int, str], int] = {}
+
+
+class IdempotencyService:
+    """Service class for idempotent request handling."""
+    
+    @staticmethod
+    def fingerprint(*parts) -> str:
+        """
+        Hash the parts of a request that must match on replay.
+        
+        Args:
+            parts: Operation name, path parameters and request body
+        
+        Returns:
+            str: Hex digest identifying the request
+        """
+        return hashlib.sha256("\x1f".join(str(part) for part in parts).encode()).hexdigest()
+    
+    @staticmethod
+    def begin(db: Session, user_id: int, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        """
+        Claim an idempotency key, or fetch the response already stored for it.
+        
+        When another request with the same key is in flight, waits for it to
+        finish rather than running the operation a second time.
+        
+        Args:
+            db: Database session
+            user_id: User ID sending the request
+            key: Idempotency-Key header value
+            fingerprint: Request fingerprint
+        
+        Returns:
+            StoredResponse: Stored response to replay, or None if the caller now
+                owns the key and must call complete() or abandon()
+        
+        Raises:
+            ValidationException: If the key was used for a different request
+            ServiceUnavailableException: If the in-flight request takes too long
+            DuplicateResourceException: If the request was applied but its
+                response was never stored
+        """
+        cache_key = (user_id, key)
+        deadline = time.monotonic() + settings.idempotency_wait_timeout_seconds
+        
+        while True:
+            stored = _responses.get(cache_key)
+            if stored is not None:
+                return IdempotencyService._check(stored, fingerprint)
+            
+            with _in_flight_lock:
+                event = _in_flight.get(cache_key)
+                if event is None:
+                    _in_flight[cache_key] = threading.Event()
+            
+            if event is None:
+                break
+            if not event.wait(max(deadline - time.monotonic(), 0)):
+                raise ServiceUnavailableException(
+                    "A request with this Idempotency-Key is still in progress"
+                )
+        
+        try:
+            claimed = IdempotencyService._claim(db, user_id, key, fingerprint, deadline)
+        except BaseException:
+            IdempotencyService._release(cache_key)
+            raise
+        
+        if isinstance(claimed, StoredResponse):
+            _responses.set(cache_key, claimed)
+            IdempotencyService._release(cache_key)
+            return IdempotencyService._check(claimed, fingerprint)
+        with _in_flight_lock:
+            _claims[cache_key] = claimed
+        return None
+    
+    @staticmethod
+    def claimed_record(user_id: int, key: Optional[str]) -> Optional[int]:
+        """
+        Look up the record of a key this process has claimed.
+        
+        Args:
+            user_id: User ID sending the request
+            key: Idempotency-Key header value, or None
+        
+        Returns:
+            int: Record ID to pass to mark_applied(), or None without a claim
+        """
+        if key is None:
+            return None
+        return _claims.get((user_id, key))
+    
+    @staticmethod
+    def mark_applied(db: Session, record_ids: Iterable[int]) -> set[int]:
+        """
+        Mark claimed keys as applied inside the operation's transaction.
+        
+        Call this just before the operation commits. The mark commits or
+        rolls back with the operation, so a key found pending later is proof
+        that its operation never committed. A key that was taken over in the
+        meantime is no longer pending and cannot be marked; the caller must
+        then roll back instead of committing.
+        
+        Args:
+            db: Database session holding the operation's transaction
+            record_ids: Record IDs from claimed_record()
+        
+        Returns:
+            set: The record IDs that were marked
+        """
+        record_ids = list(record_ids)
+        if not record_ids:
+            return set()
+        return set(db.scalars(
+            update(IdempotencyRecord)
+            .where(IdempotencyRecord.id.in_(record_ids), IdempotencyRecord.state == "pending")
+            .values(state="applied")
+            .returning(IdempotencyRecord.id)
+            .execution_options(synchronize_session=False)
+        ))
+    
+    @staticmethod
+    def complete(db: Session, user_id: int, key: str, status_code: int, body: str) -> None:
+        """
+        Store the response for a claimed key and wake any waiting duplicates.
+        
+        Args:
+            db: Database session
+            user_id: User ID sending the request
+            key: Idempotency-Key header value
+            status_code: HTTP status code of the response
+            body: Serialized JSON response body
+        """
+        cache_key = (user_id, key)
+        try:
+            fingerprint = db.execute(
+                update(IdempotencyRecord)
+                .where(IdempotencyRecord.id == _claims.get(cache_key))
+                .values(state="completed", status_code=status_code, response_body=body)
+                .returning(IdempotencyRecord.fingerprint)
+                .execution_options(synchronize_session=False)
+            ).scalar()
+            db.commit()
+            if fingerprint is not None:
+                _responses.set(cache_key, StoredResponse(fingerprint, status_code, body))
+        finally:
+            IdempotencyService._release(cache_key)
+    
+    @staticmethod
+    def abandon(db: Session, user_id: int, key: str) -> None:
+        """
+        Give up a claimed key after a failure so a retry can run again.
+        
+        Only a key still pending is released: one marked applied belongs to
+        an operation that committed, and is kept so it never runs twice.
+        
+        Args:
+            db: Database session
+            user_id: User ID sending the request
+            key: Idempotency-Key header value
+        """
+        try:
+            db.rollback()
+            db.execute(
+                delete(IdempotencyRecord)
+                .where(
+                    IdempotencyRecord.id == _claims.get((user_id, key)),
+                    IdempotencyRecord.state == "pending"
+                )
+            )
+            db.commit()
+        finally:
+            IdempotencyService._release((user_id, key))
+    
+    @staticmethod
+    def purge_expired(db: Session) -> int:
+        """
+        Delete stored responses past their TTL.
+        
+        Args:
+            db: Database session
+        
+        Returns:
+            int: Number of records deleted
+        """
+        deleted = db.execute(
+            delete(IdempotencyRecord).where(IdempotencyRecord.expires_at <= datetime.utcnow())
+        ).rowcount
+        db.commit()
+        return deleted
+    
+    @staticmethod
+    def _claim(
+        db: Session,
+        user_id: int,
+        key: str,
+        fingerprint: str,
+        deadline: float
+    ) -> StoredResponse | int:
+        """Insert a pending record and return its ID, or return the completed one another worker stored."""
+        while True:
+            now = datetime.utcnow()
+            try:
+                record_id = db.execute(
+                    insert(IdempotencyRecord).values(
+                        user_id=user_id,
+                        key=key,
+                        fingerprint=fingerprint,
+                        state="pending",
+                        created_at=now,
+                        expires_at=now + timedelta(seconds=settings.idempotency_ttl_seconds)
+                    )
+                    .returning(IdempotencyRecord.id)
+                ).scalar_one()
+                db.commit()
+                return record_id
+            except IntegrityError:
+                db.rollback()
+            
+            record = db.execute(
+                select(IdempotencyRecord)
+                .where(IdempotencyRecord.user_id == user_id, IdempotencyRecord.key == key)
+            ).scalar_one_or_none()
+            if record is None:
+                continue
+            
+            stale = record.created_at <= now - timedelta(seconds=settings.idempotency_lock_timeout_seconds)
+            if record.expires_at <= now or (record.state == "pending" and stale):
+                # Expired, or pending so long its owner probably died. Pending
+                # means the operation has not committed, and once the row is
+                # gone the owner can no longer mark it, so it never will
+                taken_over = db.execute(
+                    delete(IdempotencyRecord)
+                    .where(IdempotencyRecord.id == record.id, IdempotencyRecord.state == record.state)
+                ).rowcount
+                db.commit()
+                if taken_over or record.expires_at <= now:
+                    continue
+            
+            if record.state == "completed":
+                stored = StoredResponse(record.fingerprint, record.status_code, record.response_body)
+                db.rollback()
+                return stored
+            
+            if record.state == "applied" and stale:
+                # The operation committed but its owner died before storing the response
+                db.rollback()
+                IdempotencyService._check(
+                    StoredResponse(record.fingerprint, record.status_code, record.response_body),
+                    fingerprint
+                )
+                raise DuplicateResourceException(
+                    "The request with this Idempotency-Key was already applied, but its response was lost"
+                )
+            
+            # Pending or applied in another worker process: poll until it settles
+            db.rollback()
+            if time.monotonic() >= deadline:
+                raise ServiceUnavailableException(
+                    "A request with this Idempotency-Key is still in progress"
+                )
+            time.sleep(0.05)
+    
+    @staticmethod
+    def _check(stored: StoredResponse, fingerprint: str) -> StoredResponse:
+        """Refuse to replay a response for a different request."""
+        if stored.fingerprint != fingerprint:
+            raise ValidationException("Idempotency-Key was already used for a different request")
+        return stored
+    
+    @staticmethod
+    def _release(cache_key: tuple[int, str]) -> None:
+        """Drop an in-flight marker and wake its waiters."""
+        with _in_flight_lock:
+            event = _in_flight.pop(cache_key, None)
+            _claims.pop(cache_key, None)
+        if event is not None:
+            event.set()
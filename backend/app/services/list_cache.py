@@ -0,0 +1,92 @@
+"""
+Pre-serialized response cache for the sweet list endpoint.
+Whole pages are kept as ready-to-send JSON bytes per query and catalog
+version, and are assembled from per-sweet JSON fragments shared with the
+sweet record cache, so a write only re-encodes the sweets it changed.
+"""
+
+from typing import Hashable, NamedTuple, Optional
+
+from app.core.cache import TTLCache
+from app.core.catalog import catalog_version
+from app.config import settings
+
+
+class SerializedPage(NamedTuple):
+    """A rendered SweetListResponse and its Last-Modified date."""
+    
+    body: bytes
+    last_modified: Optional[str]
+
+
+class ListResponseCache:
+    """
+    LRU cache of rendered list pages with a byte budget.
+    
+    Keys carry the stock version they were taken at, so any write makes
+    older pages stop matching and they age out of the LRU. A page rendered
+    while a write landed is not stored; the TTL bounds staleness from
+    writes made by other worker processes.
+    """
+    
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self._cache = TTLCache(
+            "list_pages",
+            max_entries=max_entries,
+            ttl_seconds=ttl_seconds,
+            max_bytes=max_bytes,
+            sizeof=lambda page: len(page.body) + len(page.last_modified or "")
+        )
+    
+    @staticmethod
+    def key(
+        skip: int,
+        limit: int,
+        cursor: Optional[str],
+        include_total: Optional[bool],
+        count_mode: str,
+        sort: str,
+        version: int
+    ) -> Hashable:
+        """
+        Canonical cache key for a list request.
+        
+        Args:
+            skip: Number of records to skip
+            limit: Page size
+            cursor: Cursor from the previous page
+            include_total: Whether to count; None means first page only
+            count_mode: "exact" or "estimated"
+            sort: Result order
+            version: catalog_version.stock read before the page is loaded
+        
+        Returns:
+            Hashable: Cache key
+        """
+        if include_total is None:
+            include_total = cursor is None
+        return (
+            skip,
+            limit,
+            cursor,
+            include_total,
+            count_mode if include_total else None,
+            sort,
+            version
+        )
+    
+    def get(self, key: Hashable) -> Optional[SerializedPage]:
+        """Cached page for a key, or None."""
+        return self._cache.get(key)
+    
+    def set(self, key: Hashable, page: SerializedPage) -> None:
+        """Cache a page unless the catalog changed since its key was taken."""
+        if key[-1] == catalog_version.stock:
+            self._cache.set(key, page)
+
+
+list_cache = ListResponseCache(
+    settings.list_cache_max_entries,
+    settings.list_cache_max_bytes,
+    settings.list_cache_ttl_seconds
+)
@@ -0,0 +1,295 @@
+"""
+Substring search over sweet names.
+A leading-wildcard LIKE cannot use the name index, so name searches either
+go through an in-process trigram inverted index or, on PostgreSQL, through
+a pg_trgm GIN index that makes ILIKE '%term%' indexable.
+"""
+
+import heapq
+import threading
+from array import array
+from typing import Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app.models.sweet import Sweet
+from app.core.cache import IndexReloader
+from app.config import settings
+
+
+def trigrams(value: str) -> set[str]:
+    """Distinct three-character substrings of a lowercased string."""
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def bounded_distance(a: str, b: str, limit: int) -> int:
+    """
+    Edit distance between two strings, counting an adjacent swap as one edit.
+    
+    Stops as soon as the distance must exceed limit.
+    
+    Args:
+        a: First string
+        b: Second string
+        limit: Largest distance of interest
+    
+    Returns:
+        int: The distance, or limit + 1 if it is larger than limit
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: list[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1] if previous[-1] <= limit else limit + 1
+
+
+def typo_budget(word: str) -> int:
+    """Edits tolerated in a search word: none for short words, more for long ones."""
+    if len(word) <= 2:
+        return 0
+    return 1 if len(word) <= 5 else 2
+
+
+class NameIndex:
+    """
+    Process-local trigram index over sweet names.
+    
+    Every trigram maps to the IDs of the names containing it. A search only
+    looks up the rarest trigram of the term and checks those few names for
+    the full substring, so it never touches names that cannot match. Built
+    postings are packed into arrays; later creates and renames go to a
+    small delta map. Deleted or renamed IDs may linger in postings, but the
+    substring check against the current name drops them.
+    
+    The index is reloaded from the database after a TTL (in the background,
+    while the old one keeps serving) so writes by other workers show up.
+    """
+    
+    def __init__(self, refresh_seconds: float, max_candidates: int):
+        self.max_candidates = max_candidates
+        self._names: dict[int, str] = {}
+        self._postings: dict[str, array] = {}
+        self._delta: dict[str, set[int]] = {}
+        self._lock = threading.Lock()
+        # Journals (sweet_id, name) writes while a load runs
+        self._reload = IndexReloader("name-index", self._lock, refresh_seconds)
+    
+    def load(self, db: Session) -> None:
+        """
+        Build the index from every sweet name.
+        
+        Args:
+            db: Database session
+        """
+        def build():
+            names: dict[int, str] = {}
+            building: dict[str, list[int]] = {}
+            for sweet_id, name in db.execute(select(Sweet.id, Sweet.name)):
+                name = name.lower()
+                names[sweet_id] = name
+                for gram in trigrams(name):
+                    building.setdefault(gram, []).append(sweet_id)
+            return names, {gram: array("q", ids) for gram, ids in building.items()}
+        
+        def install(built, journal):
+            self._names, self._postings = built
+            self._delta = {}
+            for sweet_id, name in journal:
+                self._apply(sweet_id, name)
+        
+        self._reload.load(build, install)
+    
+    def add(self, sweet_id: int, name: str) -> None:
+        """
+        Index a created or renamed sweet.
+        
+        Args:
+            sweet_id: Sweet ID
+            name: Current sweet name
+        """
+        with self._lock:
+            self._apply(sweet_id, name.lower())
+    
+    def remove(self, sweet_id: int) -> None:
+        """
+        Drop a deleted sweet.
+        
+        Args:
+            sweet_id: Sweet ID
+        """
+        with self._lock:
+            self._apply(sweet_id, None)
+    
+    def _apply(self, sweet_id: int, name: Optional[str]) -> None:
+        """Record a rename (or delete, when name is None); caller holds the lock."""
+        self._reload.journal([(sweet_id, name)])
+        if self._reload.loaded_at is None:
+            return
+        if name is None:
+            self._names.pop(sweet_id, None)
+        elif self._names.get(sweet_id) != name:
+            self._names[sweet_id] = name
+            for gram in trigrams(name):
+                self._delta.setdefault(gram, set()).add(sweet_id)
+    
+    def clear(self) -> None:
+        """Forget everything and rebuild on next use."""
+        with self._lock:
+            self._names = {}
+            self._postings = {}
+            self._delta = {}
+            self._reload.loaded_at = None
+    
+    def matching_ids(self, db: Session, term: str) -> Optional[list[int]]:
+        """
+        IDs of sweets whose name contains a term, case-insensitively.
+        
+        Args:
+            db: Database session (used to build the index on first use)
+            term: Search term
+        
+        Returns:
+            list: Matching sweet IDs, or None when the index cannot narrow
+                the search (term shorter than three characters, or too
+                common) and the caller should filter in SQL instead
+        """
+        term = term.lower()
+        grams = trigrams(term)
+        if not grams:
+            return None
+        
+        self._reload.ensure_fresh(db, self.load)
+        with self._lock:
+            names = self._names
+            rarest = min(
+                grams,
+                key=lambda gram: len(self._postings.get(gram, ())) + len(self._delta.get(gram, ()))
+            )
+            candidates = list(self._postings.get(rarest, ()))
+            candidates.extend(self._delta.get(rarest, ()))
+        
+        if len(candidates) > self.max_candidates:
+            return None
+        return sorted({
+            sweet_id for sweet_id in candidates
+            if term in names.get(sweet_id, "")
+        })
+    
+    def fuzzy_matching_ids(self, db: Session, term: str, max_results: int, scan_budget: int) -> list[int]:
+        """
+        IDs of sweets whose name matches a possibly misspelled term, best first.
+        
+        Candidates are the names sharing the most trigrams with the term,
+        gathered from the rarest trigram postings until scan_budget postings
+        have been read, so the work does not grow with the catalog. The
+        best-overlapping candidates are then verified word by word: every
+        term word must be within its typo budget of some word of the name,
+        by a bounded edit distance. Matches rank by total edits, then by
+        shared trigrams.
+        
+        Args:
+            db: Database session (used to build the index on first use)
+            term: Search term
+            max_results: Most matches to return
+            scan_budget: Most posting entries to read for candidates
+        
+        Returns:
+            list: Matching sweet IDs ranked by similarity
+        """
+        term = " ".join(term.lower().split())
+        grams = trigrams(term)
+        if not grams:
+            return []
+        
+        self._reload.ensure_fresh(db, self.load)
+        with self._lock:
+            names = self._names
+            sized = sorted(
+                (len(self._postings.get(gram, ())) + len(self._delta.get(gram, ())), gram)
+                for gram in grams
+            )
+            shared: dict[int, int] = {}
+            scanned = 0
+            for size, gram in sized:
+                # Always read the rarest trigram, then only while within budget
+                if size == 0 or (scanned and scanned + size > scan_budget):
+                    continue
+                scanned += size
+                for sweet_id in (*self._postings.get(gram, ()), *self._delta.get(gram, ())):
+                    shared[sweet_id] = shared.get(sweet_id, 0) + 1
+        
+        # The intended name shares the most trigrams, so only the best
+        # overlaps are verified
+        candidates = heapq.nsmallest(max_results * 2, ((-count, sweet_id) for sweet_id, count in shared.items()))
+        words = term.split()
+        distances: dict[tuple[str, str], int] = {}
+        ranked = []
+        for overlap, sweet_id in candidates:
+            name = names.get(sweet_id)
+            if name is None:
+                continue
+            name_words = name.split()
+            edits = 0
+            for word in words:
+                budget = typo_budget(word)
+                best = budget + 1
+                for candidate in name_words:
+                    pair = (word, candidate)
+                    if pair not in distances:
+                        distances[pair] = bounded_distance(word, candidate, budget)
+                    best = min(best, distances[pair])
+                if best > budget:
+                    break
+                edits += best
+            else:
+                ranked.append((edits, overlap, sweet_id))
+        ranked.sort()
+        return [sweet_id for _, _, sweet_id in ranked[:max_results]]
+    
+name_index = NameIndex(settings.name_index_refresh_seconds, settings.name_index_max_candidates)
+
+
+def name_search_backend(db: Session) -> str:
+    """
+    Name search strategy in effect for a session's database.
+    
+    Returns:
+        str: "pg_trgm" only on PostgreSQL, otherwise "index" or "like"
+    """
+    backend = settings.name_search_backend
+    if backend == "pg_trgm" and db.get_bind().dialect.name != "postgresql":
+        return "index"
+    return backend
+
+
+def setup_name_search(engine: Engine) -> None:
+    """
+    Prepare the configured name search backend at startup.
+    
+    Creates the pg_trgm extension and GIN index when that backend is
+    selected on PostgreSQL, otherwise warms the in-process index.
+    
+    Args:
+        engine: Application database engine
+    """
+    if settings.name_search_backend == "pg_trgm" and engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_sweets_name_trgm "
+                "ON sweets USING gin (name gin_trgm_ops)"
+            ))
+    elif settings.name_search_backend == "index":
+        with Session(engine) as db:
+            name_index.load(db)
@@ -0,0 +1,180 @@
+"""
+Keyset (cursor) pagination helpers.
+A cursor is an opaque token holding the sort key of the last row on a page,
+so the next page starts with an index seek instead of skipping rows.
+"""
+
+import base64
+import binascii
+import json
+import math
+from datetime import datetime
+from typing import Any, NamedTuple, Optional, Sequence
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+from app.core.exceptions import ValidationException
+
+
+class Page(NamedTuple):
+    """One page of results."""
+    
+    items: list
+    next_cursor: Optional[str]
+    total: Optional[int]
+    total_estimated: bool = False
+    facets: Optional[dict] = None
+
+
+def _to_json(value: Any) -> Any:
+    """Cursor-safe form of a sort key value."""
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _from_json(column, value: Any) -> Any:
+    """
+    Sort key value for a column, read back from its cursor form.
+    
+    Raises:
+        ValidationException: If the value does not fit the column's type
+    """
+    python_type = column.type.python_type
+    if python_type is datetime:
+        if isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value)
+            except ValueError:
+                pass
+    elif isinstance(value, bool):
+        pass
+    elif python_type is float and isinstance(value, (int, float)) and math.isfinite(value):
+        return float(value)
+    elif isinstance(value, python_type) and python_type in (int, str):
+        return value
+    raise ValidationException("Invalid pagination cursor")
+
+
+def encode_cursor(sort: str, values: Sequence[Any]) -> str:
+    """
+    Build an opaque cursor from the sort key of the last row.
+    
+    Args:
+        sort: Name of the ordering the cursor belongs to
+        values: Sort key values, ending with the row ID
+    
+    Returns:
+        str: URL-safe cursor token
+    """
+    raw = json.dumps([sort, *map(_to_json, values)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, size: int) -> list:
+    """
+    Read the sort key back out of a cursor.
+    
+    Args:
+        cursor: Cursor token from a previous page
+        sort: Ordering the caller is paginating by
+        size: Number of values expected in the sort key
+    
+    Returns:
+        list: Sort key values
+    
+    Raises:
+        ValidationException: If the cursor is malformed or from another ordering
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        decoded = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValidationException("Invalid pagination cursor")
+    
+    if not isinstance(decoded, list) or len(decoded) != size + 1 or decoded[0] != sort:
+        raise ValidationException("Invalid pagination cursor")
+    return decoded[1:]
+
+
+def seek(
+    query: Query,
+    order_by: Sequence,
+    sort: str,
+    cursor: Optional[str] = None,
+    descending: bool = False
+) -> Query:
+    """
+    Order a query by a unique key and start it after a cursor.
+    
+    Rows after the cursor are selected with a row-value comparison,
+    WHERE (k, id) > (:k, :id), which an index on the same columns answers
+    with a seek no matter how deep the page is. All columns run in the same
+    direction so one index scan (forward or backward) yields the order.
+    
+    Args:
+        query: Filtered ORM query
+        order_by: Sort columns, ending with a unique column
+        sort: Name of the ordering, stored in cursors
+        cursor: Cursor returned with the previous page
+        descending: Order every column descending
+    
+    Returns:
+        Query: Ordered query starting after the cursor
+    
+    Raises:
+        ValidationException: If the cursor is malformed or from another ordering
+    """
+    if cursor is not None:
+        values = [
+            _from_json(column, value)
+            for column, value in zip(order_by, decode_cursor(cursor, sort, len(order_by)))
+        ]
+        if len(order_by) == 1:
+            key, bound = order_by[0], values[0]
+        else:
+            key, bound = tuple_(*order_by), tuple_(*values)
+        query = query.filter(key < bound if descending else key > bound)
+    
+    if descending:
+        return query.order_by(*(column.desc() for column in order_by))
+    return query.order_by(*order_by)
+
+
+def paginate(
+    query: Query,
+    order_by: Sequence,
+    sort: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    offset: int = 0,
+    descending: bool = False
+) -> tuple[list, Optional[str]]:
+    """
+    Fetch one page of a query ordered by a unique key.
+    
+    The last column of order_by must make the ordering unique (normally the
+    primary key); see seek() for how pages start after the cursor.
+    
+    Args:
+        query: Filtered ORM query
+        order_by: Sort columns, ending with a unique column
+        sort: Name of the ordering, stored in cursors
+        limit: Maximum rows per page
+        cursor: Cursor returned with the previous page
+        offset: Rows to skip after the cursor (legacy skip parameter)
+        descending: Order every column descending
+    
+    Returns:
+        tuple: (Rows of this page, cursor for the next page or None)
+    """
+    query = seek(query, order_by, sort, cursor, descending)
+    
+    # Fetch one extra row to learn whether another page exists
+    if offset:
+        query = query.offset(offset)
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(sort, [getattr(last, column.key) for column in order_by])
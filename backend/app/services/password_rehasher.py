@@ -0,0 +1,122 @@
+"""
+Background rehashing of passwords stored with outdated Argon2 costs.
+After a successful login with such a hash, the password is rehashed on the
+password pool and the new hash is written in batches, off the response path.
+"""
+
+from typing import Callable, Optional
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.user import User
+from app.core.exceptions import ServiceUnavailableException
+from app.core.password_pool import password_pool
+from app.core.workers import BatchWorker, WorkerSlot
+
+_users = User.__table__
+
+
+class PasswordRehasher(BatchWorker):
+    """
+    Queue of rehashed passwords waiting to be stored.
+    
+    submit() hands the password to the pool as a background hash and
+    returns at once; if the pool is busy the rehash is simply skipped and
+    tried again at the user's next login. Finished hashes are collected by
+    one worker thread, which writes up to max_batch_size of them per
+    statement. Each write only replaces the hash the login verified, so a
+    password changed in the meantime is never overwritten.
+    """
+    
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        max_batch_size: int = 100,
+        max_wait_seconds: float = 1.0
+    ):
+        super().__init__("password-rehasher", max_batch_size, max_wait_seconds)
+        self.session_factory = session_factory
+        self.rehashed = 0
+        self.skipped = 0
+    
+    def submit(self, user_id: int, password: str, old_hash: str) -> None:
+        """
+        Rehash a verified password in the background.
+        
+        Args:
+            user_id: User whose hash is outdated
+            password: Plain text password, just verified against old_hash
+            old_hash: Stored hash the login verified
+        """
+        try:
+            future = password_pool.submit_background_hash(password)
+        except ServiceUnavailableException:
+            self.skipped += 1
+            return
+        
+        def enqueue(done):
+            if done.exception() is None:
+                self.put((user_id, old_hash, done.result()))
+            else:
+                self.skipped += 1
+        
+        future.add_done_callback(enqueue)
+    
+    def process(self, batch: list) -> None:
+        statement = (
+            update(_users)
+            .where(_users.c.id == bindparam("user_id"), _users.c.hashed_password == bindparam("old_hash"))
+            # A rehash is not a profile change, so updated_at is left alone
+            .values(hashed_password=bindparam("new_hash"), updated_at=_users.c.updated_at)
+        )
+        db = self.session_factory()
+        try:
+            db.execute(statement, [
+                {"user_id": user_id, "old_hash": old_hash, "new_hash": new_hash}
+                for user_id, old_hash, new_hash in batch
+            ])
+            db.commit()
+            self.rehashed += len(batch)
+        except Exception:
+            db.rollback()
+            # The old hashes still verify; these users are rehashed next login
+            self.skipped += len(batch)
+        finally:
+            db.close()
+
+
+# Process-wide rehasher, only running when rehashing is enabled
+password_rehasher: WorkerSlot[PasswordRehasher] = WorkerSlot()
+
+
+def schedule_password_rehash(user_id: int, password: str, old_hash: str) -> None:
+    """Hand an outdated hash to the running rehasher, if any."""
+    if password_rehasher.current is not None:
+        password_rehasher.current.submit(user_id, password, old_hash)
+
+
+def start_password_rehasher(session_factory: Callable[[], Session]) -> Optional[PasswordRehasher]:
+    """
+    Start the process-wide rehasher if enabled in settings.
+    
+    Args:
+        session_factory: Factory for the writer's database sessions
+    
+    Returns:
+        PasswordRehasher: The running rehasher, or None when disabled
+    """
+    return password_rehasher.start(
+        settings.password_rehash_enabled,
+        lambda: PasswordRehasher(
+            session_factory,
+            max_batch_size=settings.password_rehash_batch_size,
+            max_wait_seconds=settings.password_rehash_max_wait_seconds
+        )
+    )
+
+
+def stop_password_rehasher() -> None:
+    """Stop the process-wide rehasher, storing finished hashes first."""
+    password_rehasher.stop()
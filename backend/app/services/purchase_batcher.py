@@ -0,0 +1,149 @@
+"""
+Group-commit purchase batcher for flash-sale traffic.
+Coalesces concurrent purchase requests so a batch of them shares one commit.
+"""
+
+import asyncio
+import queue
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.sweet import Purchase
+from app.core.exceptions import SweetShopException, ServiceUnavailableException
+from app.core.workers import BatchWorker, WorkerSlot
+from app.services.sweet_service import InventoryService
+
+
+class PurchaseBatcher(BatchWorker):
+    """
+    In-process purchase coalescer.
+    
+    Callers enqueue purchases and receive a Future. A single worker thread
+    drains the queue every few milliseconds and settles each batch through
+    InventoryService.purchase_batch, resolving every caller's Future with its
+    own Purchase or exception.
+    """
+    
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        max_queue_size: int = 10000
+    ):
+        super().__init__("purchase-batcher", max_batch_size, max_wait_ms / 1000, max_queue_size)
+        self.session_factory = session_factory
+    
+    def submit(
+        self,
+        user_id: int,
+        sweet_id: int,
+        quantity: int,
+        idempotency_record: Optional[int] = None
+    ) -> Future:
+        """
+        Queue a purchase for the next batch.
+        
+        Args:
+            user_id: User ID making the purchase
+            sweet_id: Sweet ID being purchased
+            quantity: Quantity to purchase
+            idempotency_record: Claimed Idempotency-Key record to mark applied
+                in the batch's transaction
+        
+        Returns:
+            Future: Resolves to the Purchase or raises its SweetShopException
+        
+        Raises:
+            ServiceUnavailableException: If the queue is full
+        """
+        future: Future = Future()
+        try:
+            self.put(((user_id, sweet_id, quantity), idempotency_record, future))
+        except queue.Full:
+            raise ServiceUnavailableException("Purchase queue is full, please retry")
+        return future
+    
+    async def purchase(
+        self,
+        user_id: int,
+        sweet_id: int,
+        quantity: int,
+        idempotency_record: Optional[int] = None
+    ) -> Purchase:
+        """
+        Queue a purchase and wait, without holding a thread, for its batch.
+        
+        Args:
+            user_id: User ID making the purchase
+            sweet_id: Sweet ID being purchased
+            quantity: Quantity to purchase
+            idempotency_record: Claimed Idempotency-Key record, see submit()
+        
+        Returns:
+            Purchase: Created purchase record
+        """
+        return await asyncio.wrap_future(self.submit(user_id, sweet_id, quantity, idempotency_record))
+    
+    def process(self, batch: list) -> None:
+        orders = [order for order, _, _ in batch]
+        records = [record for _, record, _ in batch]
+        db = None
+        try:
+            db = self.session_factory()
+            results = InventoryService.purchase_batch(db, orders, records)
+        except Exception as e:
+            # Fail this batch (close() rolls it back) but keep the worker alive
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        finally:
+            if db is not None:
+                try:
+                    db.close()
+                except Exception:
+                    pass
+        
+        for (_, _, future), result in zip(batch, results):
+            if isinstance(result, SweetShopException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+# Process-wide batcher, only running when purchase batching is enabled
+purchase_batcher: WorkerSlot[PurchaseBatcher] = WorkerSlot()
+
+
+def get_purchase_batcher() -> Optional[PurchaseBatcher]:
+    """Return the running process-wide batcher, if any."""
+    return purchase_batcher.current
+
+
+def start_purchase_batcher(session_factory: Callable[[], Session]) -> Optional[PurchaseBatcher]:
+    """
+    Start the process-wide batcher if enabled in settings.
+    
+    Args:
+        session_factory: Factory for the worker's database sessions
+    
+    Returns:
+        PurchaseBatcher: The running batcher, or None when disabled
+    """
+    return purchase_batcher.start(
+        settings.purchase_batching_enabled,
+        lambda: PurchaseBatcher(
+            session_factory,
+            max_batch_size=settings.purchase_batch_max_size,
+            max_wait_ms=settings.purchase_batch_max_wait_ms,
+            max_queue_size=settings.purchase_batch_queue_size
+        )
+    )
+
+
+def stop_purchase_batcher() -> None:
+    """Stop the process-wide batcher, settling queued purchases first."""
+    purchase_batcher.stop()
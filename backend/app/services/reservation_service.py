@@ -0,0 +1,413 @@
+"""
+Stock reservations (hold-then-confirm).
+Holds take stock out of the available count while payment runs; a confirm
+turns the hold into a purchase and a cancel or expiry gives the stock back.
+"""
+
+import heapq
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+from sqlalchemy import exists, insert, literal, select, update
+from app.models.sweet import Sweet, Purchase, StockReservation
+from app.models.user import User
+from app.services.sweet_service import InventoryService
+from app.services.stock_shards import StockShardService
+from app.services.suggest_index import suggest_index
+from app.core.exceptions import ResourceNotFoundException, ValidationException
+from app.core.catalog import catalog_version
+from app.core.workers import WorkerSlot
+from app.schemas.sweet import ReservationRequest
+from app.config import settings
+
+
+class ReservationService:
+    """Service class for stock reservations."""
+    
+    @staticmethod
+    def reserve(
+        db: Session,
+        user_id: int,
+        sweet_id: int,
+        request: ReservationRequest
+    ) -> StockReservation:
+        """
+        Hold stock for a user until the reservation is confirmed or expires.
+        
+        The held quantity is removed from the sweet's stock immediately, so
+        reported availability never includes live holds.
+        
+        Args:
+            db: Database session
+            user_id: User ID placing the hold
+            sweet_id: Sweet ID being held
+            request: Quantity and optional lifetime of the hold
+        
+        Returns:
+            StockReservation: Created reservation
+        
+        Raises:
+            ResourceNotFoundException: If user or sweet not found
+            InsufficientInventoryException: If not enough quantity available
+            ValidationException: If quantity or TTL is invalid
+        """
+        if request.quantity <= 0:
+            raise ValidationException("Reservation quantity must be greater than 0")
+        
+        ttl_seconds = request.ttl_seconds or settings.reservation_ttl_seconds
+        if ttl_seconds > settings.reservation_max_ttl_seconds:
+            raise ValidationException(
+                f"Reservation TTL cannot exceed {settings.reservation_max_ttl_seconds} seconds"
+            )
+        
+        InventoryService.take_stock(db, sweet_id, request.quantity)
+        
+        hold_id = uuid.uuid4().hex
+        created_at = datetime.utcnow()
+        expires_at = created_at + timedelta(seconds=ttl_seconds)
+        
+        # Insert the hold in the same transaction, guarded by the user check
+        inserted = db.execute(
+            insert(StockReservation)
+            .from_select(
+                ["id", "user_id", "sweet_id", "quantity", "status", "expires_at", "created_at"],
+                select(
+                    literal(hold_id),
+                    literal(user_id),
+                    literal(sweet_id),
+                    literal(request.quantity),
+                    literal("held"),
+                    literal(expires_at),
+                    literal(created_at)
+                ).where(exists().where(User.id == user_id))
+            )
+        ).rowcount
+        
+        if not inserted:
+            db.rollback()
+            raise ResourceNotFoundException(f"User with ID {user_id} not found")
+        
+        db.commit()
+        catalog_version.stock_changed([sweet_id])
+        schedule_reservation_expiry(hold_id, expires_at)
+        
+        return StockReservation(
+            id=hold_id,
+            user_id=user_id,
+            sweet_id=sweet_id,
+            quantity=request.quantity,
+            status="held",
+            expires_at=expires_at,
+            created_at=created_at
+        )
+    
+    @staticmethod
+    def confirm(db: Session, user_id: int, hold_id: str) -> Purchase:
+        """
+        Turn a live hold into a purchase.
+        
+        The stock was already taken when the hold was placed, so this only
+        flips the hold's status and records the purchase at the current price.
+        
+        Args:
+            db: Database session
+            user_id: User ID that owns the hold
+            hold_id: Reservation ID
+        
+        Returns:
+            Purchase: Created purchase record
+        
+        Raises:
+            ResourceNotFoundException: If the reservation or its sweet is not found
+            ValidationException: If the reservation expired or was already settled
+        """
+        now = datetime.utcnow()
+        hold = db.execute(
+            update(StockReservation)
+            .where(
+                StockReservation.id == hold_id,
+                StockReservation.user_id == user_id,
+                StockReservation.status == "held",
+                StockReservation.expires_at > now
+            )
+            .values(status="confirmed")
+            .returning(StockReservation.sweet_id, StockReservation.quantity)
+            .execution_options(synchronize_session=False)
+        ).first()
+        
+        if hold is None:
+            ReservationService._raise_not_live(db, user_id, hold_id)
+        
+        purchase = db.execute(
+            insert(Purchase)
+            .from_select(
+                ["user_id", "sweet_id", "quantity", "total_price", "created_at"],
+                select(
+                    literal(user_id),
+                    literal(hold.sweet_id),
+                    literal(hold.quantity),
+                    Sweet.price * hold.quantity,
+                    literal(now)
+                ).where(Sweet.id == hold.sweet_id)
+            )
+            .returning(Purchase.id, Purchase.total_price)
+        ).first()
+        
+        if purchase is None:
+            # The sweet was deleted while the hold was live
+            db.rollback()
+            raise ResourceNotFoundException(f"Sweet with ID {hold.sweet_id} not found")
+        
+        db.commit()
+        suggest_index.record_sales([(hold.sweet_id, hold.quantity)])
+        
+        return Purchase(
+            id=purchase.id,
+            user_id=user_id,
+            sweet_id=hold.sweet_id,
+            quantity=hold.quantity,
+            total_price=purchase.total_price,
+            created_at=now
+        )
+    
+    @staticmethod
+    def cancel(db: Session, user_id: int, hold_id: str) -> StockReservation:
+        """
+        Release a live hold and give its stock back.
+        
+        Args:
+            db: Database session
+            user_id: User ID that owns the hold
+            hold_id: Reservation ID
+        
+        Returns:
+            StockReservation: Cancelled reservation
+        
+        Raises:
+            ResourceNotFoundException: If the reservation is not found
+            ValidationException: If the reservation was already settled
+        """
+        hold = db.execute(
+            update(StockReservation)
+            .where(
+                StockReservation.id == hold_id,
+                StockReservation.user_id == user_id,
+                StockReservation.status == "held"
+            )
+            .values(status="cancelled")
+            .returning(*StockReservation.__table__.c)
+            .execution_options(synchronize_session=False)
+        ).first()
+        
+        if hold is None:
+            ReservationService._raise_not_live(db, user_id, hold_id)
+        
+        StockShardService.put(db, hold.sweet_id, hold.quantity)
+        db.commit()
+        catalog_version.stock_changed([hold.sweet_id])
+        
+        return StockReservation(**hold._mapping)
+    
+    @staticmethod
+    def release_expired(db: Session, hold_ids: Optional[list[str]] = None) -> int:
+        """
+        Expire due holds and give their stock back in one transaction.
+        
+        The status flip is a compare-and-set, so a hold confirmed or
+        cancelled concurrently is never released twice.
+        
+        Args:
+            db: Database session
+            hold_ids: Holds to check, or None for every due hold
+        
+        Returns:
+            int: Number of holds released
+        """
+        expire = (
+            update(StockReservation)
+            .where(
+                StockReservation.status == "held",
+                StockReservation.expires_at <= datetime.utcnow()
+            )
+            .values(status="expired")
+            .returning(StockReservation.sweet_id, StockReservation.quantity)
+            .execution_options(synchronize_session=False)
+        )
+        if hold_ids is not None:
+            if not hold_ids:
+                return 0
+            expire = expire.where(StockReservation.id.in_(hold_ids))
+        
+        released: dict[int, int] = {}
+        count = 0
+        for sweet_id, quantity in db.execute(expire):
+            released[sweet_id] = released.get(sweet_id, 0) + quantity
+            count += 1
+        
+        # Return stock in sweet ID order, matching the purchase lock order
+        for sweet_id in sorted(released):
+            StockShardService.put(db, sweet_id, released[sweet_id])
+        db.commit()
+        if released:
+            catalog_version.stock_changed(released)
+        
+        return count
+    
+    @staticmethod
+    def _raise_not_live(db: Session, user_id: int, hold_id: str) -> None:
+        """Explain why a hold could not be settled."""
+        db.rollback()
+        hold = db.execute(
+            select(StockReservation.status)
+            .where(StockReservation.id == hold_id, StockReservation.user_id == user_id)
+        ).first()
+        
+        if hold is None:
+            raise ResourceNotFoundException(f"Reservation {hold_id} not found")
+        if hold.status in ("held", "expired"):
+            raise ValidationException(f"Reservation {hold_id} has expired")
+        raise ValidationException(f"Reservation {hold_id} is already {hold.status}")
+
+
+class ReservationSweeper:
+    """
+    Background reclaimer for expired holds.
+    
+    Keeps a min-heap of (expires_at, hold_id) so the worker sleeps exactly
+    until the next expiry instead of polling the table. Holds settled in
+    the meantime are skipped lazily by the status compare-and-set. A slow
+    periodic sweep over the (status, expires_at) index picks up holds
+    placed by other worker processes that did not live to expire them.
+    """
+    
+    def __init__(self, session_factory: Callable[[], Session], reload_seconds: float = 60.0):
+        self.session_factory = session_factory
+        self.reload_seconds = reload_seconds
+        self._heap: list[tuple[datetime, str]] = []
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._worker: Optional[threading.Thread] = None
+    
+    def start(self) -> None:
+        """Load live holds and start the worker thread."""
+        if self._worker is not None:
+            return
+        
+        db = self.session_factory()
+        try:
+            rows = db.execute(
+                select(StockReservation.expires_at, StockReservation.id)
+                .where(StockReservation.status == "held")
+            ).all()
+        finally:
+            db.close()
+        
+        with self._cond:
+            self._heap = [(expires_at, hold_id) for expires_at, hold_id in rows]
+            heapq.heapify(self._heap)
+            self._stopping = False
+        
+        self._worker = threading.Thread(target=self._run, name="reservation-sweeper", daemon=True)
+        self._worker.start()
+    
+    def stop(self) -> None:
+        """Stop the worker thread."""
+        if self._worker is not None:
+            with self._cond:
+                self._stopping = True
+                self._cond.notify()
+            self._worker.join()
+            self._worker = None
+    
+    def schedule(self, hold_id: str, expires_at: datetime) -> None:
+        """
+        Register a new hold for expiry.
+        
+        Args:
+            hold_id: Reservation ID
+            expires_at: Expiry time (naive UTC)
+        """
+        with self._cond:
+            heapq.heappush(self._heap, (expires_at, hold_id))
+            # Only wake the worker when this hold is now the earliest
+            if self._heap[0][1] == hold_id:
+                self._cond.notify()
+    
+    def pending(self) -> int:
+        """Number of holds waiting in the heap."""
+        with self._cond:
+            return len(self._heap)
+    
+    def _next_due(self) -> tuple[list[str], bool]:
+        """Sleep until holds are due or a periodic sweep is owed."""
+        sweep_at = datetime.utcnow() + timedelta(seconds=self.reload_seconds)
+        with self._cond:
+            while not self._stopping:
+                now = datetime.utcnow()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    due.append(heapq.heappop(self._heap)[1])
+                if due:
+                    return due, False
+                if now >= sweep_at:
+                    return [], True
+                
+                wake_at = min(self._heap[0][0], sweep_at) if self._heap else sweep_at
+                self._cond.wait((wake_at - now).total_seconds())
+        return [], False
+    
+    def _run(self) -> None:
+        while True:
+            due, sweep = self._next_due()
+            if not due and not sweep:
+                return
+            
+            db = self.session_factory()
+            try:
+                ReservationService.release_expired(db, None if sweep else due)
+            except Exception:
+                db.rollback()
+                # Try again shortly rather than leaking the stock
+                retry_at = datetime.utcnow() + timedelta(seconds=1)
+                with self._cond:
+                    for hold_id in due:
+                        heapq.heappush(self._heap, (retry_at, hold_id))
+            finally:
+                db.close()
+
+
+# Process-wide sweeper, created at application startup
+reservation_sweeper: WorkerSlot[ReservationSweeper] = WorkerSlot()
+
+
+def schedule_reservation_expiry(hold_id: str, expires_at: datetime) -> None:
+    """Hand a new hold to the running sweeper, if any."""
+    if reservation_sweeper.current is not None:
+        reservation_sweeper.current.schedule(hold_id, expires_at)
+
+
+def start_reservation_sweeper(session_factory: Callable[[], Session]) -> Optional[ReservationSweeper]:
+    """
+    Start the process-wide sweeper if enabled in settings.
+    
+    Args:
+        session_factory: Factory for the worker's database sessions
+    
+    Returns:
+        ReservationSweeper: The running sweeper, or None when disabled
+    """
+    return reservation_sweeper.start(
+        settings.reservation_sweeper_enabled,
+        lambda: ReservationSweeper(
+            session_factory,
+            reload_seconds=settings.reservation_sweeper_reload_seconds
+        )
+    )
+
+
+def stop_reservation_sweeper() -> None:
+    """Stop the process-wide sweeper."""
+    reservation_sweeper.stop()
@@ -0,0 +1,124 @@
+"""
+Result cache for sweet searches.
+Popular searches repeat constantly, so whole result pages are cached under a
+canonical form of the request and the catalog version they were read at.
+"""
+
+from typing import Hashable, Optional
+
+from app.schemas.sweet import SweetSearchRequest
+from app.services.pagination import Page
+from app.services.sweet_counts import SweetCounter
+from app.core.cache import TTLCache
+from app.core.catalog import catalog_version
+from app.config import settings
+
+
+# Rough per-object overheads used to keep the byte budget honest
+_PAGE_BYTES = 512
+_SWEET_BYTES = 640
+
+
+def page_size(page: Page) -> int:
+    """
+    Approximate memory held by a cached page.
+    
+    Args:
+        page: Page whose items are SweetRow dicts
+    
+    Returns:
+        int: Estimated size in bytes
+    """
+    size = _PAGE_BYTES + len(page.next_cursor or "")
+    for sweet in page.items:
+        size += _SWEET_BYTES + len(sweet["name"]) + len(sweet["category"]) + len(sweet["description"] or "")
+    if page.facets:
+        size += _PAGE_BYTES + 64 * (len(page.facets["categories"]) + len(page.facets["price_buckets"]))
+    return size
+
+
+class SearchResultCache:
+    """
+    LRU cache of search result pages with a byte budget.
+    
+    Every write through SweetService, InventoryService or the reservation
+    service bumps catalog_version, and the stock counter is part of each
+    key, so entries from before a write simply stop matching and age out of
+    the LRU; nothing scans for them. The TTL bounds staleness from writes
+    made by other worker processes.
+    """
+    
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self._cache = TTLCache(
+            "search_results",
+            max_entries=max_entries,
+            ttl_seconds=ttl_seconds,
+            max_bytes=max_bytes,
+            sizeof=page_size
+        )
+    
+    @staticmethod
+    def key(search_params: SweetSearchRequest) -> Hashable:
+        """
+        Canonical cache key for a search at the current catalog version.
+        
+        Read the key before running the search: if a write lands while the
+        search runs, the result is stored under the older version and is
+        never served.
+        
+        Args:
+            search_params: Search request (name already trimmed)
+        
+        Returns:
+            Hashable: Cache key
+        """
+        filters = SweetCounter.normalize(
+            name=search_params.name,
+            fuzzy=search_params.fuzzy,
+            category=search_params.category,
+            min_price=search_params.min_price,
+            max_price=search_params.max_price,
+            in_stock=search_params.in_stock
+        )
+        include_total = search_params.include_total
+        if include_total is None:
+            include_total = search_params.cursor is None
+        return (
+            tuple(sorted(filters.items())),
+            search_params.sort,
+            search_params.limit,
+            search_params.cursor,
+            include_total,
+            search_params.count_mode if include_total else None,
+            search_params.facets,
+            # Pages from different search paths must not stand in for each other
+            settings.name_search_backend,
+            settings.catalog_snapshot_enabled,
+            catalog_version.stock
+        )
+    
+    def get(self, key: Hashable) -> Optional[Page]:
+        """Cached page for a key, or None."""
+        return self._cache.get(key)
+    
+    def set(self, key: Hashable, page: Page) -> Page:
+        """
+        Cache a page.
+        
+        Args:
+            key: Key from key(), taken before the search ran
+            page: Search result; its SweetRow items must not be modified
+                once cached
+        
+        Returns:
+            Page: The same page
+        """
+        self._cache.set(key, page)
+        return page
+
+
+search_cache = SearchResultCache(
+    settings.search_cache_max_entries,
+    settings.search_cache_max_bytes,
+    settings.search_cache_ttl_seconds
+)
@@ -0,0 +1,439 @@
+"""
+Sharded stock counters for hot sweets.
+Splits a sweet's stock over several counter rows so concurrent purchases
+do not all contend for the same row lock.
+"""
+
+import random
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import bindparam, delete, event, exists, func, insert, select, update
+from app.models.sweet import Sweet, SweetStockShard
+from app.core.exceptions import ResourceNotFoundException, ValidationException
+from app.core.catalog import catalog_version
+from app.config import settings
+
+
+# Session.info key for sweets whose cached sum must be rewritten after commit
+_REFRESH_KEY = "stock_shards.refresh"
+
+
+def sharded_clause(sweets=Sweet.__table__):
+    """SQL expression that is true when the given sweets row has stock shards."""
+    shards = SweetStockShard.__table__
+    return exists().where(shards.c.sweet_id == sweets.c.id)
+
+
+class ShardRegistry:
+    """
+    Process-local map of sharded sweet IDs to their shard counts.
+    
+    Used as a hint only: purchase paths verify against the database, and the
+    map is reloaded after a TTL so changes made by other workers show up.
+    """
+    
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._shards: dict[int, int] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+    
+    def _ensure_loaded(self, db: Session) -> None:
+        now = time.monotonic()
+        if self._loaded_at is not None and now - self._loaded_at < self.ttl_seconds:
+            return
+        with self._lock:
+            if self._loaded_at is not None and now - self._loaded_at < self.ttl_seconds:
+                return
+            rows = db.execute(
+                select(SweetStockShard.sweet_id, func.count())
+                .group_by(SweetStockShard.sweet_id)
+            )
+            self._shards = {sweet_id: count for sweet_id, count in rows}
+            self._loaded_at = now
+    
+    def shard_count(self, db: Session, sweet_id: int) -> int:
+        """Return the known shard count for a sweet (0 if not sharded)."""
+        self._ensure_loaded(db)
+        return self._shards.get(sweet_id, 0)
+    
+    def sharded_ids(self, db: Session, sweet_ids) -> list[int]:
+        """Filter sweet IDs down to those known to be sharded."""
+        self._ensure_loaded(db)
+        return [sweet_id for sweet_id in sweet_ids if sweet_id in self._shards]
+    
+    def set(self, sweet_id: int, shard_count: int) -> None:
+        """Record a sweet's shard count (0 removes it)."""
+        shards = dict(self._shards)
+        if shard_count:
+            shards[sweet_id] = shard_count
+        else:
+            shards.pop(sweet_id, None)
+        self._shards = shards
+    
+    def clear(self) -> None:
+        """Forget everything and reload on next use."""
+        with self._lock:
+            self._shards = {}
+            self._loaded_at = None
+
+
+shard_registry = ShardRegistry(settings.stock_shard_registry_ttl_seconds)
+
+
+class StockShardService:
+    """Service class for sharded inventory counters."""
+    
+    @staticmethod
+    def is_sharded(db: Session, sweet_id: int) -> bool:
+        """
+        Check whether a sweet is (believed to be) in sharded mode.
+        
+        Args:
+            db: Database session
+            sweet_id: Sweet ID
+        
+        Returns:
+            bool: True if the registry lists the sweet as sharded
+        """
+        return shard_registry.shard_count(db, sweet_id) > 0
+    
+    @staticmethod
+    def configure(db: Session, sweet_id: int, shard_count: int) -> Sweet:
+        """
+        Enable, resize or disable sharded inventory for a sweet (admin-only).
+        
+        Current stock is redistributed evenly over the new shards; a shard
+        count of 0 folds all shard stock back into the sweets row.
+        
+        Args:
+            db: Database session
+            sweet_id: Sweet ID
+            shard_count: Number of counter rows (0 disables sharding)
+        
+        Returns:
+            Sweet: Updated sweet object
+        
+        Raises:
+            ResourceNotFoundException: If sweet not found
+            ValidationException: If shard count is invalid
+        """
+        if shard_count < 0 or shard_count > 64:
+            raise ValidationException("Shard count must be between 0 and 64")
+        
+        sweet = db.execute(
+            select(Sweet).where(Sweet.id == sweet_id).with_for_update()
+        ).scalar_one_or_none()
+        if not sweet:
+            raise ResourceNotFoundException(f"Sweet with ID {sweet_id} not found")
+        
+        shard_total = db.execute(
+            select(func.sum(SweetStockShard.quantity))
+            .where(SweetStockShard.sweet_id == sweet_id)
+        ).scalar()
+        total = sweet.quantity if shard_total is None else shard_total
+        
+        db.execute(delete(SweetStockShard).where(SweetStockShard.sweet_id == sweet_id))
+        if shard_count:
+            db.execute(insert(SweetStockShard), [
+                {"sweet_id": sweet_id, "shard_no": shard_no, "quantity": quantity}
+                for shard_no, quantity in enumerate(StockShardService._split(total, shard_count))
+            ])
+        
+        # The sweets row keeps a cached sum of the shards
+        sweet.quantity = total
+        sweet.is_available = total > 0
+        db.commit()
+        db.refresh(sweet)
+        catalog_version.stock_changed([sweet_id])
+        
+        shard_registry.set(sweet_id, shard_count)
+        return sweet
+    
+    @staticmethod
+    def take(db: Session, sweet_id: int, quantity: int) -> bool:
+        """
+        Remove stock from a sharded sweet without committing.
+        
+        Tries single shards in random order first, so concurrent buyers
+        usually touch different rows, then falls back to draining several
+        shards under lock when no single shard holds enough. When a shard
+        runs dry the sweets row's cached sum is rewritten after commit, so
+        a sold-out sweet stops matching stock filters.
+        
+        Args:
+            db: Database session
+            sweet_id: Sweet ID
+            quantity: Quantity to remove
+        
+        Returns:
+            bool: True if the stock was taken, False if there is not enough
+        """
+        shards = SweetStockShard.__table__
+        shard_nos = list(range(shard_registry.shard_count(db, sweet_id)))
+        random.shuffle(shard_nos)
+        
+        for shard_no in shard_nos:
+            remaining = db.execute(
+                update(shards)
+                .where(
+                    shards.c.sweet_id == sweet_id,
+                    shards.c.shard_no == shard_no,
+                    shards.c.quantity >= quantity
+                )
+                .values(quantity=shards.c.quantity - quantity)
+                .returning(shards.c.quantity)
+            ).scalar_one_or_none()
+            if remaining is not None:
+                if remaining == 0:
+                    _refresh_after_commit(db, sweet_id)
+                return True
+        
+        # No single shard is deep enough: lock them all in order and drain
+        rows = db.execute(
+            select(shards.c.shard_no, shards.c.quantity)
+            .where(shards.c.sweet_id == sweet_id)
+            .order_by(shards.c.shard_no)
+            .with_for_update()
+        ).all()
+        shard_registry.set(sweet_id, len(rows))
+        total = sum(row.quantity for row in rows)
+        if total < quantity:
+            return False
+        if total == quantity:
+            _refresh_after_commit(db, sweet_id)
+        
+        drained = []
+        for row in rows:
+            if quantity == 0:
+                break
+            amount = min(row.quantity, quantity)
+            if amount:
+                drained.append({"b_no": row.shard_no, "b_qty": amount})
+                quantity -= amount
+        
+        db.execute(
+            update(shards)
+            .where(shards.c.sweet_id == sweet_id, shards.c.shard_no == bindparam("b_no"))
+            .values(quantity=shards.c.quantity - bindparam("b_qty")),
+            drained
+        )
+        return True
+    
+    @staticmethod
+    def put(db: Session, sweet_id: int, quantity: int) -> None:
+        """
+        Return stock to a sweet without committing.
+        
+        Sharded sweets get the stock on a random shard, and their cached
+        sum is rewritten after commit in case they were sold out; sweets
+        without shards (including ones that just left sharded mode) get it
+        back on the sweets row.
+        
+        Args:
+            db: Database session
+            sweet_id: Sweet ID
+            quantity: Quantity to add back
+        """
+        shards = SweetStockShard.__table__
+        shard_count = shard_registry.shard_count(db, sweet_id)
+        if shard_count:
+            returned = db.execute(
+                update(shards)
+                .where(shards.c.sweet_id == sweet_id, shards.c.shard_no == random.randrange(shard_count))
+                .values(quantity=shards.c.quantity + quantity)
+            ).rowcount
+            if returned:
+                _refresh_after_commit(db, sweet_id)
+                return
+        
+        first_shard = (
+            select(func.min(shards.c.shard_no))
+            .where(shards.c.sweet_id == sweet_id)
+            .scalar_subquery()
+        )
+        returned = db.execute(
+            update(shards)
+            .where(shards.c.sweet_id == sweet_id, shards.c.shard_no == first_shard)
+            .values(quantity=shards.c.quantity + quantity)
+        ).rowcount
+        if returned:
+            _refresh_after_commit(db, sweet_id)
+        else:
+            sweets = Sweet.__table__
+            db.execute(
+                update(sweets)
+                .where(sweets.c.id == sweet_id)
+                .values(quantity=sweets.c.quantity + quantity, is_available=True)
+            )
+    
+    @staticmethod
+    def rebalance(
+        db: Session,
+        sweet_id: int,
+        added: int = 0,
+        total: Optional[int] = None
+    ) -> Optional[int]:
+        """
+        Spread a sharded sweet's stock evenly over its shards without committing.
+        
+        Args:
+            db: Database session
+            sweet_id: Sweet ID
+            added: Quantity to add before redistributing (restock)
+            total: New absolute stock level, replacing the current sum
+        
+        Returns:
+            int: New total stock, also written to the sweets row as cached sum,
+                or None if the sweet has no shards
+        """
+        shards = SweetStockShard.__table__
+        rows = db.execute(
+            select(shards.c.shard_no, shards.c.quantity)
+            .where(shards.c.sweet_id == sweet_id)
+            .order_by(shards.c.shard_no)
+            .with_for_update()
+        ).all()
+        shard_registry.set(sweet_id, len(rows))
+        if not rows:
+            return None
+        
+        if total is None:
+            total = sum(row.quantity for row in rows) + added
+        
+        db.execute(
+            update(shards)
+            .where(shards.c.sweet_id == sweet_id, shards.c.shard_no == bindparam("b_no"))
+            .values(quantity=bindparam("b_qty")),
+            [
+                {"b_no": row.shard_no, "b_qty": quantity}
+                for row, quantity in zip(rows, StockShardService._split(total, len(rows)))
+            ]
+        )
+        db.execute(
+            update(Sweet)
+            .where(Sweet.id == sweet_id)
+            .values(quantity=total)
+            .execution_options(synchronize_session=False)
+        )
+        return total
+    
+    @staticmethod
+    def totals(db: Session, sweet_ids) -> dict[int, int]:
+        """
+        Sum the shards of several sweets with one aggregate query.
+        
+        Args:
+            db: Database session
+            sweet_ids: Sweet IDs to sum
+        
+        Returns:
+            dict: Sweet ID to total stock, for sweets that have shards
+        """
+        rows = db.execute(
+            select(SweetStockShard.sweet_id, func.sum(SweetStockShard.quantity))
+            .where(SweetStockShard.sweet_id.in_(sweet_ids))
+            .group_by(SweetStockShard.sweet_id)
+        )
+        return {sweet_id: total for sweet_id, total in rows}
+    
+    @staticmethod
+    def apply_totals(db: Session, sweets: list[Sweet]) -> list[Sweet]:
+        """
+        Replace the cached quantity of sharded sweets with their live shard sum.
+        
+        Only runs a query when the page contains sharded sweets. Values are set
+        as committed state so they are never written back.
+        
+        Args:
+            db: Database session
+            sweets: Loaded Sweet objects
+        
+        Returns:
+            list: The same Sweet objects
+        """
+        sharded = shard_registry.sharded_ids(db, (sweet.id for sweet in sweets))
+        if sharded:
+            totals = StockShardService.totals(db, sharded)
+            for sweet in sweets:
+                if sweet.id in totals:
+                    set_committed_value(sweet, "quantity", totals[sweet.id])
+                    set_committed_value(sweet, "is_available", bool(sweet.is_available) and totals[sweet.id] > 0)
+        return sweets
+    
+    @staticmethod
+    def apply_row_totals(db: Session, rows: list[dict]) -> list[dict]:
+        """
+        apply_totals for sweets loaded as SweetRow dicts instead of entities.
+        
+        Args:
+            db: Database session
+            rows: Sweet dicts with id, quantity and is_available
+        
+        Returns:
+            list: The same dicts, updated in place
+        """
+        sharded = shard_registry.sharded_ids(db, (row["id"] for row in rows))
+        if sharded:
+            totals = StockShardService.totals(db, sharded)
+            for row in rows:
+                if row["id"] in totals:
+                    row["quantity"] = totals[row["id"]]
+                    row["is_available"] = bool(row["is_available"]) and totals[row["id"]] > 0
+        return rows
+    
+    @staticmethod
+    def _split(total: int, shard_count: int) -> list[int]:
+        """Split a total as evenly as possible over shard_count shards."""
+        base, extra = divmod(total, shard_count)
+        return [base + (1 if shard_no < extra else 0) for shard_no in range(shard_count)]
+
+
+def _refresh_after_commit(db: Session, sweet_id: int) -> None:
+    """Rewrite a sharded sweet's cached sum once db's transaction commits."""
+    db.info.setdefault(_REFRESH_KEY, set()).add(sweet_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _write_cached_sums(session: Session) -> None:
+    """
+    Copy the live shard sums of sweets that crossed zero to their sweets rows.
+    
+    Runs in its own short transaction after the purchase has committed:
+    writing the sweets row inside the purchase would take its lock after a
+    shard lock, the reverse of checkout's order. Each sweets row is locked
+    before its shards are summed, so the last of several concurrent buyers
+    to finish always sees every other buyer's take.
+    """
+    sweet_ids = session.info.pop(_REFRESH_KEY, None)
+    if not sweet_ids:
+        return
+    
+    sweets = Sweet.__table__
+    shards = SweetStockShard.__table__
+    try:
+        with session.get_bind().connect() as connection, connection.begin():
+            for sweet_id in sorted(sweet_ids):
+                connection.execute(select(sweets.c.id).where(sweets.c.id == sweet_id).with_for_update())
+                total = connection.execute(
+                    select(func.sum(shards.c.quantity)).where(shards.c.sweet_id == sweet_id)
+                ).scalar()
+                if total is not None:
+                    connection.execute(
+                        update(sweets)
+                        .where(sweets.c.id == sweet_id)
+                        .values(quantity=total, is_available=total > 0)
+                    )
+    except Exception:
+        # The purchase itself is committed; the cached sum catches up at the
+        # next take that empties a shard, or at the next restock
+        pass
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_cached_sums(session: Session) -> None:
+    session.info.pop(_REFRESH_KEY, None)
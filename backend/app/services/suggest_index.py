@@ -0,0 +1,261 @@
+"""
+Prefix autocomplete over sweet names and categories.
+Keeps lowercased name keys in one sorted list so every prefix is a
+contiguous range found with two bisections, and ranks the range by
+popularity or stock without touching the database.
+"""
+
+import heapq
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Literal, Sequence
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.models.sweet import Sweet, Purchase
+from app.core.cache import IndexReloader, TTLCache
+from app.core.catalog import catalog_version
+from app.config import settings
+
+
+SuggestRank = Literal["popularity", "stock"]
+
+# Sorts after every character a prefix can continue with
+_PREFIX_END = "\U0010ffff"
+
+
+def completion_keys(name: str) -> list[str]:
+    """
+    Lowercased keys a name can be completed from.
+    
+    The full name, plus the tail starting at every later word, so typing
+    "truf" suggests "Chocolate Truffle".
+    """
+    name = name.lower()
+    keys = [name]
+    for position, char in enumerate(name):
+        if char == " " and position + 1 < len(name) and name[position + 1] != " ":
+            keys.append(name[position + 1:])
+    return keys
+
+
+class SuggestIndex:
+    """
+    Process-local sorted-array index for autocomplete.
+    
+    Keys and their sweet IDs live in two parallel sorted sequences (a list
+    of strings and a packed array), so a prefix lookup is two bisections
+    and a slice. Per-sweet scores (units sold, units in stock) are kept
+    beside the keys and can change without reordering anything.
+    
+    Changes arrive through the catalog version listeners: the changed IDs
+    are re-read on the next lookup and their keys replaced in one merge.
+    Units sold are handed in by the purchase paths through record_sales(),
+    so a purchase never costs a scan of the purchases table. A background
+    reload after a TTL picks up writes from other worker processes.
+    Prefixes matching more keys than scan_limit (one or two letters on a
+    large catalog) are ranked once and their top completions cached per
+    catalog version for a few seconds, so their ranking may briefly lag
+    stock and sales.
+    """
+    
+    def __init__(self, refresh_seconds: float, scan_limit: int, cache_ttl_seconds: float):
+        self.scan_limit = scan_limit
+        self._keys: list[str] = []
+        self._ids = array("q")
+        self._sweets: dict[int, tuple[str, str]] = {}
+        self._sold: dict[int, int] = {}
+        self._stock: dict[int, int] = {}
+        self._categories: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._dirty: set[int] = set()
+        # Journals (sweet_id, units sold) while a load runs: patched IDs
+        # with None, to be re-read after it, and sales to add to its totals
+        self._reload = IndexReloader("suggest-index", self._lock, refresh_seconds)
+        self._top = TTLCache("suggest_top", max_entries=4096, ttl_seconds=cache_ttl_seconds)
+    
+    def load(self, db: Session) -> None:
+        """
+        Build the index from the sweets table and purchase totals.
+        
+        Args:
+            db: Database session
+        """
+        def build():
+            # Totals first: a sale committed before this read but recorded
+            # after the journal started would be counted twice, and that
+            # window is only as long as this one query
+            sold = dict(db.execute(
+                select(Purchase.sweet_id, func.sum(Purchase.quantity)).group_by(Purchase.sweet_id)
+            ).all())
+            sweets, stock, categories, entries = {}, {}, {}, []
+            for sweet_id, name, category, quantity in db.execute(
+                select(Sweet.id, Sweet.name, Sweet.category, Sweet.quantity)
+            ):
+                sweets[sweet_id] = (name, category)
+                stock[sweet_id] = quantity
+                categories[category] = categories.get(category, 0) + 1
+                entries.extend((key, sweet_id) for key in completion_keys(name))
+            entries.sort()
+            return sweets, stock, sold, categories, entries
+        
+        def install(built, journal):
+            self._sweets, self._stock, self._sold, self._categories, entries = built
+            self._keys = [key for key, _ in entries]
+            self._ids = array("q", (sweet_id for _, sweet_id in entries))
+            for sweet_id, quantity in journal:
+                if quantity is None:
+                    self._dirty.add(sweet_id)
+                else:
+                    self._sold[sweet_id] = self._sold.get(sweet_id, 0) + quantity
+        
+        self._reload.load(build, install)
+    
+    def invalidate(self, sweet_ids: Sequence[int]) -> None:
+        """Mark sweets to be re-read before the next lookup."""
+        if sweet_ids:
+            with self._lock:
+                self._dirty.update(sweet_ids)
+    
+    def record_sales(self, sales: Iterable[tuple[int, int]]) -> None:
+        """
+        Add committed purchases to the popularity scores.
+        
+        Args:
+            sales: (sweet_id, quantity) pairs
+        """
+        sales = list(sales)
+        with self._lock:
+            self._reload.journal(sales)
+            for sweet_id, quantity in sales:
+                self._sold[sweet_id] = self._sold.get(sweet_id, 0) + quantity
+    
+    def clear(self) -> None:
+        """Forget everything and rebuild on next use."""
+        with self._lock:
+            self._keys = []
+            self._ids = array("q")
+            self._sweets = {}
+            self._sold = {}
+            self._stock = {}
+            self._categories = {}
+            self._dirty = set()
+            self._reload.loaded_at = None
+        self._top.clear()
+    
+    def suggest(
+        self,
+        db: Session,
+        prefix: str,
+        limit: int = 10,
+        rank: SuggestRank = "popularity"
+    ) -> dict:
+        """
+        Top completions for a typed prefix.
+        
+        Args:
+            db: Database session (used to load or patch the index)
+            prefix: Text typed so far, matched case-insensitively
+            limit: Maximum sweets and categories to return
+            rank: Order sweets by units sold or by units in stock
+        
+        Returns:
+            dict: "sweets" (id, name, category) and "categories" (name,
+                sweet_count), best first
+        """
+        prefix = prefix.strip().lower()
+        self._sync(db)
+        
+        with self._lock:
+            scores = self._sold if rank == "popularity" else self._stock
+            low = bisect_left(self._keys, prefix)
+            high = bisect_left(self._keys, prefix + _PREFIX_END, low)
+            if high - low > self.scan_limit:
+                key = (prefix, rank, limit, catalog_version.catalog)
+                top = self._top.get(key)
+                if top is None:
+                    top = self._rank(self._ids[low:high], scores, limit)
+                    self._top.set(key, top)
+            else:
+                top = self._rank(self._ids[low:high], scores, limit)
+            sweets = [
+                {"id": sweet_id, "name": self._sweets[sweet_id][0], "category": self._sweets[sweet_id][1]}
+                for sweet_id in top if sweet_id in self._sweets
+            ]
+            categories = heapq.nsmallest(
+                limit,
+                (
+                    (-count, category) for category, count in self._categories.items()
+                    if count > 0 and category.lower().startswith(prefix)
+                )
+            )
+        
+        return {
+            "sweets": sweets,
+            "categories": [{"name": category, "sweet_count": -count} for count, category in categories]
+        }
+    
+    @staticmethod
+    def _rank(ids: Sequence[int], scores: dict[int, int], limit: int) -> list[int]:
+        """Best-scored distinct IDs, ties broken by lowest ID."""
+        best = heapq.nsmallest(limit, {(-scores.get(sweet_id, 0), sweet_id) for sweet_id in ids})
+        return [sweet_id for _, sweet_id in best]
+    
+    def _sync(self, db: Session) -> None:
+        """Load on first use, patch dirty sweets, and start a reload once stale."""
+        self._reload.ensure_fresh(db, self.load)
+        
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            self._reload.journal((sweet_id, None) for sweet_id in dirty)
+        if not dirty:
+            return
+        
+        rows = db.execute(
+            select(Sweet.id, Sweet.name, Sweet.category, Sweet.quantity).where(Sweet.id.in_(dirty))
+        ).all()
+        with self._lock:
+            self._patch(dirty, {row.id: row for row in rows})
+    
+    def _patch(self, dirty: set[int], current: dict) -> None:
+        """Replace the keys and stock of re-read sweets; caller holds the lock."""
+        removed: set[int] = set()
+        added: list[tuple[str, int]] = []
+        for sweet_id in dirty:
+            row = current.get(sweet_id)
+            old = self._sweets.get(sweet_id)
+            if old is not None and (row is None or (row.name, row.category) != old):
+                removed.add(sweet_id)
+                self._categories[old[1]] -= 1
+                del self._sweets[sweet_id]
+            
+            if row is None:
+                self._stock.pop(sweet_id, None)
+                self._sold.pop(sweet_id, None)
+                continue
+            
+            if sweet_id not in self._sweets:
+                added.extend((key, sweet_id) for key in completion_keys(row.name))
+                self._sweets[sweet_id] = (row.name, row.category)
+                self._categories[row.category] = self._categories.get(row.category, 0) + 1
+            self._stock[sweet_id] = row.quantity
+        
+        if not removed and not added:
+            return
+        # One pass over the keys for the whole sync, however many sweets changed
+        kept = (
+            (key, sweet_id) for key, sweet_id in zip(self._keys, self._ids)
+            if sweet_id not in removed
+        )
+        entries = list(heapq.merge(kept, sorted(added)))
+        self._keys = [key for key, _ in entries]
+        self._ids = array("q", (sweet_id for _, sweet_id in entries))
+
+
+suggest_index = SuggestIndex(
+    settings.suggest_refresh_seconds,
+    settings.suggest_scan_limit,
+    settings.suggest_cache_ttl_seconds
+)
+catalog_version.subscribe(suggest_index.invalidate)
@@ -0,0 +1,261 @@
+"""
+Read-through cache of serialized sweet records for GET /api/sweets/{id}.
+Entries are dropped whenever a sweet changes, in this process through the
+catalog version listeners and, optionally, in every other worker through
+PostgreSQL LISTEN/NOTIFY.
+"""
+
+import logging
+import queue
+import select
+import threading
+from typing import Iterable, NamedTuple, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from app.core.cache import TTLCache
+from app.core.catalog import catalog_version
+from app.config import settings
+
+
+# Invalidation generations are striped over this many counters
+_STRIPES = 1024
+
+# NOTIFY payloads must stay under 8000 bytes
+_IDS_PER_NOTIFY = 500
+
+logger = logging.getLogger(__name__)
+
+
+class SweetRecord(NamedTuple):
+    """A serialized sweet with its conditional GET validators."""
+    
+    body: bytes
+    etag: str
+    last_modified: Optional[str]
+
+
+class SweetRecordCache:
+    """
+    Per-process LRU + TTL cache of sweet records as JSON bytes.
+    
+    Only the read endpoint uses it; write paths always load rows from the
+    database. A read that raced with a write must not store the stale row
+    it loaded, so every invalidation bumps a generation counter (striped by
+    sweet ID) and a record is only stored if its stripe's generation is
+    unchanged since the read began.
+    """
+    
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self._cache = TTLCache(
+            "sweet_records",
+            max_entries=max_entries,
+            ttl_seconds=ttl_seconds,
+            max_bytes=max_bytes,
+            sizeof=lambda record: len(record.body) + len(record.etag) + len(record.last_modified or "")
+        )
+        self._generations = [0] * _STRIPES
+        self._lock = threading.Lock()
+        self.bus: Optional["InvalidationBus"] = None
+    
+    def get(self, sweet_id: int) -> Optional[SweetRecord]:
+        """Cached record, or None."""
+        return self._cache.get(sweet_id)
+    
+    def generation(self, sweet_id: int) -> int:
+        """Token to take before reading a sweet from the database."""
+        return self._generations[sweet_id % _STRIPES]
+    
+    def set(self, sweet_id: int, record: SweetRecord, generation: int) -> None:
+        """
+        Store a record unless the sweet was invalidated since it was read.
+        
+        Args:
+            sweet_id: Sweet ID
+            record: Serialized SweetResponse and its validators
+            generation: Value of generation() taken before the read
+        """
+        with self._lock:
+            if self._generations[sweet_id % _STRIPES] == generation:
+                self._cache.set(sweet_id, record)
+    
+    def evict(self, sweet_ids: Iterable[int]) -> None:
+        """Drop sweets from this process's cache."""
+        with self._lock:
+            for sweet_id in sweet_ids:
+                self._generations[sweet_id % _STRIPES] += 1
+                self._cache.pop(sweet_id)
+    
+    def clear(self) -> None:
+        """Forget every record."""
+        self._cache.clear()
+
+
+class InvalidationBus:
+    """
+    Broadcasts sweet invalidations between worker processes over
+    PostgreSQL LISTEN/NOTIFY.
+    
+    Publishing is handed to a background thread so a write never waits on
+    (or fails because of) the broadcast; a failed NOTIFY is retried, and
+    one that still fails is logged and counted in stats(). A second thread
+    holds a dedicated connection listening on the channel and replays what
+    other workers report through catalog_version.remote_changed, so this
+    cache and every other catalog listener drop or patch those sweets and
+    version-derived keys and ETags move. Whatever was broadcast while the
+    listener was reconnecting is unknown, so a reconnect drops every
+    cached record and moves the versions. Messages lost anyway are bounded
+    by the cache TTLs and the shared ETag window.
+    """
+    
+    def __init__(self, engine: Engine, channel: str, attempts: int = 3, retry_seconds: float = 0.5):
+        self.engine = engine
+        self.channel = channel
+        self.attempts = attempts
+        self.retry_seconds = retry_seconds
+        self._outbox: queue.Queue = queue.Queue()
+        self._stopping = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self.published = 0
+        self.publish_retries = 0
+        self.publish_failures = 0
+        self.reconnects = 0
+    
+    def start(self) -> None:
+        """Start the publisher and listener threads."""
+        self._threads = [
+            threading.Thread(target=self._publish_loop, name="sweet-cache-publish", daemon=True),
+            threading.Thread(target=self._listen_loop, name="sweet-cache-listen", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+    
+    def stop(self) -> None:
+        """Stop both threads."""
+        self._stopping.set()
+        self._outbox.put(None)
+        for thread in self._threads:
+            thread.join(timeout=5)
+    
+    def publish(self, sweet_ids: list[int]) -> None:
+        """Queue changed sweet IDs for broadcast."""
+        if sweet_ids:
+            self._outbox.put(sweet_ids)
+    
+    def stats(self) -> dict:
+        """Counters for /health/cache."""
+        return {
+            "published": self.published,
+            "publish_retries": self.publish_retries,
+            "publish_failures": self.publish_failures,
+            "listen_reconnects": self.reconnects,
+            "outbox": self._outbox.qsize(),
+        }
+    
+    def _publish_loop(self) -> None:
+        while True:
+            sweet_ids = self._outbox.get()
+            if sweet_ids is None:
+                return
+            self._send(sweet_ids)
+    
+    def _send(self, sweet_ids: list[int]) -> bool:
+        """NOTIFY the IDs, retrying with backoff; False once every attempt failed."""
+        for attempt in range(self.attempts):
+            if attempt:
+                self.publish_retries += 1
+                if self._stopping.wait(self.retry_seconds * 2 ** (attempt - 1)):
+                    break
+            try:
+                with self.engine.connect() as conn:
+                    for start in range(0, len(sweet_ids), _IDS_PER_NOTIFY):
+                        payload = ",".join(map(str, sweet_ids[start:start + _IDS_PER_NOTIFY]))
+                        conn.execute(
+                            text("SELECT pg_notify(:channel, :payload)"),
+                            {"channel": self.channel, "payload": payload}
+                        )
+                    conn.commit()
+                self.published += 1
+                return True
+            except Exception as e:
+                error = e
+        
+        # Other workers fall back to the TTLs and ETag window for this change
+        self.publish_failures += 1
+        logger.warning("Sweet invalidation broadcast failed for %d sweet(s): %s", len(sweet_ids), error)
+        return False
+    
+    def _listen_loop(self) -> None:
+        listened = False
+        while not self._stopping.is_set():
+            try:
+                raw = self.engine.raw_connection()
+            except Exception:
+                self._stopping.wait(1)
+                continue
+            try:
+                conn = raw.driver_connection
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+                if listened:
+                    # Messages sent while we were disconnected are gone
+                    self.reconnects += 1
+                    sweet_cache.clear()
+                    catalog_version.remote_changed(())
+                listened = True
+                while not self._stopping.is_set():
+                    if select.select([conn], [], [], 1.0)[0]:
+                        conn.poll()
+                        while conn.notifies:
+                            note = conn.notifies.pop(0)
+                            catalog_version.remote_changed(
+                                int(value) for value in note.payload.split(",") if value
+                            )
+            except Exception as e:
+                # Reconnect after a dropped connection
+                logger.warning("Sweet invalidation listener lost its connection: %s", e)
+                self._stopping.wait(1)
+            finally:
+                raw.invalidate()
+
+
+sweet_cache = SweetRecordCache(
+    settings.sweet_cache_max_entries,
+    settings.sweet_cache_max_bytes,
+    settings.sweet_cache_ttl_seconds
+)
+catalog_version.subscribe(sweet_cache.evict)
+
+
+def start_sweet_cache_broadcast(engine: Engine) -> Optional[InvalidationBus]:
+    """
+    Start cross-process invalidation if enabled and the database is PostgreSQL.
+    
+    Args:
+        engine: Application database engine
+    
+    Returns:
+        InvalidationBus: The running bus, or None when not broadcasting
+    """
+    if settings.sweet_cache_broadcast and engine.dialect.name == "postgresql" and sweet_cache.bus is None:
+        sweet_cache.bus = InvalidationBus(
+            engine,
+            settings.sweet_cache_channel,
+            attempts=settings.sweet_cache_publish_attempts,
+            retry_seconds=settings.sweet_cache_publish_retry_seconds
+        )
+        # Only local changes are published; relayed ones would echo forever
+        catalog_version.subscribe(sweet_cache.bus.publish, remote=False)
+        catalog_version.shared = True
+        sweet_cache.bus.start()
+    return sweet_cache.bus
+
+
+def stop_sweet_cache_broadcast() -> None:
+    """Stop cross-process invalidation."""
+    if sweet_cache.bus is not None:
+        catalog_version.unsubscribe(sweet_cache.bus.publish)
+        catalog_version.shared = False
+        sweet_cache.bus.stop()
+        sweet_cache.bus = None
@@ -0,0 +1,155 @@
+"""
+Counting strategies for sweet list and search totals.
+Keeps the unfiltered catalog size incrementally, caches filtered counts per
+normalized filter and catalog version, and can read planner estimates on
+PostgreSQL instead of counting at all.
+"""
+
+import json
+import threading
+import time
+from typing import Literal, Optional
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Query, Session
+from app.models.sweet import Sweet
+from app.core.cache import TTLCache
+from app.core.catalog import catalog_version
+from app.config import settings
+
+
+CountMode = Literal["exact", "estimated"]
+
+
+class SweetCounter:
+    """
+    Process-wide source of sweet totals.
+    
+    The unfiltered count is loaded once and then adjusted by create and
+    delete; it is reloaded after a TTL so writes made by other worker
+    processes are picked up. Filtered counts are cached under the current
+    catalog version, so any write makes them miss without explicit
+    invalidation; the TTL bounds staleness from other processes.
+    """
+    
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self._total: Optional[int] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._filtered = TTLCache("sweet_counts", max_entries=max_entries, ttl_seconds=ttl_seconds)
+    
+    def count(
+        self,
+        db: Session,
+        query: Query,
+        filters: Optional[dict] = None,
+        mode: CountMode = "exact"
+    ) -> tuple[int, bool]:
+        """
+        Count the rows matched by a sweets query.
+        
+        Args:
+            db: Database session
+            query: Filtered sweets query
+            filters: Normalized filters the query applies (empty for all sweets)
+            mode: "exact", or "estimated" to allow planner statistics
+        
+        Returns:
+            tuple: (Count, whether it is an estimate)
+        """
+        if mode == "estimated" and db.get_bind().dialect.name == "postgresql":
+            estimate = self._estimate(db, query, filters)
+            if estimate is not None:
+                return estimate, True
+        
+        if not filters:
+            return self._catalog_size(db), False
+        
+        key = (
+            tuple(sorted(filters.items())),
+            catalog_version.catalog,
+            catalog_version.stock if "in_stock" in filters else None
+        )
+        total = self._filtered.get(key)
+        if total is None:
+            total = query.order_by(None).count()
+            self._filtered.set(key, total)
+        return total, False
+    
+    def created(self, count: int = 1) -> None:
+        """Record committed sweet inserts."""
+        with self._lock:
+            if self._total is not None:
+                self._total += count
+    
+    def deleted(self, count: int = 1) -> None:
+        """Record committed sweet deletes."""
+        with self._lock:
+            if self._total is not None:
+                self._total -= count
+    
+    def reset(self) -> None:
+        """Forget the catalog size and every cached count."""
+        with self._lock:
+            self._total = None
+            self._loaded_at = 0.0
+        self._filtered.clear()
+    
+    @staticmethod
+    def normalize(**filters) -> dict:
+        """
+        Canonical form of search filters, used as a cache key.
+        
+        Drops unset filters and folds name case (the name match is
+        case-insensitive), so equivalent searches share one entry.
+        
+        Returns:
+            dict: Filter name to normalized value
+        """
+        normalized = {}
+        for name, value in filters.items():
+            if value is None or value is False or value == "":
+                continue
+            if name == "name":
+                value = value.lower()
+            elif isinstance(value, int) and not isinstance(value, bool):
+                value = float(value)
+            normalized[name] = value
+        return normalized
+    
+    def _catalog_size(self, db: Session) -> int:
+        with self._lock:
+            if self._total is not None and time.monotonic() - self._loaded_at < self.ttl_seconds:
+                return self._total
+        total = db.execute(select(func.count()).select_from(Sweet)).scalar()
+        with self._lock:
+            self._total = total
+            self._loaded_at = time.monotonic()
+        return total
+    
+    def _estimate(self, db: Session, query: Query, filters: Optional[dict]) -> Optional[int]:
+        """Row estimate from PostgreSQL planner statistics, or None if unknown."""
+        if not filters:
+            estimate = db.execute(
+                text("SELECT reltuples FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+                {"table": Sweet.__tablename__}
+            ).scalar()
+            # reltuples is -1 (or 0 on old servers) until the table is analyzed
+            return int(estimate) if estimate and estimate > 0 else None
+        
+        sql, params = self._explain_sql(query.statement, db.get_bind().dialect)
+        plan = db.connection().exec_driver_sql(sql, params).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    
+    @staticmethod
+    def _explain_sql(statement, dialect) -> tuple[str, dict]:
+        """EXPLAIN statement and parameters to run as driver SQL."""
+        # Expanding IN parameters only become driver placeholders once rendered
+        compiled = statement.compile(dialect=dialect, compile_kwargs={"render_postcompile": True})
+        return f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+
+
+sweet_counter = SweetCounter(settings.sweet_count_ttl_seconds, settings.sweet_count_cache_max_entries)
@@ -0,0 +1,148 @@
+"""
+Facet counts for sweet search results.
+Computes per-category counts, a price histogram and availability counts for
+every row a search matches, in one grouped query or one pass over the
+catalog snapshot, and caches them per normalized search.
+"""
+
+from typing import Callable, Sequence
+
+import numpy as np
+from sqlalchemy import case, func
+from sqlalchemy.orm import Query
+from app.models.sweet import Sweet
+from app.core.cache import TTLCache
+from app.core.catalog import catalog_version
+from app.config import settings
+
+
+def build_facets(
+    category_counts: dict[str, int],
+    bucket_counts: Sequence[int],
+    edges: Sequence[float],
+    in_stock: int,
+    total: int
+) -> dict:
+    """
+    Assemble facet counts into the response shape.
+    
+    Args:
+        category_counts: Matches per category
+        bucket_counts: Matches per price bucket; bucket i covers
+            [edges[i - 1], edges[i]), the first starts at 0 and the last is open
+        edges: Price bucket boundaries, ascending
+        in_stock: Matches with quantity above zero
+        total: All matches
+    
+    Returns:
+        dict: categories, price_buckets, in_stock and out_of_stock
+    """
+    bounds = [0.0, *edges]
+    return {
+        "categories": dict(sorted(category_counts.items())),
+        "price_buckets": [
+            {
+                "min_price": bounds[index],
+                "max_price": edges[index] if index < len(edges) else None,
+                "count": int(count)
+            }
+            for index, count in enumerate(bucket_counts)
+        ],
+        "in_stock": int(in_stock),
+        "out_of_stock": int(total - in_stock)
+    }
+
+
+class FacetCounter:
+    """
+    Process-wide source of search facets.
+    
+    Facets depend on stock levels, so cached entries are keyed on the
+    normalized filters plus both catalog version counters; any write makes
+    them miss, and the TTL bounds staleness from other worker processes.
+    """
+    
+    def __init__(self, edges: Sequence[float], ttl_seconds: float, max_entries: int):
+        self.edges = sorted(edges)
+        self._cache = TTLCache("search_facets", max_entries=max_entries, ttl_seconds=ttl_seconds)
+    
+    def get(self, filters: dict, compute: Callable[[], dict]) -> dict:
+        """
+        Facets for a search, computed on a cache miss.
+        
+        Args:
+            filters: Normalized search filters (see SweetCounter.normalize)
+            compute: Produces the facets when they are not cached
+        
+        Returns:
+            dict: Facet counts
+        """
+        key = (tuple(sorted(filters.items())), catalog_version.catalog, catalog_version.stock)
+        facets = self._cache.get(key)
+        if facets is None:
+            facets = compute()
+            self._cache.set(key, facets)
+        return facets
+    
+    def from_query(self, query: Query) -> dict:
+        """
+        Facets of a filtered sweets query, from a single grouped aggregate.
+        
+        Args:
+            query: Filtered sweets query
+        
+        Returns:
+            dict: Facet counts
+        """
+        bucket = case(
+            *((Sweet.price < edge, index) for index, edge in enumerate(self.edges)),
+            else_=len(self.edges)
+        )
+        stocked = case((Sweet.quantity > 0, 1), else_=0)
+        rows = (
+            query.order_by(None)
+            .with_entities(Sweet.category, bucket, stocked, func.count())
+            .group_by(Sweet.category, bucket, stocked)
+            .all()
+        )
+        
+        categories: dict[str, int] = {}
+        buckets = [0] * (len(self.edges) + 1)
+        in_stock = total = 0
+        for category, index, is_stocked, count in rows:
+            categories[category] = categories.get(category, 0) + count
+            buckets[index] += count
+            in_stock += count if is_stocked else 0
+            total += count
+        return build_facets(categories, buckets, self.edges, in_stock, total)
+    
+    def from_columns(self, columns, mask: np.ndarray, categories: Sequence[str]) -> dict:
+        """
+        Facets of the snapshot rows selected by a mask, in one vectorized pass.
+        
+        Args:
+            columns: CatalogColumns of the catalog snapshot
+            mask: Rows matching the search
+            categories: Category string table the codes index into
+        
+        Returns:
+            dict: Facet counts
+        """
+        codes = np.bincount(columns.category_codes[mask], minlength=len(categories))
+        prices = columns.prices[mask]
+        buckets = np.bincount(
+            np.searchsorted(self.edges, prices, side="right"),
+            minlength=len(self.edges) + 1
+        )
+        in_stock = int(np.count_nonzero(columns.quantities[mask] > 0))
+        category_counts = {
+            categories[code]: int(count) for code, count in enumerate(codes) if count
+        }
+        return build_facets(category_counts, buckets.tolist(), self.edges, in_stock, len(prices))
+
+
+search_facets = FacetCounter(
+    settings.search_facet_price_edges,
+    settings.search_facet_ttl_seconds,
+    settings.search_facet_cache_max_entries
+)
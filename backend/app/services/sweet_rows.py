@@ -0,0 +1,93 @@
+"""
+Bulk loading and JSON encoding of sweets for read endpoints.
+Read paths select just the SweetResponse columns as plain rows and encode
+whole lists with one pydantic-core call, instead of building ORM entities
+and validating a SweetResponse per row.
+"""
+
+from datetime import datetime
+from typing import Iterable, Optional, Sequence
+
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Query
+from typing_extensions import TypedDict
+from app.models.sweet import Sweet
+from app.schemas.sweet import SweetListResponse
+from app.services.pagination import Page
+
+
+class SweetRow(TypedDict):
+    """A sweet as loaded for reading: the SweetResponse fields, in order."""
+    
+    id: int
+    name: str
+    description: Optional[str]
+    category: str
+    price: float
+    quantity: int
+    is_available: bool
+    created_at: datetime
+    updated_at: datetime
+
+
+SWEET_FIELDS = tuple(SweetRow.__annotations__)
+SWEET_COLUMNS = tuple(getattr(Sweet, field) for field in SWEET_FIELDS)
+
+_row_adapter = TypeAdapter(SweetRow)
+_rows_adapter = TypeAdapter(list[SweetRow])
+
+# Placeholder spliced out of the rendered envelope
+_EMPTY_SWEETS = b'"sweets":[]'
+
+
+def select_rows(query: Query) -> Query:
+    """Narrow a sweets query to the SweetResponse columns."""
+    return query.with_entities(*SWEET_COLUMNS)
+
+
+def as_rows(results: Iterable[Sequence]) -> list[SweetRow]:
+    """
+    Turn column tuples selected with SWEET_COLUMNS into SweetRow dicts.
+    
+    Args:
+        results: Rows from select_rows() or select(*SWEET_COLUMNS)
+    
+    Returns:
+        list: One dict per row
+    """
+    return [dict(zip(SWEET_FIELDS, row)) for row in results]
+
+
+def encode_sweet(row: SweetRow) -> bytes:
+    """One sweet as SweetResponse JSON."""
+    return _row_adapter.dump_json(row)
+
+
+def encode_sweets(rows: Sequence[SweetRow]) -> bytes:
+    """A list of sweets as a JSON array, in one serializer call."""
+    return _rows_adapter.dump_json(rows)
+
+
+def encode_list_response(page: Page, sweets_json: bytes) -> bytes:
+    """
+    Render a SweetListResponse around an already encoded sweets array.
+    
+    The envelope is rendered by SweetListResponse itself, so the output
+    matches the declared response model.
+    
+    Args:
+        page: Page whose total, total_estimated, next_cursor and facets are used
+        sweets_json: JSON array of SweetResponse objects
+    
+    Returns:
+        bytes: SweetListResponse as JSON
+    """
+    envelope = SweetListResponse(
+        total=page.total,
+        total_estimated=page.total_estimated,
+        sweets=[],
+        next_cursor=page.next_cursor,
+        facets=page.facets
+    ).model_dump_json().encode()
+    head, _, tail = envelope.partition(_EMPTY_SWEETS)
+    return b"".join((head, b'"sweets":', sweets_json, tail))
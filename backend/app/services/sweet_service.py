@@ -3,14 +3,41 @@ Sweet service layer containing product and inventory management business logic.
 Implements separation of concerns and follows SOLID principles.
 """
 
+from datetime import datetime
+from typing import Iterator, Optional
+import numpy as np
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, bindparam, exists, insert, literal, select, update
 from app.models.sweet import Sweet, Purchase
 from app.models.user import User
+from app.services.stock_shards import StockShardService, shard_registry, sharded_clause
+from app.services.pagination import Page, decode_cursor, encode_cursor, paginate, seek
+from app.services.catalog_snapshot import catalog_snapshot
+from app.services.sweet_counts import CountMode, SweetCounter, sweet_counter
+from app.services.sweet_facets import search_facets
+from app.services.search_cache import search_cache
+from app.services.suggest_index import SuggestRank, suggest_index
+from app.services.sweet_cache import SweetRecord, sweet_cache
+from app.services.list_cache import SerializedPage, list_cache
+from app.services.sweet_rows import (
+    SWEET_COLUMNS,
+    SweetRow,
+    as_rows,
+    encode_list_response,
+    encode_sweet,
+    select_rows
+)
+from app.services.name_index import name_index, name_search_backend
+from app.services.idempotency_service import IdempotencyService
+from app.core.catalog import catalog_version
+from app.core.conditional import body_etag, last_modified
+from app.config import settings
 from app.core.exceptions import (
+    SweetShopException,
     ResourceNotFoundException,
     DuplicateResourceException,
     InsufficientInventoryException,
+    ServiceUnavailableException,
     ValidationException
 )
 from app.schemas.sweet import (
@@ -18,10 +45,24 @@ from app.schemas.sweet import (
     SweetUpdateRequest,
     PurchaseRequest,
     RestockRequest,
-    SweetSearchRequest
+    SweetSearchRequest,
+    SweetSort,
+    CheckoutRequest,
+    MAX_PURCHASE_QUANTITY
 )
 
 
+# Sort key columns (each ending in a unique column) and direction per ordering
+SORT_KEYS = {
+    "id": ((Sweet.id,), False),
+    "price_asc": ((Sweet.price, Sweet.id), False),
+    "price_desc": ((Sweet.price, Sweet.id), True),
+    "name": ((Sweet.name,), False),
+    "newest": ((Sweet.created_at, Sweet.id), True),
+    "quantity": ((Sweet.quantity, Sweet.id), True),
+}
+
+
 class SweetService:
     """Service class for sweet product management."""
     
@@ -63,6 +104,9 @@ class SweetService:
         db.add(new_sweet)
         db.commit()
         db.refresh(new_sweet)
+        sweet_counter.created()
+        catalog_version.catalog_changed([new_sweet.id])
+        name_index.add(new_sweet.id, new_sweet.name)
         
         return new_sweet
     
@@ -84,42 +128,398 @@ class SweetService:
         sweet = db.query(Sweet).filter(Sweet.id == sweet_id).first()
         if not sweet:
             raise ResourceNotFoundException(f"Sweet with ID {sweet_id} not found")
+        StockShardService.apply_totals(db, [sweet])
         return sweet
     
     @staticmethod
-    def list_all_sweets(db: Session, skip: int = 0, limit: int = 100) -> tuple[int, list[Sweet]]:
+    def get_sweet_record(db: Session, sweet_id: int) -> SweetRecord:
+        """
+        Serialized sweet for the read endpoint, served from the record cache.
+        
+        The record carries its ETag (a hash of the body) and Last-Modified
+        date, so a cache hit can answer a conditional GET without touching
+        the database or serializing anything. Write paths must keep using
+        get_sweet_by_id, which always reads the database.
+        
+        Args:
+            db: Database session
+            sweet_id: Sweet ID
+            
+        Returns:
+            SweetRecord: SweetResponse as JSON, ETag and Last-Modified
+            
+        Raises:
+            ResourceNotFoundException: If sweet not found
+        """
+        if settings.sweet_cache_enabled:
+            record = sweet_cache.get(sweet_id)
+            if record is not None:
+                return record
+        
+        generation = sweet_cache.generation(sweet_id)
+        row = db.execute(select(*SWEET_COLUMNS).where(Sweet.id == sweet_id)).first()
+        if row is None:
+            raise ResourceNotFoundException(f"Sweet with ID {sweet_id} not found")
+        record = SweetService._sweet_record(StockShardService.apply_row_totals(db, as_rows([row]))[0])
+        if settings.sweet_cache_enabled:
+            sweet_cache.set(sweet_id, record, generation)
+        return record
+    
+    @staticmethod
+    def _sweet_record(row: SweetRow) -> SweetRecord:
+        """Serialize one sweet with its validators."""
+        body = encode_sweet(row)
+        return SweetRecord(body, body_etag(body), last_modified([row["updated_at"]]))
+    
+    @staticmethod
+    def _sweet_records(rows: list[SweetRow], version: int) -> list[SweetRecord]:
+        """
+        Serialized sweets, reusing records from the sweet record cache.
+        
+        Only sweets missing from the cache are encoded. They are stored for
+        reuse unless the catalog moved past version while they were read,
+        in which case a write may have been evicted before they were.
+        
+        Args:
+            rows: Sweets loaded from the database
+            version: catalog_version.stock read before they were loaded
+            
+        Returns:
+            list: One SweetRecord per sweet, in order
+        """
+        records = []
+        for row in rows:
+            record = sweet_cache.get(row["id"]) if settings.sweet_cache_enabled else None
+            if record is None:
+                record = SweetService._sweet_record(row)
+                if settings.sweet_cache_enabled and catalog_version.stock == version:
+                    sweet_cache.set(row["id"], record, sweet_cache.generation(row["id"]))
+            records.append(record)
+        return records
+    
+    @staticmethod
+    def list_all_sweets(
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        include_total: Optional[bool] = None,
+        count_mode: CountMode = "exact",
+        sort: SweetSort = "id"
+    ) -> Page:
         """
         List all available sweets with pagination.
         
+        Pages follow the requested sort, each backed by an index ending in
+        ID. Pass the returned next_cursor to fetch the following page with
+        an index seek instead of an OFFSET scan. Only the SweetResponse
+        columns are loaded, as SweetRow dicts rather than ORM entities.
+        
         Args:
             db: Database session
-            skip: Number of records to skip
+            skip: Number of records to skip (prefer cursor for deep pages)
             limit: Maximum records to return
+            cursor: Cursor returned with the previous page
+            include_total: Whether to count all sweets; by default only the
+                first page (no cursor) is counted
+            count_mode: "exact", or "estimated" to allow planner statistics
+            sort: Result order
             
         Returns:
-            tuple: (Total count, List of Sweet objects)
+            Page: SweetRow dicts, next cursor and total count (None if not counted)
         """
-        total = db.query(Sweet).count()
-        sweets = db.query(Sweet).offset(skip).limit(limit).all()
-        return total, sweets
+        query = db.query(Sweet)
+        return SweetService._page(db, query, {}, skip, limit, cursor, include_total, count_mode, sort)
     
     @staticmethod
-    def search_sweets(db: Session, search_params: SweetSearchRequest) -> tuple[int, list[Sweet]]:
+    def list_sweets_json(
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        include_total: Optional[bool] = None,
+        count_mode: CountMode = "exact",
+        sort: SweetSort = "id"
+    ) -> SerializedPage:
+        """
+        List sweets as a ready-to-send SweetListResponse body.
+        
+        Repeated requests are served from the list response cache without
+        touching the database or pydantic. On a miss the page is loaded as
+        in list_all_sweets and assembled from per-sweet JSON fragments, of
+        which only the sweets changed since they were last encoded are
+        serialized again.
+        
+        Args:
+            db: Database session
+            skip: Number of records to skip (prefer cursor for deep pages)
+            limit: Maximum records to return
+            cursor: Cursor returned with the previous page
+            include_total: Whether to count all sweets (default: first page only)
+            count_mode: "exact", or "estimated" to allow planner statistics
+            sort: Result order
+            
+        Returns:
+            SerializedPage: SweetListResponse as JSON and its Last-Modified date
+        """
+        version = catalog_version.stock
+        key = list_cache.key(skip, limit, cursor, include_total, count_mode, sort, version)
+        if settings.list_cache_enabled:
+            cached = list_cache.get(key)
+            if cached is not None:
+                return cached
+        
+        page = SweetService.list_all_sweets(db, skip, limit, cursor, include_total, count_mode, sort)
+        records = SweetService._sweet_records(page.items, version)
+        serialized = SerializedPage(
+            encode_list_response(page, b"[" + b",".join(record.body for record in records) + b"]"),
+            last_modified(row["updated_at"] for row in page.items)
+        )
+        if settings.list_cache_enabled:
+            list_cache.set(key, serialized)
+        return serialized
+    
+    @staticmethod
+    def suggest_sweets(db: Session, prefix: str, limit: int = 10, rank: SuggestRank = "popularity") -> dict:
+        """
+        Autocomplete sweet names and categories from the in-memory prefix index.
+        
+        Args:
+            db: Database session
+            prefix: Text typed so far
+            limit: Maximum sweets and categories to return
+            rank: "popularity" (units sold) or "stock" (units in stock)
+            
+        Returns:
+            dict: Ranked sweet and category completions
+        """
+        return suggest_index.suggest(db, prefix, limit, rank)
+    
+    @staticmethod
+    def search_sweets(db: Session, search_params: SweetSearchRequest) -> Page:
         """
         Search sweets by multiple criteria.
         
         Args:
             db: Database session
-            search_params: Search parameters
+            search_params: Search parameters, including page size and cursor
             
         Returns:
-            tuple: (Total count, List of matching Sweet objects)
+            Page: Matching sweets as SweetRow dicts, next cursor, total count
+                (None if not counted) and facets (None unless requested)
         """
+        search_params = SweetService._trim_name(search_params)
+        if not settings.search_cache_enabled:
+            return SweetService._search(db, search_params)
+        
+        key = search_cache.key(search_params)
+        page = search_cache.get(key)
+        if page is None:
+            page = search_cache.set(key, SweetService._search(db, search_params))
+        return page
+    
+    @staticmethod
+    def _search(db: Session, search_params: SweetSearchRequest) -> Page:
+        """Run a search against the snapshot or the database."""
+        filters = SweetCounter.normalize(
+            name=search_params.name,
+            fuzzy=search_params.fuzzy,
+            category=search_params.category,
+            min_price=search_params.min_price,
+            max_price=search_params.max_price,
+            in_stock=search_params.in_stock
+        )
+        if search_params.fuzzy and search_params.name:
+            return SweetService._fuzzy_page(db, search_params, filters)
+        
+        matching_ids = SweetService._matching_names(db, search_params)
+        
+        # Evaluate the other filters on the columnar snapshot when possible
+        if SweetService._use_snapshot(search_params, matching_ids):
+            return SweetService._snapshot_page(db, search_params, filters, matching_ids)
+        
+        query = SweetService._filtered_query(db, search_params, matching_ids)
+        page = SweetService._page(
+            db,
+            query,
+            filters,
+            0,
+            search_params.limit,
+            search_params.cursor,
+            search_params.include_total,
+            search_params.count_mode,
+            search_params.sort
+        )
+        if search_params.facets:
+            page = page._replace(facets=search_facets.get(filters, lambda: search_facets.from_query(query)))
+        return page
+    
+    @staticmethod
+    def _fuzzy_page(db: Session, search_params: SweetSearchRequest, filters: dict) -> Page:
+        """
+        Typo-tolerant name search, ranked by similarity.
+        
+        The ranked matches are capped at name_fuzzy_max_results, so the other
+        filters are applied to all of them at once and pages are slices of
+        the ranking; the cursor holds the offset of the next slice.
+        """
+        ranked = name_index.fuzzy_matching_ids(
+            db,
+            search_params.name,
+            settings.name_fuzzy_max_results,
+            settings.name_fuzzy_scan_budget
+        )
+        query = SweetService._filtered_query(
+            db, search_params.model_copy(update={"name": None}), None
+        ).filter(Sweet.id.in_(ranked))
+        position = {sweet_id: index for index, sweet_id in enumerate(ranked)}
+        sweets = sorted(as_rows(select_rows(query)), key=lambda row: position[row["id"]])
+        
+        start = 0
+        if search_params.cursor is not None:
+            start, = decode_cursor(search_params.cursor, "fuzzy", 1)
+            if not isinstance(start, int) or start < 0:
+                raise ValidationException("Invalid pagination cursor")
+        end = start + search_params.limit
+        next_cursor = encode_cursor("fuzzy", [end]) if end < len(sweets) else None
+        
+        include_total = search_params.include_total
+        if include_total is None:
+            include_total = search_params.cursor is None
+        
+        facets = None
+        if search_params.facets:
+            facets = search_facets.get(filters, lambda: search_facets.from_query(query))
+        
+        return Page(
+            StockShardService.apply_row_totals(db, sweets[start:end]),
+            next_cursor,
+            len(sweets) if include_total else None,
+            facets=facets
+        )
+    
+    @staticmethod
+    def stream_search(
+        db: Session,
+        search_params: SweetSearchRequest,
+        chunk_size: Optional[int] = None
+    ) -> Iterator[list[SweetRow]]:
+        """
+        Stream every sweet matching a search, in sort order, a chunk at a time.
+        
+        Unlike search_sweets there is no page limit, total or facets; a
+        cursor resumes after the sweet it names. Matches are read either as
+        ID slices of the catalog snapshot or through a server-side cursor
+        (yield_per), so only one chunk of rows is alive at a time and
+        memory does not grow with the number of matches.
+        
+        Args:
+            db: Database session, kept open until the iterator is exhausted
+            search_params: Search filters and optional cursor
+            chunk_size: Rows loaded per chunk (defaults to search_stream_chunk_size)
+            
+        Returns:
+            Iterator: Lists of up to chunk_size SweetRow dicts
+            
+        Raises:
+            ValidationException: If the cursor is invalid or a fuzzy name
+                search is requested (raised here, before anything is streamed)
+        """
+        search_params = SweetService._trim_name(search_params)
+        if search_params.fuzzy and search_params.name:
+            raise ValidationException("Fuzzy name search is ranked and cannot be streamed; use search instead")
+        chunk_size = chunk_size or settings.search_stream_chunk_size
+        
+        matching_ids = SweetService._matching_names(db, search_params)
+        if SweetService._use_snapshot(search_params, matching_ids):
+            after = None
+            if search_params.cursor is not None:
+                after, = decode_cursor(search_params.cursor, "id", 1)
+                if not isinstance(after, int):
+                    raise ValidationException("Invalid pagination cursor")
+            return SweetService._stream_snapshot(db, search_params, matching_ids, after, chunk_size)
+        
+        order_by, descending = SORT_KEYS[search_params.sort]
+        query = seek(
+            SweetService._filtered_query(db, search_params, matching_ids),
+            order_by,
+            search_params.sort,
+            search_params.cursor,
+            descending
+        )
+        return SweetService._stream_query(db, query, chunk_size)
+    
+    @staticmethod
+    def _stream_snapshot(
+        db: Session,
+        search_params: SweetSearchRequest,
+        matching_ids: Optional[list[int]],
+        after: Optional[int],
+        chunk_size: int
+    ) -> Iterator[list[SweetRow]]:
+        """Stream snapshot matches in ID slices, starting after the sweet ID after."""
+        columns, mask, _ = catalog_snapshot.match(
+            db,
+            category=search_params.category,
+            min_price=search_params.min_price,
+            max_price=search_params.max_price,
+            in_stock=search_params.in_stock,
+            candidate_ids=matching_ids
+        )
+        matched = columns.ids[mask]
+        start = 0 if after is None else int(np.searchsorted(matched, after, side="right"))
+        for offset in range(start, len(matched), chunk_size):
+            chunk_ids = matched[offset:offset + chunk_size].tolist()
+            rows = db.execute(
+                select(*SWEET_COLUMNS).where(Sweet.id.in_(chunk_ids)).order_by(Sweet.id)
+            )
+            yield StockShardService.apply_row_totals(db, as_rows(rows))
+    
+    @staticmethod
+    def _stream_query(db: Session, query, chunk_size: int) -> Iterator[list[SweetRow]]:
+        """Stream an ordered query through a server-side cursor."""
+        result = db.execute(select_rows(query).statement.execution_options(yield_per=chunk_size))
+        for rows in result.partitions():
+            yield StockShardService.apply_row_totals(db, as_rows(rows))
+    
+    @staticmethod
+    def _trim_name(search_params: SweetSearchRequest) -> SweetSearchRequest:
+        """Drop surrounding whitespace from the name term (blank means no name filter)."""
+        if search_params.name is None:
+            return search_params
+        return search_params.model_copy(update={"name": search_params.name.strip() or None})
+    
+    @staticmethod
+    def _matching_names(db: Session, search_params: SweetSearchRequest) -> Optional[list[int]]:
+        """Name matches from the trigram index, or None when it cannot narrow the search."""
+        if search_params.name and name_search_backend(db) == "index":
+            return name_index.matching_ids(db, search_params.name)
+        return None
+    
+    @staticmethod
+    def _use_snapshot(search_params: SweetSearchRequest, matching_ids: Optional[list[int]]) -> bool:
+        """Whether the filters can be evaluated on the catalog snapshot (ID order only)."""
+        return (
+            settings.catalog_snapshot_enabled
+            and search_params.sort == "id"
+            and (not search_params.name or matching_ids is not None)
+        )
+    
+    @staticmethod
+    def _filtered_query(
+        db: Session,
+        search_params: SweetSearchRequest,
+        matching_ids: Optional[list[int]]
+    ):
+        """Sweets query with the search filters applied in SQL."""
         query = db.query(Sweet)
         
         # Filter by name (case-insensitive partial match)
         if search_params.name:
-            query = query.filter(Sweet.name.ilike(f"%{search_params.name}%"))
+            if matching_ids is None:
+                query = query.filter(Sweet.name.ilike(f"%{search_params.name}%"))
+            else:
+                query = query.filter(Sweet.id.in_(matching_ids))
         
         # Filter by category
         if search_params.category:
@@ -136,10 +536,81 @@ class SweetService:
         if search_params.in_stock:
             query = query.filter(Sweet.quantity > 0)
         
-        total = query.count()
-        sweets = query.all()
+        return query
+    
+    @staticmethod
+    def _snapshot_page(
+        db: Session,
+        search_params: SweetSearchRequest,
+        filters: dict,
+        matching_ids: Optional[list[int]]
+    ) -> Page:
+        """Filter on the catalog snapshot, then load only the page's rows."""
+        columns, mask, categories = catalog_snapshot.match(
+            db,
+            category=search_params.category,
+            min_price=search_params.min_price,
+            max_price=search_params.max_price,
+            in_stock=search_params.in_stock,
+            candidate_ids=matching_ids
+        )
+        matched = columns.ids[mask]
+        
+        start = 0
+        if search_params.cursor is not None:
+            last_id, = decode_cursor(search_params.cursor, "id", 1)
+            if not isinstance(last_id, int):
+                raise ValidationException("Invalid pagination cursor")
+            start = int(np.searchsorted(matched, last_id, side="right"))
+        page_ids = matched[start:start + search_params.limit].tolist()
         
-        return total, sweets
+        next_cursor = None
+        if start + search_params.limit < len(matched):
+            next_cursor = encode_cursor("id", [page_ids[-1]])
+        
+        include_total = search_params.include_total
+        if include_total is None:
+            include_total = search_params.cursor is None
+        
+        sweets = []
+        if page_ids:
+            sweets = as_rows(db.execute(
+                select(*SWEET_COLUMNS).where(Sweet.id.in_(page_ids)).order_by(Sweet.id)
+            ))
+            StockShardService.apply_row_totals(db, sweets)
+        
+        facets = None
+        if search_params.facets:
+            facets = search_facets.get(
+                filters, lambda: search_facets.from_columns(columns, mask, categories)
+            )
+        
+        return Page(sweets, next_cursor, len(matched) if include_total else None, facets=facets)
+    
+    @staticmethod
+    def _page(
+        db: Session,
+        query,
+        filters: dict,
+        skip: int,
+        limit: int,
+        cursor: Optional[str],
+        include_total: Optional[bool],
+        count_mode: CountMode,
+        sort: SweetSort = "id"
+    ) -> Page:
+        """Fetch one keyset page of a sweets query as SweetRow dicts, counting only when asked."""
+        if include_total is None:
+            include_total = cursor is None
+        total, estimated = None, False
+        if include_total:
+            total, estimated = sweet_counter.count(db, query, filters, count_mode)
+        
+        order_by, descending = SORT_KEYS[sort]
+        rows, next_cursor = paginate(select_rows(query), order_by, sort, limit, cursor, skip, descending)
+        sweets = StockShardService.apply_row_totals(db, as_rows(rows))
+        
+        return Page(sweets, next_cursor, total, estimated)
     
     @staticmethod
     def update_sweet(db: Session, sweet_id: int, request: SweetUpdateRequest) -> Sweet:
@@ -188,7 +659,12 @@ class SweetService:
             sweet.price = request.price
         
         if request.quantity is not None:
-            sweet.quantity = request.quantity
+            # Sharded sweets spread the new level over their shards
+            rebalanced = None
+            if StockShardService.is_sharded(db, sweet_id):
+                rebalanced = StockShardService.rebalance(db, sweet_id, total=request.quantity)
+            if rebalanced is None:
+                sweet.quantity = request.quantity
             sweet.is_available = request.quantity > 0
         
         if request.is_available is not None:
@@ -196,6 +672,8 @@ class SweetService:
         
         db.commit()
         db.refresh(sweet)
+        catalog_version.catalog_changed([sweet.id])
+        name_index.add(sweet.id, sweet.name)
         
         return sweet
     
@@ -217,6 +695,9 @@ class SweetService:
         sweet = SweetService.get_sweet_by_id(db, sweet_id)
         db.delete(sweet)
         db.commit()
+        sweet_counter.deleted()
+        catalog_version.catalog_changed([sweet_id])
+        name_index.remove(sweet_id)
         return True
 
 
@@ -228,7 +709,8 @@ class InventoryService:
         db: Session,
         user_id: int,
         sweet_id: int,
-        request: PurchaseRequest
+        request: PurchaseRequest,
+        idempotency_record: Optional[int] = None
     ) -> Purchase:
         """
         Purchase sweets and create purchase record.
@@ -238,6 +720,8 @@ class InventoryService:
             user_id: User ID making the purchase
             sweet_id: Sweet ID being purchased
             request: Purchase request with quantity
+            idempotency_record: Claimed Idempotency-Key record to mark applied
+                in the purchase's transaction
             
         Returns:
             Purchase: Created purchase record
@@ -246,15 +730,8 @@ class InventoryService:
             ResourceNotFoundException: If user or sweet not found
             InsufficientInventoryException: If not enough quantity available
             ValidationException: If quantity is invalid
+            ServiceUnavailableException: If a retry took over the idempotency key
         """
-        # Validate user exists
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            raise ResourceNotFoundException(f"User with ID {user_id} not found")
-        
-        # Get sweet
-        sweet = SweetService.get_sweet_by_id(db, sweet_id)
-        
         # Validate quantity
         if request.quantity <= 0:
             raise ValidationException("Purchase quantity must be greater than 0")
@@ -262,39 +739,399 @@ class InventoryService:
         if request.quantity > 1000:
             raise ValidationException("Purchase quantity cannot exceed 1000")
         
-        # Check inventory
-        if sweet.quantity < request.quantity:
-            raise InsufficientInventoryException(
-                f"Insufficient inventory. Available: {sweet.quantity}, Requested: {request.quantity}"
-            )
+        # Decrement stock atomically (no read-modify-write race)
+        price = InventoryService.take_stock(db, sweet_id, request.quantity)
         
         # Calculate total price
-        total_price = sweet.price * request.quantity
+        total_price = price * request.quantity
+        created_at = datetime.utcnow()
+        
+        # Insert purchase record in the same transaction, guarded by the user check
+        purchase_id = db.execute(
+            insert(Purchase)
+            .from_select(
+                ["user_id", "sweet_id", "quantity", "total_price", "created_at"],
+                select(
+                    literal(user_id),
+                    literal(sweet_id),
+                    literal(request.quantity),
+                    literal(total_price),
+                    literal(created_at)
+                ).where(exists().where(User.id == user_id))
+            )
+            .returning(Purchase.id)
+        ).scalar()
+        
+        if purchase_id is None:
+            db.rollback()
+            raise ResourceNotFoundException(f"User with ID {user_id} not found")
+        
+        InventoryService._mark_applied(db, [idempotency_record])
+        
+        # Save changes
+        db.commit()
+        catalog_version.stock_changed([sweet_id])
+        suggest_index.record_sales([(sweet_id, request.quantity)])
         
-        # Create purchase record
-        purchase = Purchase(
+        return Purchase(
+            id=purchase_id,
             user_id=user_id,
             sweet_id=sweet_id,
             quantity=request.quantity,
-            total_price=total_price
+            total_price=total_price,
+            created_at=created_at
+        )
+    
+    @staticmethod
+    def _mark_applied(db: Session, idempotency_records: list[Optional[int]]) -> None:
+        """
+        Mark idempotency keys applied just before the operation commits.
+        
+        Raises:
+            ServiceUnavailableException: If a retry took over one of the keys;
+                the transaction is rolled back so nothing is applied
+        """
+        record_ids = [record_id for record_id in idempotency_records if record_id is not None]
+        if len(IdempotencyService.mark_applied(db, record_ids)) != len(record_ids):
+            db.rollback()
+            raise ServiceUnavailableException(
+                "Idempotency-Key was taken over by a retry; this request was not applied"
+            )
+    
+    @staticmethod
+    def _decrement_stock(db: Session, lines: list[tuple[int, int]]) -> int:
+        """
+        Conditionally decrement several sweets with one executemany UPDATE.
+        
+        Args:
+            db: Database session
+            lines: (sweet_id, quantity) pairs, in lock order
+            
+        Returns:
+            int: Number of lines that had enough stock and were decremented
+        """
+        if not lines:
+            return 0
+        
+        sweets = Sweet.__table__
+        decrement = (
+            update(sweets)
+            .where(
+                sweets.c.id == bindparam("b_id"),
+                sweets.c.quantity >= bindparam("b_qty"),
+                ~sharded_clause(sweets)
+            )
+            .values(
+                quantity=sweets.c.quantity - bindparam("b_qty"),
+                is_available=sweets.c.quantity > bindparam("b_qty")
+            )
         )
+        params = [{"b_id": sweet_id, "b_qty": quantity} for sweet_id, quantity in lines]
         
-        # Update sweet inventory
-        sweet.quantity -= request.quantity
-        sweet.is_available = sweet.quantity > 0
+        if db.get_bind().dialect.supports_sane_multi_rowcount:
+            return db.execute(decrement, params).rowcount
+        return sum(db.execute(decrement, line).rowcount for line in params)
+    
+    @staticmethod
+    def take_stock(db: Session, sweet_id: int, quantity: int) -> float:
+        """
+        Remove stock for one purchase or hold without committing.
+        
+        Plain sweets are decremented with a single conditional
+        UPDATE ... RETURNING; sweets in sharded inventory mode take the stock
+        from their shard counters instead. On failure the session is rolled
+        back before raising, so callers must not have other pending writes.
+        
+        Args:
+            db: Database session
+            sweet_id: Sweet ID being purchased
+            quantity: Requested quantity
+            
+        Returns:
+            float: Unit price of the sweet
+            
+        Raises:
+            ResourceNotFoundException: If sweet not found
+            InsufficientInventoryException: If not enough quantity available
+        """
+        sharded_hint = StockShardService.is_sharded(db, sweet_id)
+        if not sharded_hint:
+            stock = db.execute(
+                update(Sweet)
+                .where(Sweet.id == sweet_id, Sweet.quantity >= quantity, ~sharded_clause())
+                .values(
+                    quantity=Sweet.quantity - quantity,
+                    is_available=Sweet.quantity > quantity
+                )
+                .returning(Sweet.price)
+                .execution_options(synchronize_session=False)
+            ).first()
+            if stock is not None:
+                return stock.price
+        
+        # Cold path: find out why, or whether the sweet is sharded
+        row = db.execute(
+            select(Sweet.price, Sweet.quantity, sharded_clause().label("sharded"))
+            .where(Sweet.id == sweet_id)
+        ).first()
+        
+        if row is None:
+            db.rollback()
+            raise ResourceNotFoundException(f"Sweet with ID {sweet_id} not found")
+        
+        if row.sharded:
+            if StockShardService.take(db, sweet_id, quantity):
+                return row.price
+            available = StockShardService.totals(db, [sweet_id]).get(sweet_id, 0)
+        elif sharded_hint:
+            # Stale registry entry: sharding was disabled elsewhere
+            shard_registry.set(sweet_id, 0)
+            return InventoryService.take_stock(db, sweet_id, quantity)
+        else:
+            available = row.quantity
+        
+        db.rollback()
+        raise InsufficientInventoryException(
+            f"Insufficient inventory. Available: {available}, Requested: {quantity}"
+        )
+    
+    @staticmethod
+    def checkout(db: Session, user_id: int, request: CheckoutRequest) -> list[Purchase]:
+        """
+        Purchase several sweets in one all-or-nothing transaction.
+        
+        Lines for the same sweet are merged, and the merged quantity is held
+        to the same per-purchase limit as a single line. Rows are locked and decremented
+        in ascending sweet ID order so concurrent orders cannot deadlock, and
+        the number of statements does not grow with the number of lines.
+        
+        Args:
+            db: Database session
+            user_id: User ID making the purchase
+            request: Checkout request with order lines
+            
+        Returns:
+            list: Created Purchase records, ordered by sweet ID
+            
+        Raises:
+            ResourceNotFoundException: If user or any sweet not found
+            InsufficientInventoryException: If any line exceeds available stock
+            ValidationException: If the order is empty or a sweet's lines exceed the purchase limit
+        """
+        # Merge duplicate lines and fix a deterministic lock order
+        quantities: dict[int, int] = {}
+        for item in request.items:
+            quantities[item.sweet_id] = quantities.get(item.sweet_id, 0) + item.quantity
+        lines = sorted(quantities.items())
+        
+        if not lines:
+            raise ValidationException("Checkout requires at least one item")
+        for sweet_id, quantity in lines:
+            if quantity > MAX_PURCHASE_QUANTITY:
+                raise ValidationException(
+                    f"Checkout asks for {quantity} of sweet {sweet_id}; "
+                    f"at most {MAX_PURCHASE_QUANTITY} per purchase"
+                )
+        
+        # Validate user exists
+        if db.execute(select(User.id).where(User.id == user_id)).first() is None:
+            raise ResourceNotFoundException(f"User with ID {user_id} not found")
+        
+        # Lock every sweet row in ID order (no-op on SQLite, which serializes writers)
+        stock = {
+            row.id: row
+            for row in db.execute(
+                select(Sweet.id, Sweet.price, Sweet.quantity, sharded_clause().label("sharded"))
+                .where(Sweet.id.in_(quantities))
+                .order_by(Sweet.id)
+                .with_for_update()
+            )
+        }
+        
+        for sweet_id, quantity in lines:
+            if sweet_id not in stock:
+                db.rollback()
+                raise ResourceNotFoundException(f"Sweet with ID {sweet_id} not found")
+        
+        # Decrement every plain line with one conditional executemany UPDATE
+        plain = [(sweet_id, quantity) for sweet_id, quantity in lines if not stock[sweet_id].sharded]
+        if InventoryService._decrement_stock(db, plain) != len(plain):
+            db.rollback()
+            for sweet_id, quantity in plain:
+                if stock[sweet_id].quantity < quantity:
+                    raise InsufficientInventoryException(
+                        f"Insufficient inventory for sweet {sweet_id}. "
+                        f"Available: {stock[sweet_id].quantity}, Requested: {quantity}"
+                    )
+            raise InsufficientInventoryException("Insufficient inventory for one or more items")
+        
+        # Sharded lines take from their shard counters, still in ID order
+        for sweet_id, quantity in lines:
+            if stock[sweet_id].sharded and not StockShardService.take(db, sweet_id, quantity):
+                available = StockShardService.totals(db, [sweet_id]).get(sweet_id, 0)
+                db.rollback()
+                raise InsufficientInventoryException(
+                    f"Insufficient inventory for sweet {sweet_id}. "
+                    f"Available: {available}, Requested: {quantity}"
+                )
+        
+        # Bulk insert purchase records
+        created_at = datetime.utcnow()
+        rows = [
+            {
+                "user_id": user_id,
+                "sweet_id": sweet_id,
+                "quantity": quantity,
+                "total_price": stock[sweet_id].price * quantity,
+                "created_at": created_at
+            }
+            for sweet_id, quantity in lines
+        ]
+        purchase_ids = db.scalars(
+            insert(Purchase).returning(Purchase.id, sort_by_parameter_order=True),
+            rows
+        ).all()
+        
+        db.commit()
+        catalog_version.stock_changed(sweet_id for sweet_id, _ in lines)
+        suggest_index.record_sales(lines)
+        
+        return [Purchase(id=purchase_id, **row) for purchase_id, row in zip(purchase_ids, rows)]
+    
+    @staticmethod
+    def purchase_batch(
+        db: Session,
+        orders: list[tuple[int, int, int]],
+        idempotency_records: Optional[list[Optional[int]]] = None
+    ) -> list[Purchase | SweetShopException]:
+        """
+        Settle many independent purchases with one commit.
+        
+        Orders are allocated first-come first-served against each sweet's
+        stock. Every sweet is then decremented once by its aggregated total and
+        all accepted purchases are inserted with a single multi-row INSERT.
+        
+        Args:
+            db: Database session
+            orders: (user_id, sweet_id, quantity) tuples in arrival order
+            idempotency_records: Claimed Idempotency-Key record per order (or
+                None), marked applied in the batch's transaction
+            
+        Returns:
+            list: Purchase record or the exception for each order, in order
+        """
+        records = idempotency_records or [None] * len(orders)
+        results: list[Purchase | SweetShopException | None] = [None] * len(orders)
+        user_ids = {user_id for user_id, _, _ in orders}
+        sweet_ids = {sweet_id for _, sweet_id, _ in orders}
+        
+        known_users = set(db.scalars(select(User.id).where(User.id.in_(user_ids))))
+        stock = {
+            row.id: row
+            for row in db.execute(
+                select(Sweet.id, Sweet.price, Sweet.quantity, sharded_clause().label("sharded"))
+                .where(Sweet.id.in_(sweet_ids))
+                .order_by(Sweet.id)
+                .with_for_update()
+            )
+        }
+        
+        # Allocate stock in arrival order
+        remaining = {sweet_id: row.quantity for sweet_id, row in stock.items()}
+        totals: dict[int, int] = {}
+        accepted = []
+        for index, (user_id, sweet_id, quantity) in enumerate(orders):
+            if quantity <= 0 or quantity > 1000:
+                results[index] = ValidationException("Purchase quantity must be between 1 and 1000")
+            elif user_id not in known_users:
+                results[index] = ResourceNotFoundException(f"User with ID {user_id} not found")
+            elif sweet_id not in stock:
+                results[index] = ResourceNotFoundException(f"Sweet with ID {sweet_id} not found")
+            elif stock[sweet_id].sharded:
+                # Sharded sweets settle against their shard counters directly
+                if StockShardService.take(db, sweet_id, quantity):
+                    accepted.append(index)
+                else:
+                    available = StockShardService.totals(db, [sweet_id]).get(sweet_id, 0)
+                    results[index] = InsufficientInventoryException(
+                        f"Insufficient inventory. Available: {available}, Requested: {quantity}"
+                    )
+            elif remaining[sweet_id] < quantity:
+                results[index] = InsufficientInventoryException(
+                    f"Insufficient inventory. Available: {remaining[sweet_id]}, Requested: {quantity}"
+                )
+            else:
+                remaining[sweet_id] -= quantity
+                totals[sweet_id] = totals.get(sweet_id, 0) + quantity
+                accepted.append(index)
+        
+        if not accepted:
+            db.rollback()
+            return results
+        
+        # One aggregated conditional UPDATE per sweet
+        if InventoryService._decrement_stock(db, sorted(totals.items())) != len(totals):
+            # Stock moved underneath us (unlocked dialect); settle one by one
+            db.rollback()
+            return InventoryService._settle_one_by_one(db, orders, records, accepted, results)
+        
+        # One multi-row INSERT for every accepted purchase
+        created_at = datetime.utcnow()
+        rows = [
+            {
+                "user_id": orders[index][0],
+                "sweet_id": orders[index][1],
+                "quantity": orders[index][2],
+                "total_price": stock[orders[index][1]].price * orders[index][2],
+                "created_at": created_at
+            }
+            for index in accepted
+        ]
+        purchase_ids = db.scalars(
+            insert(Purchase).returning(Purchase.id, sort_by_parameter_order=True),
+            rows
+        ).all()
+        
+        marked = [records[index] for index in accepted if records[index] is not None]
+        if len(IdempotencyService.mark_applied(db, marked)) != len(marked):
+            # A retry took over one of the keys; settle one by one so only that order fails
+            db.rollback()
+            return InventoryService._settle_one_by_one(db, orders, records, accepted, results)
         
-        # Save changes
-        db.add(purchase)
         db.commit()
-        db.refresh(purchase)
+        catalog_version.stock_changed({orders[index][1] for index in accepted})
+        suggest_index.record_sales(orders[index][1:] for index in accepted)
+        
+        for index, purchase_id, row in zip(accepted, purchase_ids, rows):
+            results[index] = Purchase(id=purchase_id, **row)
         
-        return purchase
+        return results
+    
+    @staticmethod
+    def _settle_one_by_one(
+        db: Session,
+        orders: list[tuple[int, int, int]],
+        records: list[Optional[int]],
+        accepted: list[int],
+        results: list
+    ) -> list[Purchase | SweetShopException]:
+        """Fallback for purchase_batch: run the accepted orders as separate purchases."""
+        for index in accepted:
+            user_id, sweet_id, quantity = orders[index]
+            try:
+                results[index] = InventoryService.purchase_sweet(
+                    db, user_id, sweet_id, PurchaseRequest(quantity=quantity), records[index]
+                )
+            except SweetShopException as e:
+                results[index] = e
+        return results
     
     @staticmethod
     def restock_sweet(
         db: Session,
         sweet_id: int,
-        request: RestockRequest
+        request: RestockRequest,
+        idempotency_record: Optional[int] = None
     ) -> Sweet:
         """
         Restock a sweet product (admin-only).
@@ -303,6 +1140,8 @@ class InventoryService:
             db: Database session
             sweet_id: Sweet ID to restock
             request: Restock request with quantity
+            idempotency_record: Claimed Idempotency-Key record to mark applied
+                in the restock's transaction
             
         Returns:
             Sweet: Updated sweet object
@@ -310,6 +1149,7 @@ class InventoryService:
         Raises:
             ResourceNotFoundException: If sweet not found
             ValidationException: If quantity is invalid
+            ServiceUnavailableException: If a retry took over the idempotency key
         """
         sweet = SweetService.get_sweet_by_id(db, sweet_id)
         
@@ -320,12 +1160,18 @@ class InventoryService:
         if request.quantity > 10000:
             raise ValidationException("Restock quantity cannot exceed 10000")
         
-        # Update inventory
-        sweet.quantity += request.quantity
+        # Update inventory (sharded sweets are rebalanced over their shards)
+        total = None
+        if StockShardService.is_sharded(db, sweet_id):
+            total = StockShardService.rebalance(db, sweet_id, added=request.quantity)
+        if total is None:
+            sweet.quantity += request.quantity
         sweet.is_available = True
         
+        InventoryService._mark_applied(db, [idempotency_record])
         db.commit()
         db.refresh(sweet)
+        catalog_version.stock_changed([sweet_id])
         
         return sweet
     
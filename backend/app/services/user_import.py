@@ -0,0 +1,308 @@
+"""
+Bulk import of user accounts from NDJSON or CSV.
+Rows are validated one by one, existing emails are rejected with one query
+per batch, passwords are hashed in parallel on a process pool using every
+core, and each batch is inserted in a single transaction.
+"""
+
+import csv
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import AsyncIterator, Iterable, Iterator, Optional
+
+from anyio import from_thread
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.user import User
+from app.core.exceptions import ServiceUnavailableException, ValidationException
+from app.core.security import hash_password
+from app.schemas.user import UserRegisterRequest, UserImportError, UserImportReport
+
+FORMATS = ("ndjson", "csv")
+CONTENT_TYPES = {
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+CSV_COLUMNS = ("email", "full_name", "password")
+
+# Each import already uses every core, so a process runs one at a time
+_running = threading.Lock()
+
+
+class UserImporter:
+    """
+    Streams the rows of an import file into batched inserts.
+    
+    Lines are fed in order with feed(). Every batch_size valid rows the
+    batch is flushed: emails already registered are found with one IN
+    query, passwords are hashed in parallel on the executor and the
+    remaining users are inserted in one transaction. A bad row is reported
+    with its line number and never stops the import; only an unusable CSV
+    header does.
+    """
+    
+    def __init__(
+        self,
+        db: Session,
+        executor: Executor,
+        file_format: str,
+        batch_size: int = 500,
+        max_errors: int = 1000
+    ):
+        if file_format not in FORMATS:
+            raise ValidationException(f"Unsupported import format {file_format!r}; use one of {', '.join(FORMATS)}")
+        self.db = db
+        self.executor = executor
+        self.file_format = file_format
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.created = 0
+        self.failed = 0
+        self.errors: list[UserImportError] = []
+        self._line = 0
+        self._header: Optional[list[str]] = None
+        self._pending: list[tuple[int, UserRegisterRequest]] = []
+        self._seen: set[str] = set()
+    
+    def feed(self, lines: Iterable[str]) -> None:
+        """
+        Parse and queue the next lines of the file, flushing full batches.
+        
+        A CSV is read by one csv.reader over all the lines given, so a quoted
+        field may span lines; pass the whole file in one call.
+        
+        Args:
+            lines: Consecutive lines, with or without line endings
+        
+        Raises:
+            ValidationException: If the CSV header lacks a required column
+        """
+        if self.file_format == "csv":
+            self._feed_csv(lines)
+            return
+        
+        for text in lines:
+            self._line += 1
+            text = text.rstrip("\r\n")
+            if self._line == 1:
+                text = text.lstrip("\ufeff")
+            if not text.strip():
+                continue
+            
+            try:
+                record = json.loads(text)
+                if not isinstance(record, dict):
+                    raise ValueError("Expected a JSON object")
+            except ValueError as e:
+                self._reject(self._line, None, str(e))
+                continue
+            self._queue(self._line, record)
+    
+    def finish(self) -> UserImportReport:
+        """
+        Flush the last batch and report the outcome.
+        
+        Returns:
+            UserImportReport: Counts and the rejected rows
+        """
+        self._flush()
+        return UserImportReport(
+            created=self.created,
+            failed=self.failed,
+            errors=self.errors,
+            errors_truncated=self.failed > len(self.errors)
+        )
+    
+    def _feed_csv(self, lines: Iterable[str]) -> None:
+        """Queue the rows of a CSV, numbering each by the line it starts on."""
+        before = self._line
+        reader = csv.reader(self._csv_lines(lines))
+        while True:
+            line = before + reader.line_num + 1
+            try:
+                fields = next(reader)
+            except StopIteration:
+                break
+            except csv.Error as e:
+                self._reject(line, None, str(e))
+                continue
+            finally:
+                self._line = before + reader.line_num
+            if not any(field.strip() for field in fields):
+                continue
+            
+            if self._header is None:
+                self._header = [field.strip() for field in fields]
+                missing = [column for column in CSV_COLUMNS if column not in self._header]
+                if missing:
+                    raise ValidationException(f"CSV header is missing {', '.join(missing)}")
+                continue
+            if len(fields) != len(self._header):
+                self._reject(line, None, f"Expected {len(self._header)} fields, got {len(fields)}")
+                continue
+            self._queue(line, dict(zip(self._header, fields)))
+    
+    def _csv_lines(self, lines: Iterable[str]) -> Iterator[str]:
+        """Lines for csv.reader, each ending in a newline so quoted line breaks survive."""
+        for number, text in enumerate(lines):
+            if number == 0 and self._line == 0:
+                text = text.lstrip("\ufeff")
+            yield text if text.endswith("\n") else text + "\n"
+    
+    def _queue(self, line: int, record: dict) -> None:
+        """Validate a parsed row and add it to the batch."""
+        try:
+            request = UserRegisterRequest.model_validate(record)
+        except ValidationError as e:
+            email = record.get("email")
+            self._reject(line, email if isinstance(email, str) else None, _describe(e))
+            return
+        if request.email in self._seen:
+            self._reject(line, request.email, "Email appears earlier in the import")
+            return
+        
+        self._seen.add(request.email)
+        self._pending.append((line, request))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+    
+    def _flush(self) -> None:
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        
+        emails = [request.email for _, request in batch]
+        taken = set(self.db.scalars(select(User.email).where(User.email.in_(emails))))
+        fresh = []
+        for line, request in batch:
+            if request.email in taken:
+                self._reject(line, request.email, f"User with email {request.email} already exists")
+            else:
+                fresh.append((line, request))
+        if not fresh:
+            return
+        
+        hashes = self.executor.map(hash_password, [request.password for _, request in fresh])
+        rows = [
+            {
+                "email": request.email,
+                "full_name": request.full_name,
+                "hashed_password": hashed_password,
+                # Auto-promote to admin if email matches configuration, as register does
+                "is_admin": request.email == settings.admin_email
+            }
+            for (_, request), hashed_password in zip(fresh, hashes)
+        ]
+        
+        try:
+            self.db.execute(insert(User), rows)
+            self.db.commit()
+            self.created += len(rows)
+        except IntegrityError:
+            self.db.rollback()
+            # Someone registered one of these meanwhile; find which, row by row
+            for (line, request), row in zip(fresh, rows):
+                try:
+                    self.db.execute(insert(User), [row])
+                    self.db.commit()
+                    self.created += 1
+                except IntegrityError:
+                    self.db.rollback()
+                    self._reject(line, request.email, f"User with email {request.email} already exists")
+    
+    def _reject(self, line: int, email: Optional[str], detail: str) -> None:
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(UserImportError(line=line, email=email, detail=detail))
+
+
+def _describe(error: ValidationError) -> str:
+    """One line naming each invalid field."""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc']) or 'row'}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+
+@contextmanager
+def user_import(db: Session, file_format: str, workers: Optional[int] = None) -> Iterator[UserImporter]:
+    """
+    Run an import with its own hashing processes.
+    
+    Args:
+        db: Database session
+        file_format: "ndjson" or "csv"
+        workers: Hash processes (default: user_import_hash_workers, else every core)
+    
+    Yields:
+        UserImporter: Importer to feed lines and finish
+    
+    Raises:
+        ServiceUnavailableException: If another import is running in this process
+        ValidationException: If the format is not supported
+    """
+    if not _running.acquire(blocking=False):
+        raise ServiceUnavailableException("A user import is already running, please retry later")
+    try:
+        workers = workers or settings.user_import_hash_workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            yield UserImporter(
+                db,
+                executor,
+                file_format,
+                batch_size=settings.user_import_batch_size,
+                max_errors=settings.user_import_max_reported_errors
+            )
+    finally:
+        _running.release()
+
+
+async def iter_line_batches(chunks: AsyncIterator[bytes]) -> AsyncIterator[list[str]]:
+    """
+    Split a streamed body into lists of complete lines.
+    
+    Args:
+        chunks: Body chunks, e.g. Request.stream()
+    
+    Yields:
+        list: The complete lines received so far, decoded as UTF-8
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *complete, buffer = buffer.split(b"\n")
+        if complete:
+            yield [line.decode("utf-8", errors="replace") for line in complete]
+    if buffer:
+        yield [buffer.decode("utf-8", errors="replace")]
+
+
+def read_stream_lines(chunks: AsyncIterator[bytes]) -> Iterator[str]:
+    """
+    Read a streamed body line by line from a worker thread.
+    
+    Each batch of lines is awaited on the event loop, so the whole body can
+    be fed to one importer in the thread pool.
+    
+    Args:
+        chunks: Body chunks, e.g. Request.stream()
+    
+    Yields:
+        str: Each line, decoded as UTF-8
+    """
+    batches = iter_line_batches(chunks)
+    
+    async def next_batch():
+        return await anext(batches, None)
+    
+    while (lines := from_thread.run(next_batch)) is not None:
+        yield from lines
@@ -3,10 +3,17 @@ User service layer containing authentication and user management business logic.
 Implements separation of concerns and follows SOLID principles.
 """
 
+import time
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from app.models.user import User
-from app.core.security import hash_password, verify_password, create_access_token
+from app.models.user import User, TokenRevocation
+from app.core.security import create_access_token, password_needs_rehash, revoke_user_tokens
+from app.core.password_pool import password_pool
+from app.services.user_status import UserStatus, user_status_cache
+from app.services.password_rehasher import schedule_password_rehash
 from app.core.exceptions import (
     DuplicateResourceException,
     AuthenticationException,
@@ -20,10 +27,13 @@ class UserService:
     """Service class for user-related operations."""
     
     @staticmethod
-    def register(db: Session, request: UserRegisterRequest) -> User:
+    async def register(db: Session, request: UserRegisterRequest) -> User:
         """
         Register a new user with email and password.
         
+        The Argon2 hash runs on the password process pool and database work
+        in the threadpool, so no worker thread is held while hashing.
+        
         Args:
             db: Database session
             request: User registration request data
@@ -33,14 +43,15 @@ class UserService:
             
         Raises:
             DuplicateResourceException: If email already exists
+            ServiceUnavailableException: If the password pool is saturated
         """
         # Check if user already exists
-        existing_user = db.query(User).filter(User.email == request.email).first()
+        existing_user = await run_in_threadpool(UserService._find_by_email, db, request.email)
         if existing_user:
             raise DuplicateResourceException(f"User with email {request.email} already exists")
         
         # Create new user
-        hashed_password = hash_password(request.password)
+        hashed_password = await password_pool.hash(request.password)
         
         # Auto-promote to admin if email matches configuration
         is_admin = (request.email == settings.admin_email)
@@ -51,6 +62,11 @@ class UserService:
             hashed_password=hashed_password,
             is_admin=is_admin
         )
+        return await run_in_threadpool(UserService._insert_user, db, new_user)
+    
+    @staticmethod
+    def _insert_user(db: Session, new_user: User) -> User:
+        """Commit a new user, mapping a concurrent duplicate to DuplicateResourceException."""
         try:
             db.add(new_user)
             db.commit()
@@ -59,13 +75,17 @@ class UserService:
         except IntegrityError:
             db.rollback() # Clean up the failed transaction
             # Convert DB Error -> Custom App Error
-            raise DuplicateResourceException(f"User with email {request.email} already exists")
+            raise DuplicateResourceException(f"User with email {new_user.email} already exists")
     
     @staticmethod
-    def login(db: Session, request: UserLoginRequest) -> tuple[User, str]:
+    async def login(db: Session, request: UserLoginRequest) -> tuple[User, str]:
         """
         Authenticate user and generate access token.
         
+        Password verification runs on the password process pool. A hash
+        made with outdated Argon2 costs is replaced in the background, so
+        the response does not wait for the rehash or its write.
+        
         Args:
             db: Database session
             request: User login request data
@@ -75,20 +95,24 @@ class UserService:
             
         Raises:
             AuthenticationException: If credentials are invalid
+            ServiceUnavailableException: If the password pool is saturated
         """
         # Find user by email
-        user = db.query(User).filter(User.email == request.email).first()
+        user = await run_in_threadpool(UserService._find_by_email, db, request.email)
         if not user:
             raise AuthenticationException("Invalid email or password")
         
         # Verify password
-        if not verify_password(request.password, user.hashed_password):
+        if not await password_pool.verify(request.password, user.hashed_password):
             raise AuthenticationException("Invalid email or password")
         
         # Check if user is active
         if not user.is_active:
             raise AuthenticationException("User account is disabled")
         
+        if password_needs_rehash(user.hashed_password):
+            schedule_password_rehash(user.id, request.password, user.hashed_password)
+        
         # Generate token
         token = create_access_token(
             user_id=user.id,
@@ -98,6 +122,11 @@ class UserService:
         
         return user, token
     
+    @staticmethod
+    def _find_by_email(db: Session, email: str) -> Optional[User]:
+        """User with an email, or None."""
+        return db.query(User).filter(User.email == email).first()
+    
     @staticmethod
     def get_user_by_id(db: Session, user_id: int) -> User:
         """
@@ -138,6 +167,45 @@ class UserService:
             raise ResourceNotFoundException(f"User with email {email} not found")
         return user
     
+    @staticmethod
+    def get_user_status(db: Session, user_id: int) -> UserStatus:
+        """
+        Current active/admin status of a user, read through the status cache.
+        
+        A user that no longer exists is reported as inactive, so tokens
+        issued to them are rejected.
+        
+        Args:
+            db: Database session
+            user_id: User ID
+            
+        Returns:
+            UserStatus: Whether the user is active and admin, and their
+                token revocation watermark
+        """
+        status = user_status_cache.get(user_id)
+        if status is not None:
+            return status
+        
+        version = user_status_cache.generation(user_id)
+        row = (
+            db.query(User.is_active, User.is_admin, TokenRevocation.revoked_at)
+            .outerjoin(TokenRevocation, TokenRevocation.user_id == User.id)
+            .filter(User.id == user_id)
+            .first()
+        )
+        if row is None:
+            status = UserStatus(is_active=False, is_admin=False, version=version)
+        else:
+            status = UserStatus(
+                is_active=bool(row.is_active),
+                is_admin=bool(row.is_admin),
+                version=version,
+                tokens_revoked_at=row.revoked_at
+            )
+        user_status_cache.set(user_id, status)
+        return status
+    
     @staticmethod
     def list_all_users(db: Session, skip: int = 0, limit: int = 10) -> list[User]:
         """
@@ -172,6 +240,7 @@ class UserService:
         user = UserService.get_user_by_id(db, user_id)
         user.is_admin = is_admin
         db.commit()
+        user_status_cache.invalidate(user_id)
         db.refresh(user)
         return user
     
@@ -190,5 +259,39 @@ class UserService:
         user = UserService.get_user_by_id(db, user_id)
         user.is_active = False
         db.commit()
+        user_status_cache.invalidate(user_id)
         db.refresh(user)
         return user
+    
+    @staticmethod
+    def revoke_tokens(db: Session, user_id: int) -> User:
+        """
+        Revoke every access token issued to a user so far.
+        
+        The watermark is stored in the database, so every worker rejects the
+        tokens once its cached status for the user expires
+        (user_status_ttl_seconds); this process rejects them at once.
+        
+        Args:
+            db: Database session
+            user_id: User ID
+            
+        Returns:
+            User: The user whose tokens were revoked
+            
+        Raises:
+            ResourceNotFoundException: If user not found
+        """
+        user = UserService.get_user_by_id(db, user_id)
+        now = time.time()
+        db.merge(TokenRevocation(user_id=user_id, revoked_at=now))
+        # Watermarks older than any live token no longer matter
+        db.execute(
+            delete(TokenRevocation)
+            .where(TokenRevocation.revoked_at <= now - settings.access_token_expire_minutes * 60)
+        )
+        db.commit()
+        
+        revoke_user_tokens(user_id, now)
+        user_status_cache.invalidate(user_id)
+        return user
@@ -0,0 +1,74 @@
+"""
+In-memory cache of each user's account status for per-request authorization.
+Lets get_current_user honour deactivations, role changes and token
+revocations without a database query on every request.
+"""
+
+import threading
+from typing import NamedTuple, Optional
+
+from app.core.cache import TTLCache
+from app.config import settings
+
+
+class UserStatus(NamedTuple):
+    """What authorization needs to know about a user right now."""
+    
+    is_active: bool
+    is_admin: bool
+    # Generation the status was loaded at; bumps on every invalidation
+    version: int
+    # Tokens issued before this (epoch seconds) are revoked
+    tokens_revoked_at: Optional[float] = None
+
+
+class UserStatusCache:
+    """
+    Per-process LRU + TTL cache of user_id -> UserStatus.
+    
+    UserService invalidates a user after changing their role, deactivating
+    them or revoking their tokens, which takes effect immediately in this
+    process. Other processes
+    pick the change up when the entry's short TTL runs out. As with the
+    sweet record cache, a load that raced with an invalidation is not stored:
+    each user has a generation counter that must be unchanged since the load
+    began.
+    """
+    
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self._cache = TTLCache("user_status", max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._generations: dict[int, int] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, user_id: int) -> Optional[UserStatus]:
+        """Cached status, or None."""
+        return self._cache.get(user_id)
+    
+    def generation(self, user_id: int) -> int:
+        """Token to take before loading a user's status from the database."""
+        return self._generations.get(user_id, 0)
+    
+    def set(self, user_id: int, status: UserStatus) -> None:
+        """
+        Store a status unless the user was invalidated since it was loaded.
+        
+        Args:
+            user_id: User ID
+            status: Status whose version is the generation() taken before the load
+        """
+        with self._lock:
+            if self._generations.get(user_id, 0) == status.version:
+                self._cache.set(user_id, status)
+    
+    def invalidate(self, user_id: int) -> None:
+        """Drop a user's status after it changed in the database."""
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self._cache.pop(user_id)
+    
+    def clear(self) -> None:
+        """Forget every status."""
+        self._cache.clear()
+
+
+user_status_cache = UserStatusCache(settings.user_status_cache_max_entries, settings.user_status_ttl_seconds)
@@ -0,0 +1,149 @@
+"""
+Latency benchmark for typo-tolerant name search against catalog size.
+
+Times misspelled searches through NameIndex.fuzzy_matching_ids, which only
+verifies trigram candidates, next to a brute-force scan applying the same
+bounded edit distance to every name (run only up to --brute-force-max rows).
+
+Usage (from the backend/ directory, with .env configured):
+    python -m benchmarks.fuzzy_search
+    python -m benchmarks.fuzzy_search --sizes 10000 100000 1000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import string
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.database import Base
+from app.models.sweet import Sweet
+from app.services.name_index import bounded_distance, name_index, typo_budget
+
+
+FLAVORS = ["Chocolate", "Caramel", "Strawberry", "Lemon", "Mint", "Vanilla", "Coconut", "Honey"]
+KINDS = ["Truffle", "Fudge", "Toffee", "Drop", "Bar", "Bonbon", "Brittle", "Gummy"]
+
+
+def seed(SessionFactory, rows: int, chunk: int = 50_000) -> list[str]:
+    """Insert a synthetic catalog and return a few names to misspell."""
+    rng = random.Random(rows)
+    names, seen = [], set()
+    with SessionFactory() as db:
+        for start in range(0, rows, chunk):
+            batch = []
+            while len(batch) < min(chunk, rows - start):
+                code = "".join(rng.choices(string.ascii_lowercase, k=7))
+                name = f"{rng.choice(FLAVORS)} {code} {rng.choice(KINDS)}"
+                if name not in seen:
+                    seen.add(name)
+                    batch.append({"name": name, "category": "Bench", "price": 1.0, "quantity": 1})
+            db.execute(insert(Sweet), batch)
+            names.extend(row["name"] for row in batch[:10])
+        db.commit()
+    return names
+
+
+def misspell(name: str, rng: random.Random) -> str:
+    """Swap two adjacent letters of the distinctive word of a name."""
+    flavor, code, kind = name.lower().split()
+    position = rng.randrange(len(code) - 1)
+    code = code[:position] + code[position + 1] + code[position] + code[position + 2:]
+    return f"{flavor} {code} {kind}"
+
+
+def brute_force(names: dict[int, str], term: str) -> list[int]:
+    """Apply the fuzzy word check to every name."""
+    words = term.split()
+    matches = []
+    for sweet_id, name in names.items():
+        name_words = name.split()
+        if all(
+            min(bounded_distance(word, candidate, typo_budget(word)) for candidate in name_words) <= typo_budget(word)
+            for word in words
+        ):
+            matches.append(sweet_id)
+    return matches
+
+
+def run(database_url: str, sizes: list[int], repeats: int, brute_force_max: int) -> list[dict]:
+    """
+    Time misspelled searches for each catalog size.
+    
+    Args:
+        database_url: Target database URL
+        sizes: Catalog sizes to measure
+        repeats: Searches per size
+        brute_force_max: Largest catalog to run the brute-force scan on
+    
+    Returns:
+        list: One result row per catalog size
+    """
+    engine = create_engine(database_url)
+    SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    rng = random.Random(0)
+    
+    results = []
+    for size in sizes:
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        names = seed(SessionFactory, size)
+        terms = [misspell(name, rng) for name in names]
+        row = {"rows": size}
+        
+        with SessionFactory() as db:
+            name_index.clear()
+            name_index.load(db)
+            timings = []
+            for attempt in range(repeats):
+                began = time.perf_counter()
+                found = name_index.fuzzy_matching_ids(
+                    db, terms[attempt % len(terms)], settings.name_fuzzy_max_results, settings.name_fuzzy_scan_budget
+                )
+                timings.append((time.perf_counter() - began) * 1000)
+                assert found
+            row["index_ms"] = round(statistics.median(timings), 3)
+            
+            row["brute_ms"] = "-"
+            if size <= brute_force_max:
+                all_names = {sweet_id: name.lower() for sweet_id, name in db.execute(select(Sweet.id, Sweet.name))}
+                timings = []
+                for attempt in range(min(repeats, 5)):
+                    began = time.perf_counter()
+                    brute_force(all_names, terms[attempt % len(terms)])
+                    timings.append((time.perf_counter() - began) * 1000)
+                row["brute_ms"] = round(statistics.median(timings), 1)
+        
+        results.append(row)
+    
+    engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default=None, help="Defaults to a temporary SQLite file")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--brute-force-max", type=int, default=100000)
+    args = parser.parse_args()
+    
+    database_url = args.database_url
+    if database_url is None:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'fuzzy_search.db')}"
+    
+    results = run(database_url, args.sizes, args.repeats, args.brute_force_max)
+    columns = [key for key in results[0] if key != "rows"]
+    print(f"{'rows':>9} " + " ".join(f"{column:>12}" for column in columns))
+    for row in results:
+        print(f"{row['rows']:>9} " + " ".join(f"{row[column]:>12}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
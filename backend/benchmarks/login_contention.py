@@ -0,0 +1,158 @@
+"""
+Catalog read latency under a concurrent login burst.
+
+Runs the app under uvicorn in-process and measures GET /api/sweets latency
+from one client while many others log in as fast as they can, with Argon2
+either on the password process pool or, as before, inside the request
+threadpool.
+
+Usage (from the backend/ directory, with .env configured):
+    python -m benchmarks.login_contention
+    python -m benchmarks.login_contention --logins 16 64 --seconds 10
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import tempfile
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import app.services.user_service as user_service
+from app.database import Base, get_db
+from app.main import app
+from app.models.user import User
+from app.models.sweet import Sweet
+from app.core.password_pool import password_pool
+from app.core.security import hash_password, verify_password
+
+EMAIL = "bench@example.com"
+PASSWORD = "bench-password"
+
+
+class ThreadpoolHasher:
+    """The previous behaviour: Argon2 inside a request threadpool slot."""
+    
+    async def hash(self, password: str) -> str:
+        return await run_in_threadpool(hash_password, password)
+    
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await run_in_threadpool(verify_password, password, hashed_password)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure(base_url: str, token: str, logins: int, seconds: float) -> dict:
+    """Read the catalog for a while with `logins` clients logging in alongside."""
+    stop = threading.Event()
+    outcomes = {"ok": 0, "rejected": 0}
+    
+    def log_in():
+        with httpx.Client(base_url=base_url, timeout=60) as client:
+            while not stop.is_set():
+                response = client.post("/api/auth/login", json={"email": EMAIL, "password": PASSWORD})
+                outcomes["ok" if response.status_code == 200 else "rejected"] += 1
+    
+    threads = [threading.Thread(target=log_in, daemon=True) for _ in range(logins)]
+    for thread in threads:
+        thread.start()
+    
+    latencies = []
+    headers = {"Authorization": f"Bearer {token}"}
+    with httpx.Client(base_url=base_url, timeout=60) as client:
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            began = time.perf_counter()
+            client.get("/api/sweets?limit=20", headers=headers)
+            latencies.append((time.perf_counter() - began) * 1000)
+    
+    stop.set()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return {
+        "reads": len(latencies),
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1], 1),
+        "logins_ok": outcomes["ok"],
+        "logins_503": outcomes["rejected"]
+    }
+
+
+def run(login_counts: list[int], seconds: float) -> list[dict]:
+    """
+    Measure catalog latency for each login concurrency and hashing mode.
+    
+    Args:
+        login_counts: Concurrent login clients to measure
+        seconds: Measurement time per row
+    
+    Returns:
+        list: One result row per (logins, mode)
+    """
+    database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'login_contention.db')}"
+    engine = create_engine(database_url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with SessionFactory() as db:
+        db.add(User(email=EMAIL, full_name="Bench", hashed_password=hash_password(PASSWORD)))
+        db.execute(insert(Sweet), [
+            {"name": f"Sweet {i}", "category": "Bench", "price": 1.0, "quantity": 5} for i in range(1000)
+        ])
+        db.commit()
+    
+    def bench_db():
+        with SessionFactory() as db:
+            yield db
+    
+    app.dependency_overrides[get_db] = bench_db
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning", lifespan="off"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    password_pool.start()
+    
+    base_url = f"http://127.0.0.1:{port}"
+    token = httpx.post(f"{base_url}/api/auth/login", json={"email": EMAIL, "password": PASSWORD}).json()["access_token"]
+    
+    results = [{"logins": 0, "mode": "idle", **measure(base_url, token, 0, seconds)}]
+    for logins in login_counts:
+        for mode, hasher in (("threadpool", ThreadpoolHasher()), ("process_pool", password_pool)):
+            user_service.password_pool = hasher
+            results.append({"logins": logins, "mode": mode, **measure(base_url, token, logins, seconds)})
+    user_service.password_pool = password_pool
+    
+    server.should_exit = True
+    password_pool.shutdown()
+    app.dependency_overrides.pop(get_db, None)
+    engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, nargs="+", default=[16, 64])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+    
+    results = run(args.logins, args.seconds)
+    columns = ["mode", "reads", "p50_ms", "p99_ms", "logins_ok", "logins_503"]
+    print(f"{'logins':>7} " + " ".join(f"{column:>13}" for column in columns))
+    for row in results:
+        print(f"{row['logins']:>7} " + " ".join(f"{row[column]:>13}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Latency benchmark for the autocomplete endpoint's prefix index against catalog size.
+
+Measures SweetService.suggest_sweets for one- to five-letter prefixes and
+compares it with the LIKE 'prefix%' query the search box would otherwise run.
+
+Usage (from the backend/ directory, with .env configured):
+    python -m benchmarks.suggest
+    python -m benchmarks.suggest --sizes 10000 100000 1000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import string
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models.sweet import Sweet
+from app.services.suggest_index import suggest_index
+from app.services.sweet_service import SweetService
+
+
+FLAVORS = ["Chocolate", "Caramel", "Strawberry", "Lemon", "Mint", "Vanilla", "Coconut", "Honey"]
+KINDS = ["Truffle", "Fudge", "Toffee", "Drop", "Bar", "Bonbon", "Brittle", "Gummy"]
+
+
+def seed(SessionFactory, rows: int, chunk: int = 50_000) -> list[str]:
+    """Insert a synthetic catalog and return a sample of names."""
+    rng = random.Random(rows)
+    names = []
+    with SessionFactory() as db:
+        for start in range(0, rows, chunk):
+            batch = []
+            for i in range(start, min(start + chunk, rows)):
+                code = "".join(rng.choices(string.ascii_lowercase, k=5))
+                name = f"{code} {rng.choice(FLAVORS)} {rng.choice(KINDS)} {i}"
+                batch.append({"name": name, "category": rng.choice(KINDS), "price": 1.0, "quantity": rng.randint(0, 100)})
+            db.execute(insert(Sweet), batch)
+            names.extend(row["name"] for row in batch[:20])
+        db.commit()
+    return names
+
+
+def run(database_url: str, sizes: list[int], repeats: int) -> list[dict]:
+    """
+    Time suggestions per prefix length for each catalog size.
+    
+    Args:
+        database_url: Target database URL
+        sizes: Catalog sizes to measure
+        repeats: Lookups per prefix length
+    
+    Returns:
+        list: One result row per catalog size
+    """
+    engine = create_engine(database_url)
+    SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    
+    results = []
+    for size in sizes:
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        names = seed(SessionFactory, size)
+        row = {"rows": size}
+        
+        with SessionFactory() as db:
+            suggest_index.clear()
+            began = time.perf_counter()
+            suggest_index.load(db)
+            row["load_s"] = round(time.perf_counter() - began, 1)
+            
+            for length in (1, 2, 3, 5):
+                timings = []
+                for attempt in range(repeats):
+                    prefix = names[attempt % len(names)][:length]
+                    began = time.perf_counter()
+                    SweetService.suggest_sweets(db, prefix, 10, "stock")
+                    timings.append((time.perf_counter() - began) * 1000)
+                row[f"prefix{length}_ms"] = round(statistics.median(timings), 3)
+            
+            timings = []
+            for attempt in range(min(repeats, 20)):
+                prefix = names[attempt % len(names)][:3]
+                began = time.perf_counter()
+                db.query(Sweet.id, Sweet.name).filter(Sweet.name.ilike(f"{prefix}%")) \
+                    .order_by(Sweet.quantity.desc()).limit(10).all()
+                timings.append((time.perf_counter() - began) * 1000)
+            row["like3_ms"] = round(statistics.median(timings), 3)
+        
+        results.append(row)
+    
+    engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default=None, help="Defaults to a temporary SQLite file")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+    
+    database_url = args.database_url
+    if database_url is None:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'suggest.db')}"
+    
+    results = run(database_url, args.sizes, args.repeats)
+    columns = [key for key in results[0] if key != "rows"]
+    print(f"{'rows':>9} " + " ".join(f"{column:>12}" for column in columns))
+    for row in results:
+        print(f"{row['rows']:>9} " + " ".join(f"{row[column]:>12}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Auth overhead per request with and without the verified-token cache.
+
+Measures decode_token on its own, then a minimal authenticated route that
+does nothing but resolve get_current_user (token plus user status check),
+through the ASGI stack. The same bearer token is sent on every request, as
+real clients do. The last row also reloads the user's status from the
+database on every request, which is what the status cache saves.
+
+Usage (from the backend/ directory, with .env configured):
+    python -m benchmarks.token_cache
+    python -m benchmarks.token_cache --requests 5000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.database import Base, get_db
+from app.models.user import User
+from app.core.dependencies import get_current_user
+from app.core.security import create_access_token, decode_token
+from app.core.token_cache import token_cache
+from app.services.user_status import user_status_cache
+
+
+def decode_us(token: str, requests: int) -> float:
+    """Mean microseconds per decode_token call."""
+    decode_token(token)
+    began = time.perf_counter()
+    for _ in range(requests):
+        decode_token(token)
+    return (time.perf_counter() - began) / requests * 1e6
+
+
+def request_us(client: TestClient, path: str, headers: dict, requests: int, before=None) -> float:
+    """Mean microseconds per request, calling before() ahead of each one."""
+    client.get(path, headers=headers)
+    began = time.perf_counter()
+    for _ in range(requests):
+        if before is not None:
+            before()
+        client.get(path, headers=headers)
+    return (time.perf_counter() - began) / requests * 1e6
+
+
+def run(requests: int) -> list[dict]:
+    """
+    Measure auth cost with the caches off and on.
+    
+    Args:
+        requests: Calls per measurement
+    
+    Returns:
+        list: One result row per mode
+    """
+    database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'token_cache.db')}"
+    engine = create_engine(database_url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with SessionFactory() as db:
+        db.add(User(id=1, email="bench@example.com", full_name="Bench", hashed_password="-"))
+        db.commit()
+    
+    def bench_db():
+        with SessionFactory() as db:
+            yield db
+    
+    app = FastAPI()
+    app.dependency_overrides[get_db] = bench_db
+    
+    @app.get("/anonymous")
+    def anonymous():
+        return {}
+    
+    @app.get("/authenticated")
+    def authenticated(current_user=Depends(get_current_user)):
+        return {}
+    
+    token = create_access_token(1, "bench@example.com")
+    headers = {"Authorization": f"Bearer {token}"}
+    enabled = settings.token_cache_enabled
+    results = []
+    with TestClient(app) as client:
+        baseline = request_us(client, "/anonymous", {}, requests)
+        for mode, cache_enabled, before in (
+            ("uncached", False, None),
+            ("cached", True, None),
+            ("no_status", True, user_status_cache.clear)
+        ):
+            settings.token_cache_enabled = cache_enabled
+            token_cache.clear()
+            results.append({
+                "mode": mode,
+                "decode_us": round(decode_us(token, requests), 1),
+                "request_us": round(request_us(client, "/authenticated", headers, requests, before), 1),
+                "baseline_us": round(baseline, 1)
+            })
+    settings.token_cache_enabled = enabled
+    token_cache.clear()
+    user_status_cache.clear()
+    engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    
+    results = run(args.requests)
+    columns = ["decode_us", "request_us", "baseline_us"]
+    print(f"{'mode':>10} " + " ".join(f"{column:>12}" for column in columns))
+    for row in results:
+        print(f"{row['mode']:>10} " + " ".join(f"{row[column]:>12}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Bulk user import throughput against one-by-one registration.
+
+Creates the same users three ways on a fresh SQLite database: the register
+path (existence SELECT, one hash and one commit per user), the bulk importer
+with a single hash process, and (on multi-core hosts) the bulk importer with
+one hash process per core. Hashing uses the configured Argon2 costs.
+
+Usage (from the backend/ directory, with .env configured):
+    python -m benchmarks.user_import
+    python -m benchmarks.user_import --users 500
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models.user import User
+from app.core.security import hash_password
+from app.services.user_import import user_import
+
+
+def register_one_by_one(SessionFactory, rows: list[dict]) -> None:
+    """What UserService.register does for each user, in a loop."""
+    with SessionFactory() as db:
+        for row in rows:
+            if db.query(User).filter(User.email == row["email"]).first():
+                continue
+            db.add(User(email=row["email"], full_name=row["full_name"], hashed_password=hash_password(row["password"])))
+            db.commit()
+
+
+def bulk_import(SessionFactory, rows: list[dict], workers: int) -> None:
+    """The bulk importer with `workers` hash processes."""
+    with SessionFactory() as db:
+        with user_import(db, "ndjson", workers=workers) as importer:
+            importer.feed(json.dumps(row) for row in rows)
+            importer.finish()
+
+
+def run(users: int) -> list[dict]:
+    """
+    Time each way of creating `users` accounts.
+    
+    Args:
+        users: Accounts created per mode
+    
+    Returns:
+        list: One result row per mode
+    """
+    cores = os.cpu_count() or 1
+    modes = [
+        ("register", lambda factory, rows: register_one_by_one(factory, rows)),
+        ("bulk_1_worker", lambda factory, rows: bulk_import(factory, rows, 1)),
+    ]
+    if cores > 1:
+        modes.append((f"bulk_{cores}_workers", lambda factory, rows: bulk_import(factory, rows, cores)))
+    results = []
+    for mode, create in modes:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'user_import.db')}"
+        engine = create_engine(database_url, connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        rows = [
+            {"email": f"user{i}@example.com", "full_name": f"User {i}", "password": f"password-{i}"}
+            for i in range(users)
+        ]
+        
+        began = time.perf_counter()
+        create(SessionFactory, rows)
+        elapsed = time.perf_counter() - began
+        with SessionFactory() as db:
+            created = db.query(User).count()
+        engine.dispose()
+        results.append({
+            "mode": mode,
+            "created": created,
+            "seconds": round(elapsed, 2),
+            "users_per_s": round(created / elapsed, 1)
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=100)
+    args = parser.parse_args()
+    
+    results = run(args.users)
+    columns = ["created", "seconds", "users_per_s"]
+    print(f"{'mode':>16} " + " ".join(f"{column:>12}" for column in columns))
+    for row in results:
+        print(f"{row['mode']:>16} " + " ".join(f"{row[column]:>12}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,14 @@ from app.database import Base, get_db
 from app.models.user import User
 from app.models.sweet import Sweet
 from app.core.security import hash_password
+from app.services.stock_shards import shard_registry
+from app.core.cache import clear_caches
+from app.core.catalog import catalog_version
+from app.services.sweet_counts import sweet_counter
+from app.services.name_index import name_index
+from app.services.catalog_snapshot import catalog_snapshot
+from app.services.suggest_index import suggest_index
+from app.core.token_cache import token_cache
 
 
 # Use in-memory SQLite for testing
@@ -45,6 +53,14 @@ app.dependency_overrides[get_db] = override_get_db
 def db():
     """Provide test database session."""
     Base.metadata.create_all(bind=engine)
+    shard_registry.clear()
+    clear_caches()
+    catalog_version.reset()
+    sweet_counter.reset()
+    name_index.clear()
+    catalog_snapshot.clear()
+    token_cache.clear()
+    suggest_index.clear()
     yield TestingSessionLocal()
     Base.metadata.drop_all(bind=engine)
 
@@ -163,3 +163,454 @@ class TestTokenValidation:
         )
         
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+class TestPasswordPool:
+    """Test suite for Argon2 hashing on the password process pool."""
+    
+    def test_hash_and_verify_round_trip(self):
+        """Test that hashes made on the pool verify on the pool."""
+        import asyncio
+        from app.core.password_pool import password_pool
+        
+        async def run():
+            hashed = await password_pool.hash("s3cret-pass")
+            return (
+                await password_pool.verify("s3cret-pass", hashed),
+                await password_pool.verify("wrong-pass", hashed)
+            )
+        
+        assert asyncio.run(run()) == (True, False)
+        assert password_pool.pending == 0
+    
+    def test_auth_routes_do_not_hold_threadpool(self):
+        """Test that register and login are coroutines awaiting the pool."""
+        import inspect
+        from app.routers import auth
+        
+        assert inspect.iscoroutinefunction(auth.register)
+        assert inspect.iscoroutinefunction(auth.login)
+    
+    def test_saturated_pool_rejects_with_503(self, client, test_user_data, registered_user, monkeypatch):
+        """Test that logins are shed immediately once the pending limit is reached."""
+        from app.core.password_pool import password_pool
+        
+        monkeypatch.setattr(password_pool, "max_pending", 0)
+        response = client.post(
+            "/api/auth/login",
+            json={"email": test_user_data["email"], "password": test_user_data["password"]}
+        )
+        
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert "retry" in response.json()["detail"]
+
+
+class TestTokenCache:
+    """Test suite for the verified-token cache and token revocation."""
+    
+    def test_repeat_requests_skip_verification(self, client, auth_headers, monkeypatch):
+        """Test that a token is verified once and then served from the cache."""
+        from app.core import security
+        
+        calls = []
+        verify = security._verify_token
+        monkeypatch.setattr(security, "_verify_token", lambda token: calls.append(token) or verify(token))
+        
+        for _ in range(3):
+            assert client.get("/api/sweets", headers=auth_headers).status_code == status.HTTP_200_OK
+        
+        assert len(calls) == 1
+    
+    def test_expired_token_is_never_served(self):
+        """Test that a cached token past its exp is dropped, even if its entry is still live."""
+        import time
+        from app.core.security import TokenData
+        from app.core.token_cache import token_cache
+        
+        key = token_cache.key("expired-token")
+        expired = TokenData(user_id=1, email="a@example.com", expires_at=time.time() - 1)
+        token_cache._cache.set(key, expired, ttl_seconds=60)
+        
+        assert token_cache.get(key) is None
+        token_cache.set(key, expired)
+        assert token_cache.get(key) is None
+    
+    def test_entry_lives_no_longer_than_token(self):
+        """Test that a token is cached only until its exp."""
+        from datetime import timedelta
+        from app.core.security import create_access_token, decode_token
+        from app.core.token_cache import token_cache
+        
+        token = create_access_token(1, "a@example.com", expires_delta=timedelta(seconds=-1))
+        
+        assert decode_token(token) is None
+        assert token_cache.get(token_cache.key(token)) is None
+    
+    def test_admin_revokes_user_tokens(self, client, auth_headers, admin_headers, registered_user, test_user_data):
+        """Test that revoked tokens are rejected and a fresh login works."""
+        assert client.get("/api/sweets", headers=auth_headers).status_code == status.HTTP_200_OK
+        
+        response = client.post(f"/api/auth/users/{registered_user.id}/revoke-tokens", headers=admin_headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["user"]["email"] == test_user_data["email"]
+        
+        assert client.get("/api/sweets", headers=auth_headers).status_code == status.HTTP_401_UNAUTHORIZED
+        assert client.get("/api/sweets", headers=admin_headers).status_code == status.HTTP_200_OK
+        
+        login = client.post(
+            "/api/auth/login",
+            json={"email": test_user_data["email"], "password": test_user_data["password"]}
+        )
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        assert client.get("/api/sweets", headers=headers).status_code == status.HTTP_200_OK
+    
+    def test_revoke_requires_admin(self, client, auth_headers, registered_user):
+        """Test that regular users cannot revoke tokens."""
+        response = client.post(f"/api/auth/users/{registered_user.id}/revoke-tokens", headers=auth_headers)
+        
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+    
+    def test_revoke_unknown_user(self, client, admin_headers):
+        """Test that revoking tokens of a missing user returns 404."""
+        response = client.post("/api/auth/users/99999/revoke-tokens", headers=admin_headers)
+        
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+    
+    def test_revocation_applies_with_cache_disabled(self, client, auth_headers, admin_headers, registered_user, monkeypatch):
+        """Test that revocation does not depend on the cache being enabled."""
+        from app.config import settings
+        
+        monkeypatch.setattr(settings, "token_cache_enabled", False)
+        client.post(f"/api/auth/users/{registered_user.id}/revoke-tokens", headers=admin_headers)
+        
+        assert client.get("/api/sweets", headers=auth_headers).status_code == status.HTTP_401_UNAUTHORIZED
+    
+    def test_revocation_reaches_other_workers(self, client, auth_headers, admin_headers, registered_user):
+        """Test that the stored watermark rejects tokens in a process that never saw the revocation."""
+        from app.core.token_cache import token_cache
+        from app.services.user_status import user_status_cache
+        
+        client.post(f"/api/auth/users/{registered_user.id}/revoke-tokens", headers=admin_headers)
+        # A fresh worker (or a restart) has neither the local watermark nor a cached status
+        token_cache.clear()
+        user_status_cache.clear()
+        
+        assert client.get("/api/sweets", headers=auth_headers).status_code == status.HTTP_401_UNAUTHORIZED
+        assert client.get("/api/sweets", headers=admin_headers).status_code == status.HTTP_200_OK
+
+
+class TestUserStatus:
+    """Test suite for per-request active/admin checks through the status cache."""
+    
+    def test_deactivated_user_is_rejected_immediately(self, client, db, auth_headers, registered_user):
+        """Test that deactivation applies to tokens already issued."""
+        from app.services.user_service import UserService
+        
+        assert client.get("/api/sweets", headers=auth_headers).status_code == status.HTTP_200_OK
+        UserService.deactivate_user(db, registered_user.id)
+        
+        response = client.get("/api/sweets", headers=auth_headers)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response.json()["detail"] == "User account is disabled"
+    
+    def test_role_changes_apply_to_existing_tokens(self, client, db, auth_headers, admin_headers, registered_user, registered_admin, test_sweet_data):
+        """Test that promotions and demotions override the token's is_admin claim."""
+        from app.services.user_service import UserService
+        
+        assert client.post("/api/sweets", json=test_sweet_data, headers=auth_headers).status_code == status.HTTP_403_FORBIDDEN
+        UserService.update_user_role(db, registered_user.id, True)
+        assert client.post("/api/sweets", json=test_sweet_data, headers=auth_headers).status_code == status.HTTP_201_CREATED
+        
+        UserService.update_user_role(db, registered_admin.id, False)
+        assert client.post("/api/sweets", json={**test_sweet_data, "name": "Other"}, headers=admin_headers).status_code == status.HTTP_403_FORBIDDEN
+    
+    def test_status_is_cached_between_requests(self, client, auth_headers):
+        """Test that only the first request loads the user's status."""
+        from app.core.cache import cache_stats
+        
+        for _ in range(3):
+            client.get("/api/sweets", headers=auth_headers)
+        
+        stats = cache_stats()["user_status"]
+        assert stats["misses"] == 1
+        assert stats["hits"] == 2
+    
+    def test_changes_from_other_processes_apply_after_ttl(self, client, db, auth_headers, registered_user, monkeypatch):
+        """Test that a change made elsewhere is picked up once the entry expires."""
+        import time
+        from app.services.user_status import user_status_cache
+        
+        monkeypatch.setattr(user_status_cache._cache, "ttl_seconds", 0.2)
+        assert client.get("/api/sweets", headers=auth_headers).status_code == status.HTTP_200_OK
+        
+        # Another worker deactivates the user; this process is not told
+        registered_user.is_active = False
+        db.commit()
+        assert client.get("/api/sweets", headers=auth_headers).status_code == status.HTTP_200_OK
+        
+        time.sleep(0.25)
+        assert client.get("/api/sweets", headers=auth_headers).status_code == status.HTTP_401_UNAUTHORIZED
+    
+    def test_load_racing_an_invalidation_is_not_stored(self):
+        """Test that a status read before an invalidation is discarded."""
+        from app.services.user_status import UserStatus, user_status_cache
+        
+        version = user_status_cache.generation(42)
+        user_status_cache.invalidate(42)
+        user_status_cache.set(42, UserStatus(is_active=True, is_admin=True, version=version))
+        
+        assert user_status_cache.get(42) is None
+    
+    def test_deleted_user_is_rejected(self, client, db, auth_headers, registered_user):
+        """Test that tokens of users that no longer exist are refused."""
+        db.delete(registered_user)
+        db.commit()
+        
+        assert client.get("/api/sweets", headers=auth_headers).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+class TestPasswordRehash:
+    """Test suite for configurable Argon2 costs and background rehashing."""
+    
+    @pytest.fixture
+    def outdated_user(self, db, test_user_data):
+        """A user whose stored hash was made with weaker Argon2 costs."""
+        from passlib.hash import argon2
+        from app.models.user import User
+        
+        user = User(
+            email=test_user_data["email"],
+            full_name=test_user_data["full_name"],
+            hashed_password=argon2.using(rounds=1, memory_cost=8192, parallelism=1).hash(test_user_data["password"])
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        return user
+    
+    @pytest.fixture
+    def rehasher(self, db, monkeypatch):
+        """A running rehasher writing to the test database."""
+        from sqlalchemy.orm import sessionmaker
+        from app.services import password_rehasher as module
+        
+        rehasher = module.PasswordRehasher(sessionmaker(bind=db.get_bind()), max_wait_seconds=0.01)
+        monkeypatch.setattr(module.password_rehasher, "current", rehasher)
+        rehasher.start()
+        yield rehasher
+        rehasher.stop()
+    
+    def test_configured_costs_are_used(self):
+        """Test that new hashes use the configured costs and need no rehash."""
+        from app.config import settings
+        from app.core.security import hash_password, password_needs_rehash
+        
+        hashed = hash_password("s3cret-pass")
+        
+        assert f"m={settings.password_hash_memory_cost_kib},t={settings.password_hash_time_cost}" in hashed
+        assert not password_needs_rehash(hashed)
+    
+    def test_login_rehashes_outdated_hash_in_background(self, client, db, outdated_user, rehasher, test_user_data):
+        """Test that a login upgrades an outdated hash without a password reset."""
+        import time
+        from app.core.security import password_needs_rehash, verify_password
+        
+        assert password_needs_rehash(outdated_user.hashed_password)
+        response = client.post(
+            "/api/auth/login",
+            json={"email": test_user_data["email"], "password": test_user_data["password"]}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        
+        deadline = time.monotonic() + 10
+        while rehasher.rehashed == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        
+        db.expire_all()
+        assert rehasher.rehashed == 1
+        assert not password_needs_rehash(outdated_user.hashed_password)
+        assert verify_password(test_user_data["password"], outdated_user.hashed_password)
+    
+    def test_rehash_does_not_overwrite_changed_password(self, db, outdated_user, rehasher):
+        """Test that a rehash is dropped if the stored hash changed since the login."""
+        old_hash = outdated_user.hashed_password
+        outdated_user.hashed_password = "changed-elsewhere"
+        db.commit()
+        
+        rehasher.process([(outdated_user.id, old_hash, "rehashed")])
+        
+        db.expire_all()
+        assert outdated_user.hashed_password == "changed-elsewhere"
+    
+    def test_busy_pool_skips_rehash(self, outdated_user, rehasher, monkeypatch):
+        """Test that rehashes give way to sign-ins when the pool is busy."""
+        from app.core.password_pool import password_pool
+        
+        monkeypatch.setattr(password_pool, "max_pending", 1)
+        rehasher.submit(outdated_user.id, "s3cret-pass", outdated_user.hashed_password)
+        
+        assert rehasher.skipped == 1
+        assert password_pool.pending == 0
+    
+    def test_calibration_recommends_setting_within_target(self, monkeypatch):
+        """Test that calibration picks the strongest setting under the target latency."""
+        from app.cli import calibrate_argon2
+        
+        # Latency proportional to memory x time: 1 ms per 19456 KiB pass
+        monkeypatch.setattr(
+            calibrate_argon2,
+            "measure",
+            lambda time_cost, memory_cost_kib, parallelism, samples: time_cost * memory_cost_kib / 19456
+        )
+        rows, recommended = calibrate_argon2.calibrate(6, parallelism=1, max_memory_kib=65536, samples=1)
+        
+        assert all(row["median_ms"] <= 6 for row in rows if row["within_target"])
+        assert (recommended["memory_cost_kib"], recommended["time_cost"]) == (19456, 6)
+
+
+class TestUserImport:
+    """Test suite for bulk user import."""
+    
+    @pytest.fixture(autouse=True)
+    def one_hash_worker(self, monkeypatch):
+        """Keep process start-up short in tests."""
+        from app.config import settings
+        
+        monkeypatch.setattr(settings, "user_import_hash_workers", 1)
+    
+    def test_ndjson_import_reports_bad_rows(self, client, db, admin_headers, registered_user, test_user_data):
+        """Test that valid rows are created and each bad row is reported by line."""
+        import json
+        
+        lines = [
+            json.dumps({"email": "one@example.com", "full_name": "One", "password": "password-one"}),
+            "{not json",
+            json.dumps({"email": "not-an-email", "full_name": "Bad", "password": "password-bad"}),
+            "",
+            json.dumps({"email": "two@example.com", "full_name": "Two", "password": "password-two"}),
+            json.dumps({"email": "one@example.com", "full_name": "Again", "password": "password-again"}),
+            json.dumps({"email": test_user_data["email"], "full_name": "Taken", "password": "password-taken"}),
+            json.dumps(["not", "an", "object"]),
+        ]
+        response = client.post(
+            "/api/auth/users/import",
+            content="\n".join(lines),
+            headers={**admin_headers, "Content-Type": "application/x-ndjson"}
+        )
+        
+        assert response.status_code == status.HTTP_200_OK
+        report = response.json()
+        assert report["created"] == 2
+        assert report["failed"] == 5
+        assert [error["line"] for error in report["errors"]] == [2, 3, 6, 8, 7]
+        assert report["errors"][1]["email"] == "not-an-email"
+        
+        login = client.post("/api/auth/login", json={"email": "two@example.com", "password": "password-two"})
+        assert login.status_code == status.HTTP_200_OK
+    
+    def test_csv_import_in_batches(self, client, admin_headers, monkeypatch):
+        """Test a CSV upload spanning several batches, with error reporting capped."""
+        from app.config import settings
+        
+        monkeypatch.setattr(settings, "user_import_batch_size", 2)
+        monkeypatch.setattr(settings, "user_import_max_reported_errors", 1)
+        body = "\r\n".join([
+            "\ufeffemail,full_name,password",
+            'a@example.com,"Doe, Jane",password-a',
+            "b@example.com,Bee,password-b",
+            "c@example.com,Cee,password-c",
+            "short,row",
+            "d@example.com,D,short",
+        ])
+        response = client.post(
+            "/api/auth/users/import",
+            content=body.encode(),
+            headers={**admin_headers, "Content-Type": "text/csv"}
+        )
+        
+        report = response.json()
+        assert (report["created"], report["failed"], report["errors_truncated"]) == (3, 2, True)
+        assert report["errors"][0]["line"] == 5
+    
+    def test_csv_quoted_field_may_span_lines(self, client, admin_headers):
+        """Test that a quoted line break stays in the field and later rows keep their line numbers."""
+        body = "\n".join([
+            "email,full_name,password",
+            'a@example.com,"Jane',
+            'Doe",password-a',
+            "",
+            "short,row",
+            "b@example.com,Bee,password-b",
+            "c@example.com,Cee,short",
+        ])
+        response = client.post(
+            "/api/auth/users/import?format=csv",
+            content=body,
+            headers=admin_headers
+        )
+        
+        report = response.json()
+        assert (report["created"], report["failed"]) == (2, 2)
+        assert [error["line"] for error in report["errors"]] == [5, 7]
+        
+        login = client.post("/api/auth/login", json={"email": "a@example.com", "password": "password-a"})
+        assert login.json()["user"]["full_name"] == "Jane\nDoe"
+    
+    def test_csv_header_must_name_columns(self, client, admin_headers):
+        """Test that a CSV without the required columns is refused outright."""
+        response = client.post(
+            "/api/auth/users/import?format=csv",
+            content="email,name\na@example.com,A",
+            headers=admin_headers
+        )
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "password" in response.json()["detail"]
+    
+    def test_unknown_format_is_rejected(self, client, admin_headers):
+        """Test that a body of unknown type is refused."""
+        response = client.post("/api/auth/users/import", content="x", headers={**admin_headers, "Content-Type": "text/plain"})
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_import_requires_admin(self, client, auth_headers):
+        """Test that regular users cannot import users."""
+        response = client.post("/api/auth/users/import?format=ndjson", content="", headers=auth_headers)
+        
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+    
+    def test_one_import_at_a_time(self, client, admin_headers):
+        """Test that a second import in the same process is turned away."""
+        from app.services import user_import
+        
+        with user_import._running:
+            response = client.post("/api/auth/users/import?format=ndjson", content="", headers=admin_headers)
+        
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    
+    def test_email_registered_during_import_is_reported(self, db):
+        """Test that a batch insert losing a race falls back to row-by-row inserts."""
+        import json
+        from concurrent.futures import ThreadPoolExecutor
+        from app.models.user import User
+        from app.services.user_import import UserImporter
+        
+        class RacingExecutor(ThreadPoolExecutor):
+            """Registers one of the emails while the batch is hashing."""
+            
+            def map(self, fn, *iterables):
+                db.add(User(email="late@example.com", full_name="Late", hashed_password="x"))
+                db.commit()
+                return super().map(fn, *iterables)
+        
+        with RacingExecutor(max_workers=1) as executor:
+            importer = UserImporter(db, executor, "ndjson")
+            importer.feed([
+                json.dumps({"email": "early@example.com", "full_name": "Early", "password": "password-early"}),
+                json.dumps({"email": "late@example.com", "full_name": "Late", "password": "password-late"}),
+            ])
+            report = importer.finish()
+        
+        assert (report.created, report.failed) == (1, 1)
+        assert report.errors[0].line == 2
+        assert db.query(User).filter(User.email == "early@example.com").count() == 1
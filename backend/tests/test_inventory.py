@@ -161,3 +161,766 @@ class TestInventoryIntegration:
         sweet = db.query(Sweet).filter(Sweet.id == sweet_id).first()
         assert sweet.is_available is False
         assert sweet.quantity == 0
+
+
+class TestAtomicPurchase:
+    """Tests for the single-statement purchase path."""
+    
+    def test_failed_purchase_leaves_no_record(self, client, auth_headers, test_sweet, db):
+        """Test that an insufficient-stock purchase changes nothing."""
+        from app.models.sweet import Sweet, Purchase
+        
+        response = client.post(
+            f"/api/sweets/{test_sweet.id}/purchase",
+            json={"quantity": test_sweet.quantity + 1},
+            headers=auth_headers
+        )
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "Available: 100" in response.json()["detail"]
+        db.expire_all()
+        assert db.query(Sweet).filter(Sweet.id == test_sweet.id).first().quantity == 100
+        assert db.query(Purchase).count() == 0
+    
+    def test_purchase_unknown_user_rolls_back_stock(self, db, test_sweet):
+        """Test that a purchase for a missing user does not consume stock."""
+        from app.models.sweet import Sweet
+        from app.schemas.sweet import PurchaseRequest
+        from app.services.sweet_service import InventoryService
+        from app.core.exceptions import ResourceNotFoundException
+        
+        with pytest.raises(ResourceNotFoundException):
+            InventoryService.purchase_sweet(db, 99999, test_sweet.id, PurchaseRequest(quantity=5))
+        
+        db.expire_all()
+        assert db.query(Sweet).filter(Sweet.id == test_sweet.id).first().quantity == 100
+    
+    def test_concurrent_buyers_never_oversell(self, tmp_path):
+        """Test that concurrent buyers cannot oversell a single sweet."""
+        import threading
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.database import Base
+        from app.models.user import User
+        from app.models.sweet import Sweet, Purchase
+        from app.schemas.sweet import PurchaseRequest
+        from app.services.sweet_service import InventoryService
+        from app.core.exceptions import InsufficientInventoryException
+        
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'contention.db'}",
+            connect_args={"check_same_thread": False, "timeout": 30}
+        )
+        Base.metadata.create_all(bind=engine)
+        SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        
+        with SessionFactory() as session:
+            user = User(email="buyer@example.com", full_name="Buyer", hashed_password="x")
+            sweet = Sweet(name="Hot Sweet", category="Hot", price=2.0, quantity=50)
+            session.add_all([user, sweet])
+            session.commit()
+            user_id, sweet_id = user.id, sweet.id
+        
+        sold = []
+        
+        def buyer():
+            with SessionFactory() as session:
+                while True:
+                    try:
+                        InventoryService.purchase_sweet(
+                            session, user_id, sweet_id, PurchaseRequest(quantity=1)
+                        )
+                        sold.append(1)
+                    except InsufficientInventoryException:
+                        return
+        
+        threads = [threading.Thread(target=buyer) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        with SessionFactory() as session:
+            sweet = session.query(Sweet).filter(Sweet.id == sweet_id).first()
+            assert len(sold) == 50
+            assert sweet.quantity == 0
+            assert sweet.is_available is False
+            assert session.query(Purchase).count() == 50
+        engine.dispose()
+
+
+class TestCheckout:
+    """Test suite for the multi-item checkout endpoint."""
+    
+    def _create_sweets(self, client, admin_headers, quantities):
+        ids = []
+        for index, quantity in enumerate(quantities):
+            response = client.post(
+                "/api/sweets",
+                json={
+                    "name": f"Cart Sweet {index}",
+                    "category": "Cart",
+                    "price": 2.5,
+                    "quantity": quantity
+                },
+                headers=admin_headers
+            )
+            ids.append(response.json()["id"])
+        return ids
+    
+    def test_checkout_success(self, client, auth_headers, admin_headers):
+        """Test a multi-line order produces one receipt and decrements every line."""
+        first, second = self._create_sweets(client, admin_headers, [10, 5])
+        
+        response = client.post(
+            "/api/sweets/checkout",
+            json={"items": [
+                {"sweet_id": second, "quantity": 5},
+                {"sweet_id": first, "quantity": 2},
+                {"sweet_id": first, "quantity": 1}
+            ]},
+            headers=auth_headers
+        )
+        
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["total_quantity"] == 8
+        assert data["total_price"] == 20.0
+        assert [p["sweet_id"] for p in data["purchases"]] == [first, second]
+        assert all(p["id"] for p in data["purchases"])
+        
+        assert client.get(f"/api/sweets/{first}", headers=auth_headers).json()["quantity"] == 7
+        second_sweet = client.get(f"/api/sweets/{second}", headers=auth_headers).json()
+        assert second_sweet["quantity"] == 0
+        assert second_sweet["is_available"] is False
+    
+    def test_checkout_is_all_or_nothing(self, client, auth_headers, admin_headers, db):
+        """Test that one short line fails the whole order."""
+        from app.models.sweet import Purchase
+        
+        first, second = self._create_sweets(client, admin_headers, [10, 1])
+        
+        response = client.post(
+            "/api/sweets/checkout",
+            json={"items": [
+                {"sweet_id": first, "quantity": 3},
+                {"sweet_id": second, "quantity": 2}
+            ]},
+            headers=auth_headers
+        )
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert f"sweet {second}" in response.json()["detail"]
+        assert client.get(f"/api/sweets/{first}", headers=auth_headers).json()["quantity"] == 10
+        assert db.query(Purchase).count() == 0
+    
+    def test_checkout_nonexistent_sweet(self, client, auth_headers, test_sweet):
+        """Test checkout fails when a line references a missing sweet."""
+        response = client.post(
+            "/api/sweets/checkout",
+            json={"items": [
+                {"sweet_id": test_sweet.id, "quantity": 1},
+                {"sweet_id": 99999, "quantity": 1}
+            ]},
+            headers=auth_headers
+        )
+        
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+    
+    def test_checkout_empty_cart(self, client, auth_headers):
+        """Test checkout rejects an empty order."""
+        response = client.post(
+            "/api/sweets/checkout",
+            json={"items": []},
+            headers=auth_headers
+        )
+        
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+    
+    def test_checkout_merged_lines_respect_purchase_limit(self, client, auth_headers, admin_headers):
+        """Test that split lines for one sweet cannot exceed the per-purchase limit together."""
+        sweet_id, = self._create_sweets(client, admin_headers, [2000])
+        
+        response = client.post(
+            "/api/sweets/checkout",
+            json={"items": [
+                {"sweet_id": sweet_id, "quantity": 800},
+                {"sweet_id": sweet_id, "quantity": 800}
+            ]},
+            headers=auth_headers
+        )
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert client.get(f"/api/sweets/{sweet_id}", headers=auth_headers).json()["quantity"] == 2000
+
+
+class TestPurchaseBatcher:
+    """Test suite for the group-commit purchase batcher."""
+    
+    @pytest.fixture
+    def batch_db(self, tmp_path):
+        """Provide a file-backed database shared by the batcher worker."""
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.database import Base
+        from app.models.user import User
+        from app.models.sweet import Sweet
+        
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'batch.db'}",
+            connect_args={"check_same_thread": False, "timeout": 30}
+        )
+        Base.metadata.create_all(bind=engine)
+        SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        
+        with SessionFactory() as session:
+            user = User(email="batch@example.com", full_name="Batch", hashed_password="x")
+            sweets = [
+                Sweet(name="Flash Sweet", category="Sale", price=1.0, quantity=30),
+                Sweet(name="Other Sweet", category="Sale", price=2.0, quantity=5)
+            ]
+            session.add_all([user, *sweets])
+            session.commit()
+            ids = (user.id, sweets[0].id, sweets[1].id)
+        
+        yield SessionFactory, ids
+        engine.dispose()
+    
+    def test_batch_resolves_each_caller(self, batch_db):
+        """Test that each queued purchase gets its own success or failure."""
+        from app.models.sweet import Sweet, Purchase
+        from app.services.purchase_batcher import PurchaseBatcher
+        from app.core.exceptions import InsufficientInventoryException, ResourceNotFoundException
+        
+        SessionFactory, (user_id, flash_id, other_id) = batch_db
+        batcher = PurchaseBatcher(SessionFactory, max_batch_size=100, max_wait_ms=50)
+        futures = [batcher.submit(user_id, flash_id, 4) for _ in range(10)]
+        futures.append(batcher.submit(user_id, other_id, 5))
+        futures.append(batcher.submit(user_id, 99999, 1))
+        batcher.start()
+        batcher.stop()
+        
+        outcomes = [f.exception() for f in futures]
+        assert outcomes[:7] == [None] * 7
+        assert all(isinstance(e, InsufficientInventoryException) for e in outcomes[7:10])
+        assert outcomes[10] is None
+        assert isinstance(outcomes[11], ResourceNotFoundException)
+        assert futures[0].result().id is not None
+        
+        with SessionFactory() as session:
+            flash = session.query(Sweet).filter(Sweet.id == flash_id).first()
+            other = session.query(Sweet).filter(Sweet.id == other_id).first()
+            assert flash.quantity == 2
+            assert other.quantity == 0
+            assert other.is_available is False
+            assert session.query(Purchase).count() == 8
+    
+    def test_full_queue_is_rejected(self, batch_db):
+        """Test that a full queue sheds load instead of blocking."""
+        from app.services.purchase_batcher import PurchaseBatcher
+        from app.core.exceptions import ServiceUnavailableException
+        
+        SessionFactory, (user_id, flash_id, _) = batch_db
+        batcher = PurchaseBatcher(SessionFactory, max_queue_size=1)
+        batcher.submit(user_id, flash_id, 1)
+        
+        with pytest.raises(ServiceUnavailableException):
+            batcher.submit(user_id, flash_id, 1)
+    
+    def test_session_failure_fails_batch_not_worker(self, batch_db):
+        """Test that a batch whose session cannot open fails, and later batches still settle."""
+        from app.services.purchase_batcher import PurchaseBatcher
+        
+        SessionFactory, (user_id, flash_id, _) = batch_db
+        attempts = []
+        
+        def flaky_factory():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError("database unavailable")
+            return SessionFactory()
+        
+        batcher = PurchaseBatcher(flaky_factory, max_wait_ms=1)
+        batcher.start()
+        try:
+            first = batcher.submit(user_id, flash_id, 1)
+            assert isinstance(first.exception(timeout=5), RuntimeError)
+            second = batcher.submit(user_id, flash_id, 1)
+            assert second.result(timeout=5).quantity == 1
+        finally:
+            batcher.stop()
+    
+    def test_purchase_awaits_without_a_thread(self, batch_db):
+        """Test that many buyers can wait on one batch from a single event loop."""
+        import asyncio
+        import inspect
+        from app.routers import sweets
+        from app.services.purchase_batcher import PurchaseBatcher
+        
+        SessionFactory, (user_id, flash_id, _) = batch_db
+        batcher = PurchaseBatcher(SessionFactory, max_batch_size=100, max_wait_ms=50)
+        batcher.start()
+        
+        async def buy_all():
+            return await asyncio.gather(*(batcher.purchase(user_id, flash_id, 1) for _ in range(30)))
+        
+        try:
+            purchases = asyncio.run(buy_all())
+        finally:
+            batcher.stop()
+        
+        assert len({purchase.id for purchase in purchases}) == 30
+        assert inspect.iscoroutinefunction(sweets.purchase_sweet)
+
+
+class TestShardedInventory:
+    """Test suite for sharded stock counters."""
+    
+    def _shard(self, client, admin_headers, sweet_id, shard_count):
+        return client.put(
+            f"/api/sweets/{sweet_id}/shards",
+            json={"shard_count": shard_count},
+            headers=admin_headers
+        )
+    
+    def _shard_quantities(self, db, sweet_id):
+        from app.models.sweet import SweetStockShard
+        db.expire_all()
+        shards = db.query(SweetStockShard).filter(
+            SweetStockShard.sweet_id == sweet_id
+        ).order_by(SweetStockShard.shard_no).all()
+        return [shard.quantity for shard in shards]
+    
+    def test_enable_sharding_splits_stock(self, client, admin_headers, test_sweet, db):
+        """Test that enabling sharding spreads stock evenly and keeps the total."""
+        response = self._shard(client, admin_headers, test_sweet.id, 3)
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["quantity"] == 100
+        assert self._shard_quantities(db, test_sweet.id) == [34, 33, 33]
+    
+    def test_sharding_requires_admin(self, client, auth_headers, test_sweet):
+        """Test that regular users cannot configure shards."""
+        response = self._shard(client, auth_headers, test_sweet.id, 4)
+        
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+    
+    def test_purchases_draw_from_shards(self, client, admin_headers, auth_headers, test_sweet, db):
+        """Test purchases on a sharded sweet, including one larger than any shard."""
+        self._shard(client, admin_headers, test_sweet.id, 4)
+        
+        for _ in range(5):
+            response = client.post(
+                f"/api/sweets/{test_sweet.id}/purchase",
+                json={"quantity": 2},
+                headers=auth_headers
+            )
+            assert response.status_code == status.HTTP_200_OK
+        
+        response = client.post(
+            f"/api/sweets/{test_sweet.id}/purchase",
+            json={"quantity": 60},
+            headers=auth_headers
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert sum(self._shard_quantities(db, test_sweet.id)) == 30
+        
+        response = client.get(f"/api/sweets/{test_sweet.id}", headers=auth_headers)
+        assert response.json()["quantity"] == 30
+        
+        response = client.post(
+            f"/api/sweets/{test_sweet.id}/purchase",
+            json={"quantity": 31},
+            headers=auth_headers
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "Available: 30" in response.json()["detail"]
+    
+    def test_checkout_with_sharded_line(self, client, admin_headers, auth_headers, test_sweet, db):
+        """Test checkout mixes plain and sharded lines in one order."""
+        self._shard(client, admin_headers, test_sweet.id, 2)
+        other = client.post(
+            "/api/sweets",
+            json={"name": "Plain Sweet", "category": "Plain", "price": 1.0, "quantity": 10},
+            headers=admin_headers
+        ).json()["id"]
+        
+        response = client.post(
+            "/api/sweets/checkout",
+            json={"items": [
+                {"sweet_id": test_sweet.id, "quantity": 70},
+                {"sweet_id": other, "quantity": 4}
+            ]},
+            headers=auth_headers
+        )
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert sum(self._shard_quantities(db, test_sweet.id)) == 30
+        assert client.get(f"/api/sweets/{other}", headers=auth_headers).json()["quantity"] == 6
+    
+    def test_restock_rebalances_shards(self, client, admin_headers, auth_headers, test_sweet, db):
+        """Test that restocking a sharded sweet evens out its shards."""
+        self._shard(client, admin_headers, test_sweet.id, 4)
+        client.post(
+            f"/api/sweets/{test_sweet.id}/purchase",
+            json={"quantity": 25},
+            headers=auth_headers
+        )
+        
+        response = client.post(
+            f"/api/sweets/{test_sweet.id}/restock",
+            json={"quantity": 45},
+            headers=admin_headers
+        )
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["quantity"] == 120
+        assert self._shard_quantities(db, test_sweet.id) == [30, 30, 30, 30]
+    
+    def test_disable_sharding_folds_stock_back(self, client, admin_headers, auth_headers, test_sweet, db):
+        """Test that disabling sharding returns the shard total to the sweet row."""
+        from app.models.sweet import Sweet
+        
+        self._shard(client, admin_headers, test_sweet.id, 4)
+        client.post(
+            f"/api/sweets/{test_sweet.id}/purchase",
+            json={"quantity": 10},
+            headers=auth_headers
+        )
+        
+        response = self._shard(client, admin_headers, test_sweet.id, 0)
+        
+        assert response.json()["quantity"] == 90
+        assert self._shard_quantities(db, test_sweet.id) == []
+        assert db.query(Sweet).filter(Sweet.id == test_sweet.id).first().quantity == 90
+    
+    def test_sold_out_sharded_sweet_leaves_stock_filters(self, client, admin_headers, auth_headers, test_sweet):
+        """Test that in_stock filters follow a sharded sweet selling out and coming back."""
+        def in_stock():
+            response = client.post("/api/sweets/search", json={"in_stock": True}, headers=auth_headers)
+            return [s["id"] for s in response.json()["sweets"]]
+        
+        self._shard(client, admin_headers, test_sweet.id, 4)
+        for _ in range(3):
+            client.post(
+                f"/api/sweets/{test_sweet.id}/purchase",
+                json={"quantity": 25},
+                headers=auth_headers
+            )
+        assert in_stock() == [test_sweet.id]
+        
+        hold_id = client.post(
+            f"/api/sweets/{test_sweet.id}/reserve",
+            json={"quantity": 25},
+            headers=auth_headers
+        ).json()["id"]
+        assert in_stock() == []
+        facets = client.post("/api/sweets/search", json={"facets": True}, headers=auth_headers).json()["facets"]
+        assert (facets["in_stock"], facets["out_of_stock"]) == (0, 1)
+        
+        client.post(f"/api/sweets/reservations/{hold_id}/cancel", headers=auth_headers)
+        assert in_stock() == [test_sweet.id]
+
+
+class TestReservations:
+    """Test suite for hold-then-confirm stock reservations."""
+    
+    def _reserve(self, client, headers, sweet_id, quantity, ttl_seconds=None):
+        body = {"quantity": quantity}
+        if ttl_seconds is not None:
+            body["ttl_seconds"] = ttl_seconds
+        return client.post(f"/api/sweets/{sweet_id}/reserve", json=body, headers=headers)
+    
+    def _expire(self, db, hold_id):
+        from datetime import datetime, timedelta
+        from app.models.sweet import StockReservation
+        
+        db.query(StockReservation).filter(StockReservation.id == hold_id).update(
+            {"expires_at": datetime.utcnow() - timedelta(seconds=1)}
+        )
+        db.commit()
+    
+    def test_reserve_holds_stock(self, client, auth_headers, test_sweet):
+        """Test that a live hold is left out of the reported stock."""
+        response = self._reserve(client, auth_headers, test_sweet.id, 30, ttl_seconds=60)
+        
+        assert response.status_code == status.HTTP_201_CREATED
+        data = response.json()
+        assert data["status"] == "held"
+        assert data["quantity"] == 30
+        
+        sweet = client.get(f"/api/sweets/{test_sweet.id}", headers=auth_headers).json()
+        assert sweet["quantity"] == 70
+    
+    def test_reserve_more_than_available(self, client, auth_headers, test_sweet):
+        """Test that holds cannot exceed the available stock."""
+        response = self._reserve(client, auth_headers, test_sweet.id, 1000)
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "Insufficient inventory" in response.json()["detail"]
+    
+    def test_confirm_creates_purchase(self, client, auth_headers, test_sweet, db):
+        """Test that confirming a hold records the purchase without taking stock twice."""
+        from app.models.sweet import Sweet, Purchase
+        
+        hold_id = self._reserve(client, auth_headers, test_sweet.id, 4).json()["id"]
+        response = client.post(f"/api/sweets/reservations/{hold_id}/confirm", headers=auth_headers)
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["data"]["total_price"] == test_sweet.price * 4
+        assert db.query(Purchase).count() == 1
+        db.expire_all()
+        assert db.query(Sweet).filter(Sweet.id == test_sweet.id).first().quantity == 96
+        
+        again = client.post(f"/api/sweets/reservations/{hold_id}/confirm", headers=auth_headers)
+        assert again.status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_confirm_after_sweet_deleted(self, client, auth_headers, test_sweet, db):
+        """Test that a hold whose sweet row vanished meanwhile is not found rather than a server error."""
+        from app.models.sweet import Sweet, Purchase
+        
+        hold_id = self._reserve(client, auth_headers, test_sweet.id, 4).json()["id"]
+        # Remove only the sweet row, as a delete racing the confirm would
+        db.execute(Sweet.__table__.delete().where(Sweet.id == test_sweet.id))
+        db.commit()
+        
+        response = client.post(f"/api/sweets/reservations/{hold_id}/confirm", headers=auth_headers)
+        
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert db.query(Purchase).count() == 0
+    
+    def test_cancel_returns_stock(self, client, auth_headers, test_sweet, db):
+        """Test that cancelling a hold puts its stock back."""
+        from app.models.sweet import Sweet
+        
+        hold_id = self._reserve(client, auth_headers, test_sweet.id, 25).json()["id"]
+        response = client.post(f"/api/sweets/reservations/{hold_id}/cancel", headers=auth_headers)
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["status"] == "cancelled"
+        db.expire_all()
+        assert db.query(Sweet).filter(Sweet.id == test_sweet.id).first().quantity == 100
+        
+        confirm = client.post(f"/api/sweets/reservations/{hold_id}/confirm", headers=auth_headers)
+        assert confirm.status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_hold_of_another_user_not_found(self, client, auth_headers, admin_headers, test_sweet):
+        """Test that users cannot settle each other's holds."""
+        hold_id = self._reserve(client, auth_headers, test_sweet.id, 1).json()["id"]
+        
+        response = client.post(f"/api/sweets/reservations/{hold_id}/confirm", headers=admin_headers)
+        
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+    
+    def test_expired_hold_is_released(self, client, auth_headers, test_sweet, db):
+        """Test that expired holds cannot be confirmed and give their stock back."""
+        from app.models.sweet import Sweet, StockReservation
+        from app.services.reservation_service import ReservationService
+        
+        hold_id = self._reserve(client, auth_headers, test_sweet.id, 10).json()["id"]
+        self._expire(db, hold_id)
+        
+        response = client.post(f"/api/sweets/reservations/{hold_id}/confirm", headers=auth_headers)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "expired" in response.json()["detail"]
+        
+        assert ReservationService.release_expired(db) == 1
+        assert ReservationService.release_expired(db) == 0
+        db.expire_all()
+        assert db.query(Sweet).filter(Sweet.id == test_sweet.id).first().quantity == 100
+        assert db.query(StockReservation).filter(StockReservation.id == hold_id).first().status == "expired"
+    
+    def test_sweeper_reclaims_due_holds(self, client, auth_headers, test_sweet, db):
+        """Test that the background sweeper expires holds once they are due."""
+        import time
+        from sqlalchemy.orm import sessionmaker
+        from app.models.sweet import Sweet
+        from app.services.reservation_service import ReservationSweeper
+        
+        live_id = self._reserve(client, auth_headers, test_sweet.id, 5, ttl_seconds=600).json()["id"]
+        due_id = self._reserve(client, auth_headers, test_sweet.id, 15).json()["id"]
+        self._expire(db, due_id)
+        
+        sweeper = ReservationSweeper(sessionmaker(bind=db.get_bind()))
+        sweeper.start()
+        try:
+            for _ in range(100):
+                db.expire_all()
+                if db.query(Sweet).filter(Sweet.id == test_sweet.id).first().quantity == 95:
+                    break
+                time.sleep(0.02)
+            assert sweeper.pending() == 1
+        finally:
+            sweeper.stop()
+        
+        assert db.query(Sweet).filter(Sweet.id == test_sweet.id).first().quantity == 95
+        confirm = client.post(f"/api/sweets/reservations/{live_id}/confirm", headers=auth_headers)
+        assert confirm.status_code == status.HTTP_200_OK
+
+
+class TestIdempotencyKeys:
+    """Test suite for Idempotency-Key handling on purchase and restock."""
+    
+    def test_purchase_retry_is_replayed(self, client, auth_headers, test_sweet, db):
+        """Test that a retried purchase returns the first result without buying again."""
+        from app.models.sweet import Sweet, Purchase
+        
+        headers = {**auth_headers, "Idempotency-Key": "order-1"}
+        first = client.post(f"/api/sweets/{test_sweet.id}/purchase", json={"quantity": 3}, headers=headers)
+        retry = client.post(f"/api/sweets/{test_sweet.id}/purchase", json={"quantity": 3}, headers=headers)
+        
+        assert first.status_code == status.HTTP_200_OK
+        assert retry.status_code == status.HTTP_200_OK
+        assert retry.json() == first.json()
+        assert retry.headers["Idempotent-Replayed"] == "true"
+        assert db.query(Purchase).count() == 1
+        db.expire_all()
+        assert db.query(Sweet).filter(Sweet.id == test_sweet.id).first().quantity == 97
+    
+    def test_replay_survives_cache_loss(self, client, auth_headers, test_sweet, db):
+        """Test that the durable store answers once the in-memory tier is gone."""
+        from app.core.cache import clear_caches
+        from app.models.sweet import Purchase
+        
+        headers = {**auth_headers, "Idempotency-Key": "order-2"}
+        first = client.post(f"/api/sweets/{test_sweet.id}/purchase", json={"quantity": 1}, headers=headers)
+        clear_caches()
+        retry = client.post(f"/api/sweets/{test_sweet.id}/purchase", json={"quantity": 1}, headers=headers)
+        
+        assert retry.json() == first.json()
+        assert db.query(Purchase).count() == 1
+    
+    def test_key_reused_for_different_request(self, client, auth_headers, test_sweet):
+        """Test that a key cannot be replayed against a different request body."""
+        headers = {**auth_headers, "Idempotency-Key": "order-3"}
+        client.post(f"/api/sweets/{test_sweet.id}/purchase", json={"quantity": 1}, headers=headers)
+        
+        response = client.post(f"/api/sweets/{test_sweet.id}/purchase", json={"quantity": 2}, headers=headers)
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_failures_are_not_stored(self, client, auth_headers, admin_headers, test_sweet):
+        """Test that a failed attempt can be retried with the same key."""
+        headers = {**auth_headers, "Idempotency-Key": "order-4"}
+        failed = client.post(f"/api/sweets/{test_sweet.id}/purchase", json={"quantity": 150}, headers=headers)
+        client.post(f"/api/sweets/{test_sweet.id}/restock", json={"quantity": 100}, headers=admin_headers)
+        retry = client.post(f"/api/sweets/{test_sweet.id}/purchase", json={"quantity": 150}, headers=headers)
+        
+        assert failed.status_code == status.HTTP_400_BAD_REQUEST
+        assert retry.status_code == status.HTTP_200_OK
+        assert "Idempotent-Replayed" not in retry.headers
+    
+    def test_restock_retry_is_replayed(self, client, admin_headers, test_sweet):
+        """Test that a retried restock adds the stock only once."""
+        headers = {**admin_headers, "Idempotency-Key": "restock-1"}
+        first = client.post(f"/api/sweets/{test_sweet.id}/restock", json={"quantity": 50}, headers=headers)
+        retry = client.post(f"/api/sweets/{test_sweet.id}/restock", json={"quantity": 50}, headers=headers)
+        
+        assert first.json()["quantity"] == 150
+        assert retry.json()["quantity"] == 150
+    
+    def test_concurrent_duplicates_run_once(self, tmp_path):
+        """Test that duplicates of an in-flight key wait for the first one."""
+        import threading
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.database import Base
+        from app.services.idempotency_service import IdempotencyService
+        
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'idem.db'}",
+            connect_args={"check_same_thread": False, "timeout": 30}
+        )
+        Base.metadata.create_all(bind=engine)
+        SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        runs = []
+        results = []
+        
+        def request():
+            with SessionFactory() as session:
+                stored = IdempotencyService.begin(session, 1, "dup", "fp")
+                if stored is None:
+                    runs.append(1)
+                    threading.Event().wait(0.1)
+                    IdempotencyService.complete(session, 1, "dup", 200, '{"ok": true}')
+                    results.append('{"ok": true}')
+                else:
+                    results.append(stored.body)
+        
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+        
+        assert len(runs) == 1
+        assert results == ['{"ok": true}'] * 8
+    
+    def _age_claim(self, db, key):
+        """Make a claimed key look abandoned: owner gone, record past the lock timeout."""
+        from datetime import datetime, timedelta
+        from app.models.idempotency import IdempotencyRecord
+        from app.services.idempotency_service import IdempotencyService
+        
+        record = db.query(IdempotencyRecord).filter(IdempotencyRecord.key == key).one()
+        IdempotencyService._release((record.user_id, key))
+        record.created_at = datetime.utcnow() - timedelta(hours=1)
+        db.commit()
+        return record.id
+    
+    def test_applied_key_is_never_run_again(self, client, auth_headers, test_sweet, db, registered_user):
+        """Test that a key whose purchase committed without storing a response is not retaken."""
+        from app.models.sweet import Sweet, Purchase
+        from app.schemas.sweet import PurchaseRequest
+        from app.services.idempotency_service import IdempotencyService
+        from app.services.sweet_service import InventoryService
+        
+        # The owner commits the purchase, then dies before complete()
+        fingerprint = IdempotencyService.fingerprint(
+            "purchase", test_sweet.id, PurchaseRequest(quantity=2).model_dump_json()
+        )
+        assert IdempotencyService.begin(db, registered_user.id, "order-5", fingerprint) is None
+        record_id = IdempotencyService.claimed_record(registered_user.id, "order-5")
+        InventoryService.purchase_sweet(db, registered_user.id, test_sweet.id, PurchaseRequest(quantity=2), record_id)
+        self._age_claim(db, "order-5")
+        
+        retry = client.post(
+            f"/api/sweets/{test_sweet.id}/purchase",
+            json={"quantity": 2},
+            headers={**auth_headers, "Idempotency-Key": "order-5"}
+        )
+        
+        assert retry.status_code == status.HTTP_400_BAD_REQUEST
+        assert "already applied" in retry.json()["detail"]
+        assert db.query(Purchase).count() == 1
+        db.expire_all()
+        assert db.query(Sweet).filter(Sweet.id == test_sweet.id).first().quantity == 98
+    
+    def test_taken_over_owner_cannot_commit(self, client, auth_headers, test_sweet, db, registered_user):
+        """Test that a slow owner whose pending key was taken over applies nothing."""
+        from app.core.exceptions import ServiceUnavailableException
+        from app.models.sweet import Sweet, Purchase
+        from app.schemas.sweet import PurchaseRequest
+        from app.services.idempotency_service import IdempotencyService
+        from app.services.sweet_service import InventoryService
+        
+        IdempotencyService.begin(db, registered_user.id, "order-6", IdempotencyService.fingerprint(
+            "purchase", test_sweet.id, PurchaseRequest(quantity=3).model_dump_json()
+        ))
+        stale_record = self._age_claim(db, "order-6")
+        
+        retry = client.post(
+            f"/api/sweets/{test_sweet.id}/purchase",
+            json={"quantity": 3},
+            headers={**auth_headers, "Idempotency-Key": "order-6"}
+        )
+        assert retry.status_code == status.HTTP_200_OK
+        
+        with pytest.raises(ServiceUnavailableException):
+            InventoryService.purchase_sweet(
+                db, registered_user.id, test_sweet.id, PurchaseRequest(quantity=3), stale_record
+            )
+        assert db.query(Purchase).count() == 1
+        db.expire_all()
+        assert db.query(Sweet).filter(Sweet.id == test_sweet.id).first().quantity == 97
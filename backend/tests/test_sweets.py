@@ -214,3 +214,1256 @@ class TestSweetDelete:
         )
         
         assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestSweetPagination:
+    """Test suite for keyset (cursor) pagination."""
+    
+    @pytest.fixture
+    def catalog(self, db):
+        """Create a catalog of 25 sweets."""
+        from app.models.sweet import Sweet
+        
+        db.add_all(
+            Sweet(name=f"Sweet {i:02d}", category="Candy" if i % 2 else "Toffee", price=1.0 + i, quantity=i)
+            for i in range(25)
+        )
+        db.commit()
+    
+    def test_cursor_walks_every_page(self, client, auth_headers, catalog):
+        """Test that following next_cursor visits each sweet exactly once."""
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 10}
+            if cursor:
+                params["cursor"] = cursor
+            data = client.get("/api/sweets", params=params, headers=auth_headers).json()
+            seen.extend(s["id"] for s in data["sweets"])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+        
+        assert len(seen) == 25
+        assert seen == sorted(set(seen))
+    
+    def test_total_only_on_first_page_by_default(self, client, auth_headers, catalog):
+        """Test that the count is skipped on later pages unless requested."""
+        first = client.get("/api/sweets", params={"limit": 10}, headers=auth_headers).json()
+        cursor = first["next_cursor"]
+        second = client.get("/api/sweets", params={"limit": 10, "cursor": cursor}, headers=auth_headers).json()
+        counted = client.get(
+            "/api/sweets",
+            params={"limit": 10, "cursor": cursor, "include_total": True},
+            headers=auth_headers
+        ).json()
+        uncounted = client.get(
+            "/api/sweets", params={"limit": 10, "include_total": False}, headers=auth_headers
+        ).json()
+        
+        assert first["total"] == 25
+        assert second["total"] is None
+        assert counted["total"] == 25
+        assert uncounted["total"] is None
+    
+    def test_search_pages_with_filters(self, client, auth_headers, catalog):
+        """Test that search cursors keep the filters applied."""
+        first = client.post(
+            "/api/sweets/search",
+            json={"category": "Candy", "limit": 5},
+            headers=auth_headers
+        ).json()
+        second = client.post(
+            "/api/sweets/search",
+            json={"category": "Candy", "limit": 5, "cursor": first["next_cursor"]},
+            headers=auth_headers
+        ).json()
+        
+        assert first["total"] == 12
+        names = [s["name"] for s in first["sweets"] + second["sweets"]]
+        assert len(set(names)) == 10
+        assert all(s["category"] == "Candy" for s in first["sweets"] + second["sweets"])
+    
+    def test_invalid_cursor_rejected(self, client, auth_headers, catalog):
+        """Test that a tampered cursor is a client error."""
+        response = client.get("/api/sweets", params={"cursor": "not-a-cursor"}, headers=auth_headers)
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    @pytest.mark.parametrize("sort, values", [
+        ("price_asc", [{"a": 1}, 1]),
+        ("price_asc", [1.5, "1"]),
+        ("id", ["abc"]),
+        ("id", [True]),
+        ("name", [None]),
+        ("newest", ["yesterday", 1]),
+        ("newest", [5, 1]),
+    ])
+    def test_cursor_values_must_fit_sort_key(self, client, auth_headers, catalog, sort, values):
+        """Test that a well-formed cursor holding values of the wrong type is a client error."""
+        from app.services.pagination import encode_cursor
+        
+        response = client.get(
+            "/api/sweets",
+            params={"sort": sort, "cursor": encode_cursor(sort, values)},
+            headers=auth_headers
+        )
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestSweetTotals:
+    """Test suite for cached and estimated list totals."""
+    
+    def _total(self, client, headers, **filters):
+        if filters:
+            return client.post("/api/sweets/search", json=filters, headers=headers).json()
+        return client.get("/api/sweets", headers=headers).json()
+    
+    def test_catalog_total_tracks_create_and_delete(self, client, admin_headers, test_sweet, test_sweet_data):
+        """Test that the unfiltered total follows creates and deletes."""
+        assert self._total(client, admin_headers)["total"] == 1
+        
+        created = client.post(
+            "/api/sweets",
+            json={**test_sweet_data, "name": "Second Sweet"},
+            headers=admin_headers
+        ).json()
+        assert self._total(client, admin_headers)["total"] == 2
+        
+        client.delete(f"/api/sweets/{created['id']}", headers=admin_headers)
+        assert self._total(client, admin_headers)["total"] == 1
+    
+    def test_filtered_total_invalidated_by_stock_change(self, client, auth_headers, test_sweet):
+        """Test that a cached in-stock count is refreshed after a purchase sells out."""
+        assert self._total(client, auth_headers, in_stock=True)["total"] == 1
+        
+        client.post(
+            f"/api/sweets/{test_sweet.id}/purchase",
+            json={"quantity": test_sweet.quantity},
+            headers=auth_headers
+        )
+        
+        assert self._total(client, auth_headers, in_stock=True)["total"] == 0
+    
+    def test_filtered_total_is_cached(self, client, auth_headers, test_sweet, db, monkeypatch):
+        """Test that repeated SQL-path searches reuse the cached count."""
+        from app.config import settings
+        from app.core.cache import cache_stats
+        
+        monkeypatch.setattr(settings, "catalog_snapshot_enabled", False)
+        self._total(client, auth_headers, category=test_sweet.category)
+        # A different page size misses the result cache but shares the count
+        self._total(client, auth_headers, category=test_sweet.category, limit=5)
+        
+        assert cache_stats()["sweet_counts"]["hits"] == 1
+    
+    def test_estimated_mode_falls_back_to_exact(self, client, auth_headers, test_sweet):
+        """Test that estimated mode reports an exact total where no statistics exist."""
+        data = client.get(
+            "/api/sweets", params={"count_mode": "estimated"}, headers=auth_headers
+        ).json()
+        
+        assert data["total"] == 1
+        assert data["total_estimated"] is False
+    
+    def test_normalize_filters(self):
+        """Test that equivalent searches share one cache key."""
+        from app.services.sweet_counts import SweetCounter
+        
+        assert SweetCounter.normalize(name="Choc", min_price=2, in_stock=False, category=None) == \
+            SweetCounter.normalize(name="choc", min_price=2.0)
+    
+    def test_estimate_sql_expands_in_filters(self):
+        """Test that an IN-filtered count query renders plain placeholders for PostgreSQL."""
+        from sqlalchemy import select
+        from sqlalchemy.dialects import postgresql
+        from app.models.sweet import Sweet
+        from app.services.sweet_counts import SweetCounter
+        
+        statement = select(Sweet.id).where(Sweet.category.in_(["Toffee", "Fudge"]), Sweet.price > 2)
+        sql, params = SweetCounter._explain_sql(statement, postgresql.dialect())
+        
+        assert sql.startswith("EXPLAIN (FORMAT JSON) SELECT")
+        assert "POSTCOMPILE" not in sql
+        assert sorted(params.values(), key=str) == [2, "Fudge", "Toffee"]
+        assert all(f"%({name})s" in sql for name in params)
+
+
+class TestNameSearchIndex:
+    """Test suite for the trigram name search index."""
+    
+    def _names(self, client, headers, term):
+        response = client.post("/api/sweets/search", json={"name": term}, headers=headers)
+        return sorted(s["name"] for s in response.json()["sweets"])
+    
+    def test_index_matches_substring_search(self, client, admin_headers, test_sweet_data):
+        """Test that indexed search finds the same sweets as a substring match."""
+        names = ["Dark Chocolate Bar", "Milk CHOCOLATE", "Lemon Drop", "Choc Chip", "Hot Cocoa"]
+        for name in names:
+            client.post("/api/sweets", json={**test_sweet_data, "name": name}, headers=admin_headers)
+        
+        for term in ["chocolate", "Choc", "ocoa", "lemon d", "xyz", "co"]:
+            expected = sorted(n for n in names if term.lower() in n.lower())
+            assert self._names(client, admin_headers, term) == expected
+    
+    def test_index_follows_rename_and_delete(self, client, admin_headers, test_sweet):
+        """Test that renames and deletes are reflected in name search."""
+        assert self._names(client, admin_headers, "truffle") == [test_sweet.name]
+        
+        client.put(f"/api/sweets/{test_sweet.id}", json={"name": "Caramel Fudge"}, headers=admin_headers)
+        assert self._names(client, admin_headers, "truffle") == []
+        assert self._names(client, admin_headers, "fudge") == ["Caramel Fudge"]
+        
+        client.delete(f"/api/sweets/{test_sweet.id}", headers=admin_headers)
+        assert self._names(client, admin_headers, "fudge") == []
+    
+    def test_unselective_terms_fall_back_to_sql(self, db):
+        """Test that the index declines terms it cannot narrow."""
+        from app.models.sweet import Sweet
+        from app.services.name_index import NameIndex
+        
+        db.add_all(Sweet(name=f"Sweet {i}", category="Candy", price=1.0, quantity=1) for i in range(5))
+        db.commit()
+        index = NameIndex(refresh_seconds=60, max_candidates=3)
+        
+        assert index.matching_ids(db, "sw") is None
+        assert index.matching_ids(db, "sweet") is None
+        assert len(index.matching_ids(db, "sweet 3")) == 1
+    
+    def test_reload_keeps_writes_made_while_it_reads(self, db, test_sweet):
+        """Test that a rename applied during a reload's read is replayed onto the new index."""
+        from sqlalchemy import event
+        from app.services.name_index import NameIndex
+        
+        index = NameIndex(refresh_seconds=60, max_candidates=100)
+        index.load(db)
+        
+        renamed = []
+        
+        def rename_meanwhile(*args):
+            if not renamed:
+                renamed.append(True)
+                index.add(test_sweet.id, "Caramel Fudge")
+        
+        event.listen(db, "do_orm_execute", rename_meanwhile)
+        index.load(db)
+        event.remove(db, "do_orm_execute", rename_meanwhile)
+        
+        assert index.matching_ids(db, "fudge") == [test_sweet.id]
+        assert index.matching_ids(db, "truffle") == []
+    
+    def test_stale_index_starts_one_reload_at_a_time(self, db, monkeypatch):
+        """Test that concurrent lookups on a stale index start a single background reload."""
+        import threading
+        from app.services.name_index import NameIndex
+        
+        index = NameIndex(refresh_seconds=0, max_candidates=100)
+        index.load(db)
+        release = threading.Event()
+        reloads = []
+        
+        def slow_load(session):
+            reloads.append(session)
+            release.wait(5)
+        
+        monkeypatch.setattr(index, "load", slow_load)
+        threads = [threading.Thread(target=index.matching_ids, args=(db, "truffle")) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        release.set()
+        
+        assert len(reloads) == 1
+
+
+class TestCatalogSnapshot:
+    """Test suite for vectorized search on the catalog snapshot."""
+    
+    @pytest.fixture
+    def catalog(self, db):
+        """Create a varied catalog of 300 sweets."""
+        import random
+        from app.models.sweet import Sweet
+        
+        rng = random.Random(7)
+        db.add_all(
+            Sweet(
+                name=f"{rng.choice(['Choco', 'Mint', 'Lemon'])} Treat {i}",
+                category=rng.choice(["Candy", "Chocolate", "Toffee", "Gummy"]),
+                price=round(rng.uniform(0.5, 20.0), 2),
+                quantity=rng.choice([0, 0, 1, 5, 50])
+            )
+            for i in range(300)
+        )
+        db.commit()
+    
+    def _search_ids(self, db, monkeypatch, snapshot, **params):
+        from app.config import settings
+        from app.schemas.sweet import SweetSearchRequest
+        from app.services.sweet_service import SweetService
+        
+        monkeypatch.setattr(settings, "catalog_snapshot_enabled", snapshot)
+        request = SweetSearchRequest(limit=1000, include_total=True, **params)
+        page = SweetService.search_sweets(db, request)
+        assert page.total == len(page.items)
+        return [sweet["id"] for sweet in page.items]
+    
+    @pytest.mark.parametrize("params", [
+        {},
+        {"category": "Chocolate"},
+        {"category": "Unknown"},
+        {"min_price": 5.0, "max_price": 10.0},
+        {"max_price": 3.5, "in_stock": True},
+        {"category": "Toffee", "min_price": 2.0, "in_stock": True},
+        {"name": "mint", "category": "Candy"},
+        {"name": "treat 1", "max_price": 12.0},
+    ])
+    def test_snapshot_matches_sql(self, db, monkeypatch, catalog, params):
+        """Test that snapshot filtering returns the same rows as the SQL path."""
+        assert self._search_ids(db, monkeypatch, True, **params) == \
+            self._search_ids(db, monkeypatch, False, **params)
+    
+    def test_snapshot_follows_writes(self, client, admin_headers, auth_headers, test_sweet, test_sweet_data):
+        """Test that service writes are patched into the snapshot."""
+        def search(**filters):
+            response = client.post("/api/sweets/search", json=filters, headers=auth_headers)
+            return [s["name"] for s in response.json()["sweets"]]
+        
+        assert search(in_stock=True) == [test_sweet.name]
+        
+        client.post(f"/api/sweets/{test_sweet.id}/purchase", json={"quantity": test_sweet.quantity}, headers=auth_headers)
+        assert search(in_stock=True) == []
+        
+        client.put(f"/api/sweets/{test_sweet.id}", json={"category": "Fudge"}, headers=admin_headers)
+        assert search(category="Fudge") == [test_sweet.name]
+        
+        client.post("/api/sweets", json={**test_sweet_data, "name": "New Fudge", "category": "Fudge"}, headers=admin_headers)
+        assert search(category="Fudge") == [test_sweet.name, "New Fudge"]
+        
+        client.delete(f"/api/sweets/{test_sweet.id}", headers=admin_headers)
+        assert search(category="Fudge") == ["New Fudge"]
+    
+    def test_snapshot_cursor_pages(self, db, monkeypatch, catalog):
+        """Test that snapshot search pages with cursors like the SQL path."""
+        from app.config import settings
+        from app.schemas.sweet import SweetSearchRequest
+        from app.services.sweet_service import SweetService
+        
+        monkeypatch.setattr(settings, "catalog_snapshot_enabled", True)
+        seen, cursor = [], None
+        while True:
+            page = SweetService.search_sweets(db, SweetSearchRequest(category="Candy", limit=20, cursor=cursor))
+            seen.extend(sweet["id"] for sweet in page.items)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        
+        assert seen == self._search_ids(db, monkeypatch, False, category="Candy")
+    
+    @pytest.mark.parametrize("path", ["/api/sweets/search", "/api/sweets/search/stream"])
+    @pytest.mark.parametrize("last_id", [None, [1], "1"])
+    def test_snapshot_rejects_non_integer_cursor(self, client, auth_headers, monkeypatch, catalog, path, last_id):
+        """Test that a snapshot cursor whose ID is not an integer is a client error."""
+        from app.config import settings
+        from app.services.pagination import encode_cursor
+        
+        monkeypatch.setattr(settings, "catalog_snapshot_enabled", True)
+        response = client.post(
+            path,
+            json={"category": "Candy", "cursor": encode_cursor("id", [last_id])},
+            headers=auth_headers
+        )
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_snapshot_patches_do_not_touch_published_columns(self, db, test_sweet):
+        """Test that a patch swaps in new columns instead of changing ones a reader holds."""
+        from app.core.catalog import catalog_version
+        from app.services.catalog_snapshot import catalog_snapshot
+        
+        columns, _, categories = catalog_snapshot.match(db)
+        assert not columns.quantities.flags.writeable
+        
+        test_sweet.quantity = 0
+        test_sweet.category = "Brand New"
+        db.commit()
+        catalog_version.stock_changed([test_sweet.id])
+        patched, mask, patched_categories = catalog_snapshot.match(db, category="Brand New", in_stock=False)
+        
+        assert patched is not columns
+        assert columns.quantities.tolist() == [100]
+        assert "Brand New" not in categories and "Brand New" not in columns.category_index
+        assert patched.ids[mask].tolist() == [test_sweet.id]
+        assert patched.quantities.tolist() == [0]
+        assert "Brand New" in patched_categories
+
+
+class TestSearchFacets:
+    """Test suite for search facet counts."""
+    
+    @pytest.fixture
+    def sweets(self, db):
+        """Create sweets spread over categories, prices and stock."""
+        from app.models.sweet import Sweet
+        
+        rows = [
+            ("Dark Bar", "Chocolate", 3.0, 10),
+            ("Milk Bar", "Chocolate", 7.5, 0),
+            ("Truffle Box", "Chocolate", 25.0, 2),
+            ("Lemon Drop", "Candy", 1.0, 100),
+            ("Mint Drop", "Candy", 5.0, 0),
+            ("Butter Toffee", "Toffee", 60.0, 4),
+        ]
+        db.add_all(Sweet(name=n, category=c, price=p, quantity=q) for n, c, p, q in rows)
+        db.commit()
+    
+    def _facets(self, client, auth_headers, **filters):
+        response = client.post("/api/sweets/search", json={**filters, "facets": True}, headers=auth_headers)
+        assert response.status_code == 200
+        return response.json()["facets"]
+    
+    def test_facets_not_returned_by_default(self, client, auth_headers, sweets):
+        """Test that facets are only computed on request."""
+        response = client.post("/api/sweets/search", json={}, headers=auth_headers)
+        assert response.json()["facets"] is None
+    
+    @pytest.mark.parametrize("snapshot", [True, False])
+    def test_facet_counts(self, client, auth_headers, sweets, monkeypatch, snapshot):
+        """Test facet counts over every match on both search paths."""
+        from app.config import settings
+        
+        monkeypatch.setattr(settings, "catalog_snapshot_enabled", snapshot)
+        facets = self._facets(client, auth_headers, limit=1)
+        
+        assert facets["categories"] == {"Candy": 2, "Chocolate": 3, "Toffee": 1}
+        assert [b["count"] for b in facets["price_buckets"]] == [2, 2, 0, 1, 1]
+        assert facets["price_buckets"][0] == {"min_price": 0.0, "max_price": 5.0, "count": 2}
+        assert facets["price_buckets"][-1] == {"min_price": 50.0, "max_price": None, "count": 1}
+        assert (facets["in_stock"], facets["out_of_stock"]) == (4, 2)
+        
+        filtered = self._facets(client, auth_headers, category="Chocolate", max_price=10)
+        assert filtered["categories"] == {"Chocolate": 2}
+        assert (filtered["in_stock"], filtered["out_of_stock"]) == (1, 1)
+    
+    def test_facets_cached_per_search(self, client, auth_headers, admin_headers, sweets, db):
+        """Test that facets are cached by normalized search and refreshed by writes."""
+        from app.core.cache import cache_stats
+        from app.models.sweet import Sweet
+        
+        first = self._facets(client, auth_headers, name="DROP", in_stock=False, limit=1)
+        again = self._facets(client, auth_headers, name="drop", limit=50)
+        assert first == again
+        assert cache_stats()["search_facets"]["hits"] == 1
+        
+        mint = db.query(Sweet).filter(Sweet.name == "Mint Drop").one()
+        client.post(f"/api/sweets/{mint.id}/restock", json={"quantity": 3}, headers=admin_headers)
+        after = self._facets(client, auth_headers, name="drop")
+        assert (after["in_stock"], after["out_of_stock"]) == (2, 0)
+
+
+class TestSearchResultCache:
+    """Test suite for the search result cache."""
+    
+    def _search(self, client, auth_headers, **params):
+        response = client.post("/api/sweets/search", json=params, headers=auth_headers)
+        assert response.status_code == 200
+        return response.json()
+    
+    def test_equivalent_searches_share_an_entry(self, client, auth_headers, test_sweet):
+        """Test that searches differing only in name case and whitespace hit the cache."""
+        from app.core.cache import cache_stats
+        
+        first = self._search(client, auth_headers, name="  Chocolate ", in_stock=False)
+        again = self._search(client, auth_headers, name="chocolate")
+        
+        assert first == again
+        assert first["sweets"][0]["name"] == test_sweet.name
+        stats = cache_stats()["search_results"]
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    
+    def test_writes_make_entries_stale(self, client, auth_headers, admin_headers, test_sweet):
+        """Test that purchases and updates are visible on the next search."""
+        before = self._search(client, auth_headers, category=test_sweet.category)
+        assert before["sweets"][0]["quantity"] == test_sweet.quantity
+        
+        client.post(f"/api/sweets/{test_sweet.id}/purchase", json={"quantity": 2}, headers=auth_headers)
+        after = self._search(client, auth_headers, category=test_sweet.category)
+        assert after["sweets"][0]["quantity"] == test_sweet.quantity - 2
+        
+        client.put(f"/api/sweets/{test_sweet.id}", json={"price": 9.5}, headers=admin_headers)
+        updated = self._search(client, auth_headers, category=test_sweet.category)
+        assert updated["sweets"][0]["price"] == 9.5
+    
+    def test_search_paths_do_not_share_entries(self, client, auth_headers, test_sweet, monkeypatch):
+        """Test that switching the name backend or the snapshot misses the cache instead of replaying another path."""
+        from app.core.cache import cache_stats
+        from app.config import settings
+        
+        self._search(client, auth_headers, name="truffle")
+        monkeypatch.setattr(settings, "name_search_backend", "like")
+        self._search(client, auth_headers, name="truffle")
+        monkeypatch.setattr(settings, "catalog_snapshot_enabled", not settings.catalog_snapshot_enabled)
+        self._search(client, auth_headers, name="truffle")
+        
+        stats = cache_stats()["search_results"]
+        assert (stats["hits"], stats["misses"]) == (0, 3)
+    
+    def test_byte_budget_evicts_least_recently_used(self, client, auth_headers, test_sweet, monkeypatch):
+        """Test that the byte budget evicts old pages and is reported in stats."""
+        from app.core.cache import cache_stats
+        from app.services.search_cache import search_cache
+        
+        monkeypatch.setattr(search_cache._cache, "max_bytes", 2500)
+        for low in range(4):
+            self._search(client, auth_headers, min_price=low)
+        
+        stats = cache_stats()["search_results"]
+        assert stats["bytes"] <= 2500
+        assert stats["evictions"] >= 1
+    
+    def test_cache_stats_endpoint(self, client):
+        """Test that cache counters are exposed for monitoring."""
+        response = client.get("/health/cache")
+        
+        assert response.status_code == 200
+        assert {"hits", "misses", "evictions", "bytes"} <= response.json()["search_results"].keys()
+
+
+class TestSearchStreaming:
+    """Test suite for NDJSON search streaming."""
+    
+    @pytest.fixture
+    def many_sweets(self, db):
+        """Create more sweets than one search page can hold."""
+        from app.models.sweet import Sweet
+        
+        db.add_all(
+            Sweet(name=f"Bulk Sweet {i}", category="Bulk" if i % 3 else "Other", price=1.0 + i % 7, quantity=i % 4)
+            for i in range(1200)
+        )
+        db.commit()
+    
+    def _stream(self, client, auth_headers, **params):
+        import json
+        
+        response = client.post("/api/sweets/search/stream", json=params, headers=auth_headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        return [json.loads(line) for line in response.text.splitlines()]
+    
+    @pytest.mark.parametrize("snapshot", [True, False])
+    def test_streams_every_match(self, client, auth_headers, many_sweets, monkeypatch, snapshot):
+        """Test that streaming returns all matches beyond the page limit, in ID order."""
+        from app.config import settings
+        
+        monkeypatch.setattr(settings, "catalog_snapshot_enabled", snapshot)
+        monkeypatch.setattr(settings, "search_stream_chunk_size", 100)
+        rows = self._stream(client, auth_headers, category="Bulk", in_stock=True)
+        
+        expected = [i for i in range(1200) if i % 3 and i % 4]
+        assert [row["name"] for row in rows] == [f"Bulk Sweet {i}" for i in expected]
+        assert all(row["quantity"] > 0 for row in rows)
+    
+    def test_stream_resumes_from_cursor(self, client, auth_headers, many_sweets):
+        """Test that a cursor from a search page resumes the stream after it."""
+        page = client.post(
+            "/api/sweets/search", json={"category": "Other", "limit": 10}, headers=auth_headers
+        ).json()
+        rows = self._stream(client, auth_headers, category="Other", cursor=page["next_cursor"])
+        
+        assert len(page["sweets"]) + len(rows) == 400
+        assert rows[0]["id"] > page["sweets"][-1]["id"]
+    
+    def test_stream_requires_authentication(self, client):
+        """Test that streaming requires a token."""
+        response = client.post("/api/sweets/search/stream", json={})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+class TestSuggest:
+    """Test suite for prefix autocomplete."""
+    
+    @pytest.fixture
+    def sweets(self, db):
+        """Create sweets sharing prefixes, with different stock."""
+        from app.models.sweet import Sweet
+        
+        rows = [
+            ("Chocolate Truffle", "Chocolate", 5),
+            ("Chocolate Fudge", "Fudge", 50),
+            ("Cherry Drop", "Candy", 20),
+            ("Dark Chocolate Bar", "Chocolate", 1),
+            ("Mint Truffle", "Chocolate", 0),
+        ]
+        db.add_all(Sweet(name=n, category=c, price=2.0, quantity=q) for n, c, q in rows)
+        db.commit()
+        return {sweet.name: sweet.id for sweet in db.query(Sweet).all()}
+    
+    def _suggest(self, client, auth_headers, q, **params):
+        response = client.get("/api/sweets/suggest", params={"q": q, **params}, headers=auth_headers)
+        assert response.status_code == 200
+        return response.json()
+    
+    def test_prefix_matches_name_and_word_starts(self, client, auth_headers, sweets):
+        """Test that a prefix completes names and later words, case-insensitively."""
+        names = [s["name"] for s in self._suggest(client, auth_headers, "CHOC", rank="stock")["sweets"]]
+        assert names == ["Chocolate Fudge", "Chocolate Truffle", "Dark Chocolate Bar"]
+        
+        names = [s["name"] for s in self._suggest(client, auth_headers, "truf", rank="stock")["sweets"]]
+        assert names == ["Chocolate Truffle", "Mint Truffle"]
+    
+    def test_category_suggestions(self, client, auth_headers, sweets):
+        """Test that categories are completed and ranked by sweet count."""
+        result = self._suggest(client, auth_headers, "c")
+        assert result["categories"] == [
+            {"name": "Chocolate", "sweet_count": 3},
+            {"name": "Candy", "sweet_count": 1}
+        ]
+    
+    def test_popularity_ranking_follows_purchases(self, client, auth_headers, sweets):
+        """Test that purchases move a sweet up the popularity ranking."""
+        client.post(f"/api/sweets/{sweets['Dark Chocolate Bar']}/purchase", json={"quantity": 1}, headers=auth_headers)
+        
+        result = self._suggest(client, auth_headers, "choc", limit=1)
+        assert [s["name"] for s in result["sweets"]] == ["Dark Chocolate Bar"]
+    
+    def test_follows_create_update_delete(self, client, admin_headers, auth_headers, sweets, test_sweet_data):
+        """Test that catalog writes are reflected in suggestions."""
+        self._suggest(client, auth_headers, "x")
+        client.post("/api/sweets", json={**test_sweet_data, "name": "Caramel Chew"}, headers=admin_headers)
+        client.put(f"/api/sweets/{sweets['Cherry Drop']}", json={"name": "Lemon Drop"}, headers=admin_headers)
+        client.delete(f"/api/sweets/{sweets['Chocolate Fudge']}", headers=admin_headers)
+        
+        names = [s["name"] for s in self._suggest(client, auth_headers, "c", rank="stock")["sweets"]]
+        assert names == ["Caramel Chew", "Chocolate Truffle", "Dark Chocolate Bar"]
+        assert self._suggest(client, auth_headers, "drop")["sweets"][0]["name"] == "Lemon Drop"
+    
+    def test_popularity_counts_confirmed_reservations(self, client, auth_headers, sweets):
+        """Test that sales are handed to the index by every purchase path, including confirms."""
+        self._suggest(client, auth_headers, "x")
+        hold_id = client.post(
+            f"/api/sweets/{sweets['Chocolate Truffle']}/reserve",
+            json={"quantity": 2},
+            headers=auth_headers
+        ).json()["id"]
+        client.post(f"/api/sweets/reservations/{hold_id}/confirm", headers=auth_headers)
+        
+        result = self._suggest(client, auth_headers, "choc", limit=1)
+        assert [s["name"] for s in result["sweets"]] == ["Chocolate Truffle"]
+    
+    def test_patch_keeps_keys_sorted(self, client, admin_headers, auth_headers, sweets):
+        """Test that several renames in one sync are merged into a still-sorted key list."""
+        from app.services.suggest_index import completion_keys, suggest_index
+        
+        self._suggest(client, auth_headers, "x")
+        for name, new_name in [("Cherry Drop", "Apple Drop"), ("Mint Truffle", "Zesty Mint"), ("Chocolate Fudge", "Banana Fudge")]:
+            client.put(f"/api/sweets/{sweets[name]}", json={"name": new_name}, headers=admin_headers)
+        self._suggest(client, auth_headers, "x")
+        
+        entries = list(zip(suggest_index._keys, suggest_index._ids))
+        assert entries == sorted(entries)
+        assert len(entries) == sum(len(completion_keys(name)) for name, _ in suggest_index._sweets.values())
+        assert [s["name"] for s in self._suggest(client, auth_headers, "b")["sweets"]] == ["Banana Fudge", "Dark Chocolate Bar"]
+    
+    def test_reload_keeps_sales_recorded_while_it_reads(self, db, sweets):
+        """Test that sales recorded after a reload read the totals are added to its new scores."""
+        from sqlalchemy import event
+        from app.services.suggest_index import suggest_index
+        
+        queries = []
+        
+        def sell_meanwhile(*args):
+            queries.append(True)
+            if len(queries) == 2:
+                suggest_index.record_sales([(sweets["Mint Truffle"], 3)])
+        
+        event.listen(db, "do_orm_execute", sell_meanwhile)
+        suggest_index.load(db)
+        event.remove(db, "do_orm_execute", sell_meanwhile)
+        
+        assert suggest_index._sold == {sweets["Mint Truffle"]: 3}
+    
+    def test_wide_prefixes_use_cached_ranking(self, client, auth_headers, sweets, monkeypatch):
+        """Test that prefixes over the scan limit return the same ranking from cache."""
+        from app.core.cache import cache_stats
+        from app.services.suggest_index import suggest_index
+        
+        narrow = self._suggest(client, auth_headers, "c", rank="stock")
+        monkeypatch.setattr(suggest_index, "scan_limit", 1)
+        
+        assert self._suggest(client, auth_headers, "c", rank="stock") == narrow
+        assert self._suggest(client, auth_headers, "c", rank="stock") == narrow
+        assert cache_stats()["suggest_top"]["hits"] == 1
+    
+    def test_suggest_requires_query(self, client, auth_headers):
+        """Test that an empty query is rejected."""
+        response = client.get("/api/sweets/suggest", params={"q": ""}, headers=auth_headers)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+
+class TestFuzzySearch:
+    """Test suite for typo-tolerant name search."""
+    
+    @pytest.fixture
+    def sweets(self, db):
+        """Create sweets with similar names."""
+        from app.models.sweet import Sweet
+        
+        rows = [
+            ("Chocolate Truffle", "Chocolate", 5),
+            ("Chocolate Fudge", "Fudge", 0),
+            ("Mint Truffle", "Chocolate", 3),
+            ("Lemon Drop", "Candy", 9),
+        ]
+        db.add_all(Sweet(name=n, category=c, price=2.0, quantity=q) for n, c, q in rows)
+        db.commit()
+    
+    def _search(self, client, auth_headers, **params):
+        response = client.post("/api/sweets/search", json={"fuzzy": True, **params}, headers=auth_headers)
+        assert response.status_code == 200
+        return response.json()
+    
+    def test_misspelled_name_matches(self, client, auth_headers, sweets):
+        """Test that a misspelled search finds the intended sweet first."""
+        result = self._search(client, auth_headers, name="choclate truffel")
+        
+        assert [s["name"] for s in result["sweets"]] == ["Chocolate Truffle"]
+        assert result["total"] == 1
+    
+    def test_results_ranked_by_similarity(self, client, auth_headers, sweets):
+        """Test that closer names rank ahead of looser matches."""
+        names = [s["name"] for s in self._search(client, auth_headers, name="truffle")["sweets"]]
+        assert names == ["Chocolate Truffle", "Mint Truffle"]
+        
+        names = [s["name"] for s in self._search(client, auth_headers, name="chocolat fudge")["sweets"]]
+        assert names == ["Chocolate Fudge"]
+    
+    def test_fuzzy_applies_other_filters_and_pages(self, client, auth_headers, sweets):
+        """Test that fuzzy results honour filters and page through the ranking."""
+        result = self._search(client, auth_headers, name="trufle", in_stock=True, limit=1)
+        assert [s["name"] for s in result["sweets"]] == ["Chocolate Truffle"]
+        assert result["total"] == 2
+        
+        rest = self._search(client, auth_headers, name="trufle", in_stock=True, limit=1, cursor=result["next_cursor"])
+        assert [s["name"] for s in rest["sweets"]] == ["Mint Truffle"]
+        assert rest["next_cursor"] is None
+    
+    def test_unrelated_term_matches_nothing(self, client, auth_headers, sweets):
+        """Test that fuzziness is bounded."""
+        assert self._search(client, auth_headers, name="caramel")["sweets"] == []
+    
+    def test_exact_search_unaffected(self, client, auth_headers, sweets):
+        """Test that the default substring search does not tolerate typos."""
+        result = self._search(client, auth_headers, name="choclate", fuzzy=False)
+        assert result["sweets"] == []
+    
+    def test_fuzzy_stream_rejected(self, client, auth_headers, sweets):
+        """Test that ranked fuzzy searches cannot be streamed."""
+        response = client.post(
+            "/api/sweets/search/stream", json={"name": "trufle", "fuzzy": True}, headers=auth_headers
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestBoundedDistance:
+    """Test suite for the bounded edit distance used by fuzzy search."""
+    
+    @pytest.mark.parametrize("a, b, limit, expected", [
+        ("truffle", "truffle", 2, 0),
+        ("choclate", "chocolate", 2, 1),
+        ("truffel", "truffle", 2, 1),
+        ("kitten", "sitting", 3, 3),
+        ("kitten", "sitting", 2, 3),
+        ("mint", "lemonade", 2, 3),
+    ])
+    def test_distance(self, a, b, limit, expected):
+        """Test distances and the early cut-off above the limit."""
+        from app.services.name_index import bounded_distance
+        
+        assert bounded_distance(a, b, limit) == expected
+
+
+class TestSweetSorting:
+    """Test suite for server-side sorting."""
+    
+    @pytest.fixture
+    def sweets(self, db):
+        """Create sweets with repeated prices and stock levels."""
+        from datetime import datetime, timedelta
+        from app.models.sweet import Sweet
+        
+        start = datetime(2024, 1, 1)
+        db.add_all(
+            Sweet(
+                name=f"Sweet {chr(65 + (i * 7) % 26)}{i}",
+                category="Chocolate" if i % 2 else "Candy",
+                price=float(1 + i % 5),
+                quantity=i % 3,
+                created_at=start + timedelta(hours=(i * 5) % 17)
+            )
+            for i in range(30)
+        )
+        db.commit()
+        return db.query(Sweet).all()
+    
+    def _walk(self, client, auth_headers, **params):
+        """Collect every page of a sorted search by following cursors."""
+        rows, cursor = [], None
+        while True:
+            body = {**params, "limit": 4, **({"cursor": cursor} if cursor else {})}
+            page = client.post("/api/sweets/search", json=body, headers=auth_headers).json()
+            rows.extend(page["sweets"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return rows
+    
+    @pytest.mark.parametrize("sort, key", [
+        ("price_asc", lambda s: (s.price, s.id)),
+        ("price_desc", lambda s: (-s.price, -s.id)),
+        ("name", lambda s: s.name),
+        ("newest", lambda s: (-s.created_at.timestamp(), -s.id)),
+        ("quantity", lambda s: (-s.quantity, -s.id)),
+    ])
+    def test_sorted_pages(self, client, auth_headers, sweets, sort, key):
+        """Test that cursors walk every sort order without gaps or repeats."""
+        rows = self._walk(client, auth_headers, sort=sort)
+        assert [row["id"] for row in rows] == [s.id for s in sorted(sweets, key=key)]
+    
+    def test_sort_with_filters(self, client, auth_headers, sweets):
+        """Test sorting a filtered search."""
+        rows = self._walk(client, auth_headers, category="Chocolate", in_stock=True, sort="price_desc")
+        expected = sorted(
+            (s for s in sweets if s.category == "Chocolate" and s.quantity > 0),
+            key=lambda s: (-s.price, -s.id)
+        )
+        assert [row["id"] for row in rows] == [s.id for s in expected]
+    
+    def test_stream_follows_sort(self, client, auth_headers, sweets):
+        """Test that streaming honours the sort order."""
+        import json
+        
+        response = client.post("/api/sweets/search/stream", json={"sort": "price_desc"}, headers=auth_headers)
+        streamed = [json.loads(line)["id"] for line in response.text.splitlines()]
+        assert streamed == [row["id"] for row in self._walk(client, auth_headers, sort="price_desc")]
+    
+    def test_list_sort(self, client, auth_headers, sweets):
+        """Test the sort parameter of the list endpoint."""
+        response = client.get("/api/sweets", params={"sort": "price_asc", "limit": 3}, headers=auth_headers)
+        prices = [s["price"] for s in response.json()["sweets"]]
+        assert prices == [1.0, 1.0, 1.0]
+        
+        response = client.get("/api/sweets", params={"sort": "cheapest"}, headers=auth_headers)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+    
+    def test_cursor_from_other_sort_rejected(self, client, auth_headers, sweets):
+        """Test that a cursor only continues the ordering it came from."""
+        page = client.post("/api/sweets/search", json={"sort": "newest", "limit": 2}, headers=auth_headers).json()
+        response = client.post(
+            "/api/sweets/search",
+            json={"sort": "price_asc", "cursor": page["next_cursor"]},
+            headers=auth_headers
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestSortIndexes:
+    """EXPLAIN-based tests that sorted pages are index range scans."""
+    
+    def _plans(self, db, run):
+        """Run a callable and return the query plans of the SELECTs it issued on sweets."""
+        from sqlalchemy import event
+        
+        engine = db.get_bind()
+        statements = []
+        
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT") and "FROM sweets" in statement:
+                statements.append((statement, parameters))
+        
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            run()
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+        
+        with engine.connect() as conn:
+            return [
+                " | ".join(row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params))
+                for sql, params in statements
+            ]
+    
+    @pytest.mark.parametrize("params, index", [
+        ({"sort": "price_asc"}, "ix_sweets_price_id"),
+        ({"sort": "price_desc"}, "ix_sweets_price_id"),
+        ({"sort": "price_asc", "category": "Candy"}, "ix_sweets_category_price_id"),
+        ({"sort": "newest"}, "ix_sweets_created_at_id"),
+        ({"sort": "quantity"}, "ix_sweets_quantity_id"),
+    ])
+    def test_sorted_page_uses_index(self, db, test_sweet, params, index):
+        """Test that the page query reads an index in order instead of sorting."""
+        from app.schemas.sweet import SweetSearchRequest
+        from app.services.sweet_service import SweetService
+        
+        request = SweetSearchRequest(include_total=False, limit=10, **params)
+        plans = self._plans(db, lambda: SweetService.search_sweets(db, request))
+        page_plans = [plan for plan in plans if index in plan]
+        
+        assert page_plans, plans
+        assert all("TEMP B-TREE" not in plan for plan in page_plans)
+    
+    def test_init_db_creates_missing_indexes(self, db, monkeypatch):
+        """Test that init_db adds new indexes to an existing sweets table."""
+        from sqlalchemy import inspect, text
+        import app.database as database
+        
+        engine = db.get_bind()
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_sweets_category_price_id"))
+        monkeypatch.setattr(database, "engine", engine)
+        
+        database.init_db()
+        
+        names = {index["name"] for index in inspect(engine).get_indexes("sweets")}
+        assert {"ix_sweets_price_id", "ix_sweets_category_price_id", "ix_sweets_created_at_id"} <= names
+
+
+class TestSweetRecordCache:
+    """Test suite for the read-through cache behind GET /api/sweets/{id}."""
+    
+    def test_repeated_reads_hit_cache(self, client, auth_headers, test_sweet):
+        """Test that the second read is served from the cache with the same body."""
+        from app.core.cache import cache_stats
+        
+        first = client.get(f"/api/sweets/{test_sweet.id}", headers=auth_headers)
+        second = client.get(f"/api/sweets/{test_sweet.id}", headers=auth_headers)
+        
+        assert first.status_code == second.status_code == status.HTTP_200_OK
+        assert first.json() == second.json()
+        assert first.json()["name"] == test_sweet.name
+        stats = cache_stats()["sweet_records"]
+        assert (stats["hits"], stats["entries"]) == (1, 1)
+        assert stats["bytes"] == (
+            len(first.content) + len(first.headers["etag"]) + len(first.headers["last-modified"])
+        )
+    
+    def test_writes_invalidate(self, client, auth_headers, admin_headers, test_sweet):
+        """Test that updates, purchases and restocks are visible on the next read."""
+        url = f"/api/sweets/{test_sweet.id}"
+        client.get(url, headers=auth_headers)
+        
+        client.put(url, json={"price": 7.25}, headers=admin_headers)
+        assert client.get(url, headers=auth_headers).json()["price"] == 7.25
+        
+        client.post(f"{url}/purchase", json={"quantity": 3}, headers=auth_headers)
+        assert client.get(url, headers=auth_headers).json()["quantity"] == test_sweet.quantity - 3
+        
+        client.post(f"{url}/restock", json={"quantity": 10}, headers=admin_headers)
+        assert client.get(url, headers=auth_headers).json()["quantity"] == test_sweet.quantity + 7
+        
+        client.delete(url, headers=admin_headers)
+        assert client.get(url, headers=auth_headers).status_code == status.HTTP_404_NOT_FOUND
+    
+    def test_read_racing_a_write_is_not_stored(self, db):
+        """Test that a record read before an invalidation is discarded."""
+        from app.services.sweet_cache import SweetRecord, sweet_cache
+        
+        stale = SweetRecord(b"stale", '"1"', None)
+        fresh = SweetRecord(b"fresh", '"2"', None)
+        generation = sweet_cache.generation(42)
+        sweet_cache.evict([42])
+        sweet_cache.set(42, stale, generation)
+        assert sweet_cache.get(42) is None
+        
+        sweet_cache.set(42, fresh, sweet_cache.generation(42))
+        assert sweet_cache.get(42) == fresh
+    
+    def test_invalidations_are_broadcast(self, client, auth_headers, admin_headers, test_sweet):
+        """Test that local changes are published and relayed ones evict without echoing."""
+        from app.core.catalog import catalog_version
+        from app.services.sweet_cache import sweet_cache
+        
+        published = []
+        
+        def publish(sweet_ids):
+            published.append(list(sweet_ids))
+        
+        catalog_version.subscribe(publish, remote=False)
+        try:
+            client.put(f"/api/sweets/{test_sweet.id}", json={"price": 3.5}, headers=admin_headers)
+            client.get(f"/api/sweets/{test_sweet.id}", headers=auth_headers)
+            assert sweet_cache.get(test_sweet.id) is not None
+            
+            catalog_version.remote_changed([test_sweet.id])
+            assert sweet_cache.get(test_sweet.id) is None
+        finally:
+            catalog_version.unsubscribe(publish)
+        
+        assert published == [[test_sweet.id]]
+    
+    def test_failed_broadcast_is_retried_and_reported(self, client, db, monkeypatch):
+        """Test that a NOTIFY that keeps failing is retried, then counted in /health/cache."""
+        from app.services.sweet_cache import InvalidationBus, sweet_cache
+        
+        # SQLite has no pg_notify, so every attempt fails
+        bus = InvalidationBus(db.get_bind(), "test_channel", attempts=3, retry_seconds=0)
+        assert bus._send([1, 2]) is False
+        monkeypatch.setattr(sweet_cache, "bus", bus)
+        
+        stats = client.get("/health/cache").json()["sweet_cache_broadcast"]
+        assert (stats["published"], stats["publish_retries"], stats["publish_failures"]) == (0, 2, 1)
+    
+    def test_shared_catalog_etags_still_expire(self, monkeypatch):
+        """Test that relayed invalidation lengthens the ETag window without removing it."""
+        import time
+        from app.config import settings
+        from app.core.catalog import catalog_version
+        from app.core.conditional import catalog_etag
+        
+        monkeypatch.setattr(catalog_version, "shared", True)
+        now = 1_000_000 * settings.catalog_etag_shared_window_seconds
+        monkeypatch.setattr(time, "time", lambda: now)
+        first = catalog_etag("list")
+        now += settings.catalog_etag_window_seconds
+        assert catalog_etag("list") == first
+        now += settings.catalog_etag_shared_window_seconds
+        assert catalog_etag("list") != first
+    
+    def test_write_paths_read_database(self, client, auth_headers, test_sweet, db):
+        """Test that purchases see stock changed behind the cache's back."""
+        client.get(f"/api/sweets/{test_sweet.id}", headers=auth_headers)
+        db.query(type(test_sweet)).filter_by(id=test_sweet.id).update({"quantity": 1})
+        db.commit()
+        
+        response = client.post(
+            f"/api/sweets/{test_sweet.id}/purchase", json={"quantity": 2}, headers=auth_headers
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestConditionalGet:
+    """Test suite for ETag / If-None-Match handling on catalog reads."""
+    
+    def _statements(self, db, run):
+        """Run a callable and return the SQL statements it issued."""
+        from sqlalchemy import event
+        
+        engine = db.get_bind()
+        statements = []
+        
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            result = run()
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+        return result, statements
+    
+    def test_item_validators(self, client, auth_headers, test_sweet):
+        """Test that a sweet is served with a strong ETag and its Last-Modified date."""
+        from app.core.conditional import http_date
+        
+        response = client.get(f"/api/sweets/{test_sweet.id}", headers=auth_headers)
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["etag"].startswith('"')
+        assert response.headers["last-modified"] == http_date(test_sweet.updated_at)
+        assert response.headers["cache-control"] == "no-cache"
+    
+    def test_item_not_modified_without_database(self, client, auth_headers, test_sweet, db):
+        """Test that a matching If-None-Match on a cached sweet is a bodyless 304 with no SQL."""
+        url = f"/api/sweets/{test_sweet.id}"
+        etag = client.get(url, headers=auth_headers).headers["etag"]
+        
+        response, statements = self._statements(
+            db, lambda: client.get(url, headers={**auth_headers, "If-None-Match": etag})
+        )
+        
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        assert statements == []
+    
+    def test_item_etag_changes_on_write(self, client, auth_headers, admin_headers, test_sweet):
+        """Test that an update and a purchase each move the sweet's ETag."""
+        url = f"/api/sweets/{test_sweet.id}"
+        first = client.get(url, headers=auth_headers).headers["etag"]
+        
+        client.put(url, json={"price": 9.5}, headers=admin_headers)
+        response = client.get(url, headers={**auth_headers, "If-None-Match": first})
+        assert response.status_code == status.HTTP_200_OK
+        second = response.headers["etag"]
+        assert second != first
+        
+        client.post(f"{url}/purchase", json={"quantity": 1}, headers=auth_headers)
+        response = client.get(url, headers={**auth_headers, "If-None-Match": second})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["quantity"] == test_sweet.quantity - 1
+    
+    def test_list_not_modified_without_database(self, client, auth_headers, test_sweet, db):
+        """Test that revalidating an unchanged list is a 304 with no SQL."""
+        first = client.get("/api/sweets?limit=10", headers=auth_headers)
+        etag = first.headers["etag"]
+        assert first.headers["last-modified"]
+        
+        response, statements = self._statements(
+            db, lambda: client.get("/api/sweets?limit=10", headers={**auth_headers, "If-None-Match": etag})
+        )
+        
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b""
+        assert statements == []
+    
+    def test_list_etag_follows_query_and_writes(self, client, auth_headers, test_sweet):
+        """Test that list ETags differ per query and move after a purchase."""
+        etag = client.get("/api/sweets?limit=10", headers=auth_headers).headers["etag"]
+        assert client.get("/api/sweets?limit=5", headers=auth_headers).headers["etag"] != etag
+        
+        client.post(f"/api/sweets/{test_sweet.id}/purchase", json={"quantity": 1}, headers=auth_headers)
+        response = client.get("/api/sweets?limit=10", headers={**auth_headers, "If-None-Match": etag})
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["etag"] != etag
+    
+    @pytest.mark.parametrize("header, matches", [
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"x", "abc"', True),
+        ("*", True),
+        ('"abd"', False),
+        ("", False),
+    ])
+    def test_etag_matching(self, header, matches):
+        """Test If-None-Match list, weak and wildcard forms."""
+        from app.core.conditional import etag_matches
+        
+        assert etag_matches(header, '"abc"') is matches
+
+
+class TestListResponseCache:
+    """Test suite for pre-serialized list pages and per-sweet fragments."""
+    
+    @pytest.fixture
+    def sweets(self, db):
+        """Create four sweets."""
+        from app.models.sweet import Sweet
+        
+        rows = [Sweet(name=f"Listed Sweet {i}", category="Candy", price=1.0 + i, quantity=i) for i in range(4)]
+        db.add_all(rows)
+        db.commit()
+        return rows
+    
+    def test_body_matches_response_model(self, client, auth_headers, sweets, monkeypatch):
+        """Test that assembled pages equal pydantic rendering of the same page."""
+        from app.config import settings
+        from app.schemas.sweet import SweetListResponse, SweetResponse
+        
+        monkeypatch.setattr(settings, "sweet_cache_enabled", False)
+        response = client.get("/api/sweets?limit=3", headers=auth_headers)
+        expected = SweetListResponse(
+            total=4,
+            sweets=[SweetResponse.model_validate(sweet) for sweet in sweets[:3]],
+            next_cursor=response.json()["next_cursor"]
+        ).model_dump_json().encode()
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.content == expected
+        assert response.headers["content-type"] == "application/json"
+    
+    def test_repeated_page_is_served_from_cache(self, client, auth_headers, sweets):
+        """Test that the second identical request reuses the rendered bytes."""
+        from app.core.cache import cache_stats
+        
+        first = client.get("/api/sweets?limit=10", headers=auth_headers)
+        second = client.get("/api/sweets?limit=10", headers=auth_headers)
+        
+        assert first.content == second.content
+        stats = cache_stats()["list_pages"]
+        assert (stats["hits"], stats["entries"]) == (1, 1)
+    
+    def test_write_reencodes_only_changed_sweet(self, client, auth_headers, admin_headers, sweets):
+        """Test that after an update only the changed sweet's fragment is serialized again."""
+        from app.core.cache import cache_stats
+        
+        client.get("/api/sweets?limit=10", headers=auth_headers)
+        client.put(f"/api/sweets/{sweets[1].id}", json={"price": 42.0}, headers=admin_headers)
+        before = cache_stats()["sweet_records"]
+        response = client.get("/api/sweets?limit=10", headers=auth_headers)
+        after = cache_stats()["sweet_records"]
+        
+        assert [sweet["price"] for sweet in response.json()["sweets"]] == [1.0, 42.0, 3.0, 4.0]
+        assert after["hits"] - before["hits"] == 3
+        assert after["misses"] - before["misses"] == 1
+    
+    def test_purchase_is_visible(self, client, auth_headers, sweets):
+        """Test that stock changes are not hidden by a cached page."""
+        client.get("/api/sweets?limit=10", headers=auth_headers)
+        client.post(f"/api/sweets/{sweets[3].id}/purchase", json={"quantity": 1}, headers=auth_headers)
+        
+        response = client.get("/api/sweets?limit=10", headers=auth_headers)
+        assert response.json()["sweets"][3]["quantity"] == 2
+    
+    def test_page_rendered_during_write_is_not_stored(self, db, sweets):
+        """Test that a page whose key predates a write is discarded."""
+        from app.core.catalog import catalog_version
+        from app.services.list_cache import SerializedPage, list_cache
+        
+        key = list_cache.key(0, 10, None, None, "exact", "id", catalog_version.stock)
+        catalog_version.stock_changed([sweets[0].id])
+        list_cache.set(key, SerializedPage(b"{}", None))
+        
+        assert list_cache.get(key) is None
+
+
+class TestBulkSerialization:
+    """Test suite for the column-row read path and bulk JSON encoding."""
+    
+    def test_row_fields_match_response_model(self):
+        """Test that SweetRow mirrors SweetResponse field for field."""
+        from app.schemas.sweet import SweetResponse
+        from app.services.sweet_rows import SWEET_FIELDS
+        
+        assert SWEET_FIELDS == tuple(SweetResponse.model_fields)
+    
+    def test_encoding_matches_response_model(self, db, test_sweet):
+        """Test that bulk-encoded rows equal per-row SweetResponse JSON."""
+        from app.models.sweet import Sweet
+        from app.schemas.sweet import SweetResponse
+        from app.services.sweet_rows import SWEET_COLUMNS, as_rows, encode_sweets
+        
+        db.add(Sweet(name="Plain Mint", category="Mint", price=2, quantity=0, description=None))
+        db.commit()
+        sweets = db.query(Sweet).order_by(Sweet.id).all()
+        rows = as_rows(db.query(Sweet).with_entities(*SWEET_COLUMNS).order_by(Sweet.id))
+        
+        expected = "[" + ",".join(SweetResponse.model_validate(sweet).model_dump_json() for sweet in sweets) + "]"
+        assert encode_sweets(rows) == expected.encode()
+    
+    def test_search_body_matches_response_model(self, client, auth_headers, test_sweet):
+        """Test that search responses, facets included, keep the declared shape."""
+        from app.schemas.sweet import SweetListResponse
+        
+        response = client.post("/api/sweets/search", json={"name": "Choc", "facets": True}, headers=auth_headers)
+        
+        assert response.status_code == status.HTTP_200_OK
+        body = response.json()
+        assert body == SweetListResponse.model_validate(body).model_dump(mode="json")
+        assert [sweet["id"] for sweet in body["sweets"]] == [test_sweet.id]
+        assert body["facets"]["categories"] == {"Chocolate": 1}
+    
+    def test_row_paths_report_shard_totals(self, client, admin_headers, auth_headers, test_sweet):
+        """Test that list, search and stream show live shard totals for sharded sweets."""
+        import json
+        
+        client.put(f"/api/sweets/{test_sweet.id}/shards", json={"shard_count": 3}, headers=admin_headers)
+        client.post(f"/api/sweets/{test_sweet.id}/purchase", json={"quantity": 4}, headers=auth_headers)
+        
+        listed = client.get("/api/sweets", headers=auth_headers).json()["sweets"]
+        searched = client.post("/api/sweets/search", json={"name": "Choc"}, headers=auth_headers).json()["sweets"]
+        streamed = client.post("/api/sweets/search/stream", json={}, headers=auth_headers).text.splitlines()
+        
+        assert listed[0]["quantity"] == searched[0]["quantity"] == 96
+        assert json.loads(streamed[0])["quantity"] == 96